@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response
 import datetime
 import webbrowser
 import os
@@ -8,42 +8,226 @@ import re
 import glob
 import subprocess
 import sys
+import atexit
+import importlib.util
+import itertools
+import collections
+import threading
 from pathlib import Path
-import platform
-import psutil
-import socket
-import uuid
 import json
 
-# For browser tab management
-try:
+from warmup import Subsystems, SubsystemUnavailable
+from browser_pool import DriverPool, PoolTimeout
+from jobs import JobRegistry, JobLimitError
+from terminal_sessions import SessionManager, SessionTimeout, SessionLimitError
+from cleanup import CleanupPlanner
+from batch_ops import BatchRunner, BatchError
+from deletion import DeletionEngine
+from treewalk import Budget, TreeWalk, CursorStore
+from responses import json_response, not_modified, to_columns, wants_columns, make_etag
+
+# Modules shared with the file organizer app live at the repository root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from request_metrics import instrument_app, files_scanned, files_moved, bytes_moved
+from request_profiler import install_profiler
+
+# For browser tab management. Only checked for here; selenium itself is
+# imported when the browser driver subsystem is first loaded.
+SELENIUM_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('selenium', 'webdriver_manager'))
+if not SELENIUM_AVAILABLE:
+    print("Selenium not installed. Browser tab management will be limited.")
+
+app = Flask(__name__, static_folder='static')
+instrument_app(app, name='operator')
+install_profiler(app)
+
+# Background system metrics (one sample per second, one hour of history)
+METRICS_INTERVAL = 1.0
+METRICS_HISTORY = 3600
+
+# Process table, polled in the background once it has been requested
+PROCESS_POLL_INTERVAL = 1.0
+
+# Static host facts, collected in the background once requested
+HOST_RESOLVE_TIMEOUT = 2.0
+
+# Heavy subsystems (psutil monitors, the chromedriver download) are created
+# on first use, or ahead of time by the warm-up started in __main__ (or at
+# import when ZENITH_WARMUP=1, for other WSGI servers; ZENITH_WARMUP=0
+# disables it). /readyz reports which ones are loaded.
+subsystems = Subsystems()
+
+def load_metrics_sampler():
+    from sysmetrics import MetricsSampler
+    sampler = MetricsSampler(interval=METRICS_INTERVAL, history=METRICS_HISTORY)
+    sampler.start()
+    return sampler
+
+def load_process_monitor():
+    from procmon import ProcessMonitor
+    monitor = ProcessMonitor(interval=PROCESS_POLL_INTERVAL)
+    monitor.start()
+    return monitor
+
+def load_host_facts():
+    from hostfacts import HostFacts
+    facts = HostFacts(resolve_timeout=HOST_RESOLVE_TIMEOUT)
+    facts.refresh()
+    return facts
+
+def load_chromedriver():
+    """Import selenium and resolve the chromedriver path (may download it)"""
+    if not SELENIUM_AVAILABLE:
+        raise SubsystemUnavailable("selenium or webdriver_manager is not installed")
     from selenium import webdriver
     from selenium.webdriver.chrome.service import Service
     from webdriver_manager.chrome import ChromeDriverManager
-    from selenium.webdriver.common.by import By
-    SELENIUM_AVAILABLE = True
-except ImportError:
-    SELENIUM_AVAILABLE = False
-    print("Selenium not installed. Browser tab management will be limited.")
+    return {"webdriver": webdriver, "Service": Service, "path": ChromeDriverManager().install()}
 
-app = Flask(__name__, static_folder='static')
+subsystems.register("metrics", load_metrics_sampler)
+subsystems.register("processes", load_process_monitor)
+subsystems.register("host_facts", load_host_facts, ready_check=lambda facts: facts.ready)
+subsystems.register("chromedriver", load_chromedriver, required=False)
 
-# Browser driver
-browser = None
+# Local data (imported browser history, ...)
+DATA_DIR = os.getenv("ZENITH_DATA_DIR") or os.path.join(os.path.expanduser("~"), ".zenith")
 
-def initialize_browser():
-    """Initialize the browser if not already done"""
-    global browser
-    if browser is None and SELENIUM_AVAILABLE:
-        try:
-            print("Initializing browser...")
-            service = Service(ChromeDriverManager().install())
-            browser = webdriver.Chrome(service=service)
-            return True
-        except Exception as e:
-            print(f"Failed to initialize browser: {str(e)}")
-            return False
-    return browser is not None and SELENIUM_AVAILABLE
+# Browser history: Chrome/Chromium History files (every profile found, or
+# the os.pathsep-separated ZENITH_HISTORY_PATHS) are imported into a local
+# store in the background once a minute; requests read the store and only
+# wake the background sync early if it is stale
+HISTORY_DB = os.path.join(DATA_DIR, "history.db")
+HISTORY_SYNC_INTERVAL = 60
+HISTORY_SOURCES = os.getenv("ZENITH_HISTORY_PATHS", "").split(os.pathsep) if os.getenv("ZENITH_HISTORY_PATHS") else None
+
+def load_history_store():
+    from browser_history import HistoryStore
+    store = HistoryStore(HISTORY_DB, sources=HISTORY_SOURCES)
+    store.start(HISTORY_SYNC_INTERVAL)
+    return store
+
+subsystems.register("history", load_history_store, required=False)
+
+# Tab telemetry from the browser extension, kept for 90 days
+TELEMETRY_DIR = os.path.join(DATA_DIR, "telemetry")
+TELEMETRY_RETENTION_DAYS = 90
+
+def load_telemetry_store():
+    from telemetry import TelemetryStore
+    return TelemetryStore(TELEMETRY_DIR, retention_days=TELEMETRY_RETENTION_DAYS)
+
+subsystems.register("telemetry", load_telemetry_store, required=False)
+
+# Intent resolution: local fuzzy matching first, Gemini (GEMINI_API_KEY)
+# only for phrases that don't match any known command
+INTENT_LLM_MODEL = "gemini-1.5-flash"
+INTENT_LLM_TIMEOUT = 5
+
+def load_intent_llm():
+    """A Gemini client mapping a phrase to one of the known commands"""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise SubsystemUnavailable("GEMINI_API_KEY is not set")
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        raise SubsystemUnavailable("google-generativeai is not installed")
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(INTENT_LLM_MODEL)
+
+    def ask(phrase, commands):
+        prompt = ("Map the user's request to one of these commands, filling in any {placeholders} "
+                  "with words from the request. Reply with the command only, or NONE.\n"
+                  f"Commands: {'; '.join(commands)}\n"
+                  f"Request: {phrase}")
+        response = model.generate_content(prompt, request_options={"timeout": INTENT_LLM_TIMEOUT})
+        return response.text.strip()
+    return ask
+
+def ask_intent_llm(phrase, commands):
+    try:
+        llm = subsystems.get("intent_llm")
+    except SubsystemUnavailable:
+        return None
+    return llm(phrase, commands)
+
+def load_intent_resolver():
+    from intents import IntentResolver
+    return IntentResolver(llm=ask_intent_llm, cache_size=1024)
+
+subsystems.register("intents", load_intent_resolver, required=False)
+subsystems.register("intent_llm", load_intent_llm, required=False)
+
+# File watcher: the os.pathsep-separated ZENITH_WATCH_PATHS are loaded into
+# memory and kept current (inotify on Linux, otherwise every entry is
+# re-stat'ed 5 seconds after the previous polling pass ends). navigate,
+# search, folder size and list_files answer from memory inside them.
+# The index is snapshotted every 10 minutes and at exit; on startup the
+# snapshot answers at once while the tree is reconciled in the background.
+WATCH_ROOTS = [p for p in os.getenv("ZENITH_WATCH_PATHS", "").split(os.pathsep) if p]
+WATCH_BACKEND = os.getenv("ZENITH_WATCH_BACKEND", "auto")
+WATCH_POLL_INTERVAL = 5.0
+WATCH_SNAPSHOT = os.path.join(DATA_DIR, "fs-index.snap")
+WATCH_SNAPSHOT_INTERVAL = 600.0
+
+def load_fs_watcher():
+    if not WATCH_ROOTS:
+        raise SubsystemUnavailable("No watched folders; set ZENITH_WATCH_PATHS")
+    from fswatch import FsWatcher
+    watcher = FsWatcher(WATCH_ROOTS, backend=WATCH_BACKEND, poll_interval=WATCH_POLL_INTERVAL,
+                        snapshot_path=WATCH_SNAPSHOT, snapshot_interval=WATCH_SNAPSHOT_INTERVAL).start()
+    atexit.register(watcher.stop)
+    return watcher
+
+subsystems.register("watcher", load_fs_watcher, required=False)
+
+# Browser drivers: up to 2 Chrome sessions shared by all requests, each used
+# by one request at a time. Set ZENITH_BROWSER_HEADLESS=1 on servers.
+BROWSER_POOL_SIZE = 2
+BROWSER_CHECKOUT_TIMEOUT = 15.0
+BROWSER_HEADLESS = os.getenv("ZENITH_BROWSER_HEADLESS") == "1"
+
+def create_browser_driver():
+    """Start a Chrome session for the pool"""
+    print("Initializing browser...")
+    driver = subsystems.get("chromedriver")
+    options = driver["webdriver"].ChromeOptions()
+    if BROWSER_HEADLESS:
+        options.add_argument("--headless=new")
+    return driver["webdriver"].Chrome(service=driver["Service"](driver["path"]), options=options)
+
+browser_pool = DriverPool(create_browser_driver, size=BROWSER_POOL_SIZE, checkout_timeout=BROWSER_CHECKOUT_TIMEOUT)
+atexit.register(browser_pool.close)
+
+# Command execution: at most 4 concurrent jobs, 5 minute default timeout,
+# 1 MB of buffered output per job
+COMMAND_TIMEOUT = 300
+job_registry = JobRegistry(max_concurrent=4, default_timeout=COMMAND_TIMEOUT, max_output_bytes=1024 * 1024)
+
+# Terminal sessions: one shell per session id, closed after 15 idle minutes;
+# the same concurrency and output caps as command execution
+TERMINAL_COMMAND_TIMEOUT = 30
+terminal_sessions = SessionManager(idle_timeout=15 * 60, max_sessions=16, max_running=4,
+                                   max_output_bytes=1024 * 1024)
+# Without a POSIX shell (Windows) only each session's directory persists
+terminal_cwds = collections.OrderedDict()
+terminal_cwds_lock = threading.Lock()
+
+# Temp cleanup: plans are kept for 10 minutes, deletion uses 8 threads
+cleanup_planner = CleanupPlanner(workers=8, batch_size=256, plan_ttl=600)
+
+# Folder and wildcard deletion: 8 unlink threads, the last 50 tasks kept for status
+deletion_engine = DeletionEngine(workers=8, batch_size=256, max_tasks=50)
+
+# Tree walks (search, folder sizes, cleanup scans) stop after 10 seconds or
+# 500,000 entries unless the request asks otherwise, up to 60 seconds and
+# 5,000,000 entries, and return partial results with a cursor that is
+# valid for 10 minutes
+WALK_TIME_BUDGET = 10.0
+WALK_ENTRY_BUDGET = 500000
+WALK_MAX_TIME_BUDGET = 60.0
+WALK_MAX_ENTRY_BUDGET = 5000000
+walk_cursors = CursorStore(ttl=600, max_cursors=200)
 
 # File operations
 def list_drives():
@@ -59,10 +243,62 @@ def list_drives():
     result = {"status": "success", "message": "Available drives:", "drives": drives}
     return result
 
-def navigate_directory(path):
-    """Navigate through a directory and its contents"""
+def fs_model_for(path):
+    """The watcher's in-memory model (or its snapshot while loading) if it covers `path`, else None"""
+    watcher = subsystems.peek("watcher")
+    if watcher is None or not path:
+        return None
+    return watcher.index_for(path)
+
+def walk_budget(time_budget=None, max_entries=None):
+    """A walk budget from request parameters, capped at the server's limits"""
+    seconds = min(float(time_budget), WALK_MAX_TIME_BUDGET) if time_budget else WALK_TIME_BUDGET
+    entries = min(int(max_entries), WALK_MAX_ENTRY_BUDGET) if max_entries else WALK_ENTRY_BUDGET
+    return Budget(seconds, entries)
+
+def walk_progress(budget, done, cursor):
+    """Fields every budgeted walk response carries"""
+    return {
+        "partial": not done,
+        "cursor": cursor,
+        "stopped_by": None if done else budget.reason,
+        "entries_scanned": budget.used,
+        "elapsed": round(budget.elapsed, 3)
+    }
+
+def measure_folder(walk, budget):
+    """Add up file sizes along a walk until it finishes or the budget runs out"""
+    total = 0
+    for entry in walk.walk(budget):
+        try:
+            if not entry.is_dir():
+                total += entry.stat().st_size
+        except OSError:
+            continue
+    return total
+
+def navigate_directory(path, time_budget=None, max_entries=None, cursor=None):
+    """Navigate through a directory and its contents
+
+    Folder sizes share one walk budget; folders not measured when it runs
+    out have size None, and the cursor continues measuring them.
+    """
     try:
+        budget = walk_budget(time_budget, max_entries)
+        if cursor:
+            state = walk_cursors.take(cursor, "navigate_directory")
+            if state is None:
+                return {"status": "error", "message": "Unknown or expired cursor; navigate to the directory again."}
+            path = state["path"]
+        else:
+            state = {"path": path, "sizes": {}, "current": None}
+            model = fs_model_for(path)
+            listing = model.listing(path) if model else None
+            if listing is not None:
+                return navigate_from_model(path, listing, model.source)
+        
         items = os.listdir(path)
+        files_scanned.inc(len(items), operation="navigate_directory")
         folders = []
         files = []
         
@@ -73,7 +309,7 @@ def navigate_directory(path):
                     "name": item,
                     "type": "folder",
                     "path": item_path,
-                    "size": get_folder_size(item_path)
+                    "size": None
                 })
             else:
                 files.append({
@@ -85,29 +321,105 @@ def navigate_directory(path):
                     "modified": os.path.getmtime(item_path)
                 })
         
+        # Limit to 50 for UI performance; only the folders shown are measured
+        shown = folders[:50]
+        sizes = state["sizes"]
+        for folder in shown:
+            if folder["path"] in sizes:
+                folder["size"] = sizes[folder["path"]]
+                continue
+            if budget.exhausted():
+                continue
+            current = state["current"]
+            if current and current[0] == folder["path"]:
+                _, walk, total = current
+            else:
+                walk, total = TreeWalk(folder["path"]), 0
+            total += measure_folder(walk, budget)
+            if walk.done:
+                sizes[folder["path"]] = folder["size"] = total
+                state["current"] = None
+            else:
+                state["current"] = (folder["path"], walk, total)
+        files_scanned.inc(budget.used, operation="get_folder_size")
+        
+        done = all(folder["size"] is not None for folder in shown)
         result = {
             "status": "success",
             "path": path,
-            "folders": folders[:50],  # Limit to 50 for UI performance
+            "folders": shown,
             "files": files[:50],      # Limit to 50 for UI performance
             "total_folders": len(folders),
             "total_files": len(files)
         }
+        result.update(walk_progress(budget, done, None if done else walk_cursors.save("navigate_directory", state)))
         return result
     except Exception as e:
         return {"status": "error", "message": f"Error navigating directory: {str(e)}"}
 
-def get_folder_size(path):
+def navigate_from_model(path, listing, source="memory"):
+    """navigate_directory's result from the watcher's model"""
+    files_scanned.inc(len(listing), operation="navigate_directory")
+    folders = []
+    files = []
+    for name, is_dir, size, modified, _ in listing:
+        item_path = os.path.join(path, name)
+        if is_dir:
+            folders.append({"name": name, "type": "folder", "path": item_path, "size": size})
+        else:
+            files.append({
+                "name": name,
+                "type": "file",
+                "path": item_path,
+                "size": size,
+                "extension": os.path.splitext(name)[1].lower(),
+                "modified": modified
+            })
+    return {
+        "status": "success",
+        "path": path,
+        "folders": folders[:50],  # Limit to 50 for UI performance
+        "files": files[:50],      # Limit to 50 for UI performance
+        "total_folders": len(folders),
+        "total_files": len(files),
+        "partial": False,
+        "cursor": None,
+        "source": source
+    }
+
+def get_folder_size(path=None, time_budget=None, max_entries=None, cursor=None):
     """Calculate total size of a folder"""
-    total = 0
-    for dirpath, dirnames, filenames in os.walk(path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            try:
-                total += os.path.getsize(fp)
-            except:
-                continue
-    return total
+    try:
+        budget = walk_budget(time_budget, max_entries)
+        if cursor:
+            state = walk_cursors.take(cursor, "get_folder_size")
+            if state is None:
+                return {"status": "error", "message": "Unknown or expired cursor; measure the folder again."}
+            walk, total = state
+        else:
+            model = fs_model_for(path)
+            measured = model.folder_size(path) if model else None
+            if measured is not None:
+                return {"status": "success", "message": f"{path} is {measured[0] / (1024 ** 2):.2f} MB.",
+                        "path": path, "size": measured[0], "files": measured[1], "partial": False,
+                        "cursor": None, "source": model.source}
+            if not os.path.isdir(path):
+                return {"status": "error", "message": f"Folder {path} was not found."}
+            walk, total = TreeWalk(path), 0
+        
+        total += measure_folder(walk, budget)
+        files_scanned.inc(budget.used, operation="get_folder_size")
+        
+        cursor = None if walk.done else walk_cursors.save("get_folder_size", (walk, total))
+        if walk.done:
+            message = f"{walk.root} is {total / (1024 ** 2):.2f} MB."
+        else:
+            message = f"{walk.root} is at least {total / (1024 ** 2):.2f} MB; resume with the cursor to keep counting."
+        result = {"status": "success", "message": message, "path": walk.root, "size": total}
+        result.update(walk_progress(budget, walk.done, cursor))
+        return result
+    except Exception as e:
+        return {"status": "error", "message": f"Error calculating folder size: {str(e)}"}
 
 def open_file(file_path):
     """Open a file with the default application"""
@@ -120,30 +432,63 @@ def open_file(file_path):
     except Exception as e:
         return {"status": "error", "message": f"Could not open file: {str(e)}"}
 
-def search_for_file(file_name, path=None):
-    """Search all drives for a specific file"""
+def search_for_file(file_name=None, path=None, time_budget=None, max_entries=None, cursor=None):
+    """Search all drives for a specific file
+
+    Stops after 50 matches or when the walk budget runs out; the cursor
+    continues the same walk for more results.
+    """
     try:
-        search_path = path if path else os.getcwd()
+        budget = walk_budget(time_budget, max_entries)
+        if cursor:
+            state = walk_cursors.take(cursor, "search_for_file")
+            if state is None:
+                return {"status": "error", "message": "Unknown or expired cursor; start the search again."}
+            walk, pattern, file_name, found = state
+        else:
+            search_path = path if path else os.getcwd()
+            pattern = re.compile(file_name.replace('*', '.*'), re.IGNORECASE)
+            model = fs_model_for(search_path)
+            found = model.search(pattern, search_path, limit=50) if model else None
+            if found is not None:
+                if not found:
+                    return {"status": "error", "message": f"No files found matching '{file_name}'."}
+                return {"status": "success", "message": f"Found {len(found)} files matching '{file_name}'.",
+                        "files": [{"name": os.path.basename(p), "path": p, "size": s} for p, s in found],
+                        "total_found": len(found), "partial": False, "cursor": None, "source": model.source}
+            walk = TreeWalk(search_path)
+            found = 0
         matches = []
         
-        for root, _, files in os.walk(search_path):
-            for file in files:
-                if re.search(file_name.replace('*', '.*'), file, re.IGNORECASE):
-                    matches.append({
-                        "name": file,
-                        "path": os.path.join(root, file),
-                        "size": os.path.getsize(os.path.join(root, file))
-                    })
-                    # Limit results to prevent excessive processing
-                    if len(matches) >= 50:
-                        break
+        for entry in walk.walk(budget):
+            try:
+                if entry.is_dir() or not pattern.search(entry.name):
+                    continue
+                matches.append({
+                    "name": entry.name,
+                    "path": entry.path,
+                    "size": entry.stat().st_size
+                })
+            except OSError:
+                continue
+            # Limit results to prevent excessive processing
             if len(matches) >= 50:
                 break
+        files_scanned.inc(budget.used, operation="search_for_file")
         
-        if not matches:
+        found += len(matches)
+        cursor = None if walk.done else walk_cursors.save("search_for_file", (walk, pattern, file_name, found))
+        if not found and walk.done:
             return {"status": "error", "message": f"No files found matching '{file_name}'."}
         
-        return {"status": "success", "message": f"Found {len(matches)} files matching '{file_name}'.", "files": matches}
+        message = f"Found {len(matches)} files matching '{file_name}'."
+        if not walk.done:
+            message += " The search isn't finished; resume with the cursor for more."
+        result = {"status": "success", "message": message, "files": matches, "total_found": found}
+        result.update(walk_progress(budget, walk.done, cursor))
+        if len(matches) >= 50 and not walk.done:
+            result["stopped_by"] = "matches"
+        return result
     except Exception as e:
         return {"status": "error", "message": f"Error searching for files: {str(e)}"}
 
@@ -163,19 +508,33 @@ def create_file(filename, directory=None, content=None):
     except Exception as e:
         return {"status": "error", "message": f"Error creating file: {str(e)}"}
 
-def delete_file(filename, directory=None):
+def deletion_result(task, description):
+    """Response for a deletion task, finished or still running in the background"""
+    result = task.as_dict()
+    if not task.done:
+        result.update({"status": "success", "message": f"Deleting {description} in the background."})
+    elif task.status == "failed" or task.failed:
+        result.update({"status": "error", "message": f"Could not fully delete {description}: "
+                       f"{task.failed} entries failed ({(list(task.errors) or ['unknown error'])[-1]})."})
+    else:
+        result.update({"status": "success", "message": f"Deleted {description}."})
+    return result
+
+def delete_file(filename, directory=None, background=False):
     """Delete a file"""
     try:
         filepath = os.path.join(directory, filename) if directory else filename
         
         if '*' in filepath:
-            matching_files = glob.glob(filepath)
-            if not matching_files:
+            matching_files = glob.iglob(filepath)
+            first = next(matching_files, None)
+            if first is None:
                 return {"status": "error", "message": f"No files found matching {filepath}"}
             
-            for file in matching_files:
-                os.remove(file)
-            return {"status": "success", "message": f"Deleted {len(matching_files)} files matching {filepath}"}
+            task = deletion_engine.delete_files(itertools.chain([first], matching_files), filepath,
+                                                wait=not background)
+            return deletion_result(task, f"{task.files_deleted} files matching {filepath}" if task.done
+                                   else f"files matching {filepath}")
         else:
             if os.path.exists(filepath):
                 os.remove(filepath)
@@ -188,7 +547,11 @@ def delete_file(filename, directory=None):
 def list_files(directory=".", pattern="*"):
     """List files in a directory"""
     try:
-        files = glob.glob(os.path.join(directory, pattern))
+        model = fs_model_for(directory) if '/' not in pattern and os.sep not in pattern else None
+        files = model.glob(directory, pattern) if model else None
+        if files is None:
+            files = glob.glob(os.path.join(directory, pattern))
+        files_scanned.inc(len(files), operation="list_files")
         
         if files:
             return {"status": "success", "message": f"Found {len(files)} files.", "files": files}
@@ -207,7 +570,7 @@ def create_folder(folder_name, directory=None):
     except Exception as e:
         return {"status": "error", "message": f"Error creating folder: {str(e)}"}
 
-def delete_folder(folder_name, directory=None):
+def delete_folder(folder_name, directory=None, background=False):
     """Delete a folder"""
     try:
         folderpath = os.path.join(directory, folder_name) if directory else folder_name
@@ -215,11 +578,32 @@ def delete_folder(folder_name, directory=None):
         if not os.path.exists(folderpath):
             return {"status": "error", "message": f"Folder {folder_name} was not found."}
         
-        shutil.rmtree(folderpath)
-        return {"status": "success", "message": f"Folder {folder_name} has been deleted."}
+        task = deletion_engine.delete_tree(folderpath, wait=not background)
+        result = deletion_result(task, f"folder {folder_name}")
+        if task.done and result["status"] == "success":
+            result["message"] = f"Folder {folder_name} has been deleted ({task.files_deleted} files, {task.dirs_deleted} folders)."
+        return result
     except Exception as e:
         return {"status": "error", "message": f"Error deleting folder: {str(e)}"}
 
+def deletion_status(task_id):
+    """Get a deletion task's progress"""
+    task = deletion_engine.get(task_id)
+    if task is None:
+        return {"status": "error", "message": f"No deletion task {task_id}"}
+    result = task.as_dict()
+    result["status"] = "success"
+    return result
+
+def cancel_deletion(task_id):
+    """Stop a background deletion; whatever is already deleted stays deleted"""
+    task = deletion_engine.cancel(task_id)
+    if task is None:
+        return {"status": "error", "message": f"No deletion task {task_id}"}
+    result = task.as_dict()
+    result.update({"status": "success", "message": f"Deletion {task_id} is {'cancelling' if not task.done else task.status}"})
+    return result
+
 def organize_files(directory="."):
     """Organize files in a directory based on extension"""
     try:
@@ -232,23 +616,31 @@ def organize_files(directory="."):
             return {"status": "error", "message": f"No files found in {directory}."}
         
         organized = 0
-        for file in files:
-            _, ext = os.path.splitext(file)
-            ext = ext[1:].lower()
-            if not ext:
-                ext = "no_extension"
-            
-            ext_folder = os.path.join(directory, ext)
-            os.makedirs(ext_folder, exist_ok=True)
-            
-            src_path = os.path.join(directory, file)
-            dst_path = os.path.join(ext_folder, file)
-            
-            if os.path.dirname(src_path) == ext_folder:
-                continue
+        organized_bytes = 0
+        try:
+            for file in files:
+                _, ext = os.path.splitext(file)
+                ext = ext[1:].lower()
+                if not ext:
+                    ext = "no_extension"
+                
+                ext_folder = os.path.join(directory, ext)
+                os.makedirs(ext_folder, exist_ok=True)
                 
-            shutil.move(src_path, dst_path)
-            organized += 1
+                src_path = os.path.join(directory, file)
+                dst_path = os.path.join(ext_folder, file)
+                
+                if os.path.dirname(src_path) == ext_folder:
+                    continue
+                    
+                size = os.path.getsize(src_path)
+                shutil.move(src_path, dst_path)
+                organized += 1
+                organized_bytes += size
+        finally:
+            # One update per call; files moved before an error still count
+            files_moved.inc(organized, operation="organize_files")
+            bytes_moved.inc(organized_bytes, operation="organize_files")
         
         return {"status": "success", "message": f"Organized {organized} files in {directory} by file extension."}
     except Exception as e:
@@ -279,7 +671,10 @@ def move_item(item_name, destination, source=None):
         os.makedirs(destination, exist_ok=True)
         
         dst_path = os.path.join(destination, os.path.basename(src_path))
+        size = os.path.getsize(src_path) if os.path.isfile(src_path) else 0
         shutil.move(src_path, dst_path)
+        files_moved.inc(operation="move_item")
+        bytes_moved.inc(size, operation="move_item")
         return {"status": "success", "message": f"Successfully moved {item_name} to {destination}."}
     except Exception as e:
         return {"status": "error", "message": f"Error moving: {str(e)}"}
@@ -297,6 +692,50 @@ def upload_file(file, destination):
     except Exception as e:
         return {"status": "error", "message": f"Error uploading file: {str(e)}"}
 
+# Bulk file operations: up to 10,000 per request, independent ones on 8 threads
+BATCH_WORKERS = 8
+BATCH_MAX_OPERATIONS = 10000
+batch_runner = BatchRunner({
+    "create_file": create_file,
+    "delete_file": delete_file,
+    "create_folder": create_folder,
+    "delete_folder": delete_folder,
+    "rename_item": rename_item,
+    "move_item": move_item,
+}, workers=BATCH_WORKERS, max_operations=BATCH_MAX_OPERATIONS)
+
+def run_batch(operations, stop_on_error=False):
+    """Run a validated batch of file operations and return every result in order"""
+    try:
+        results, summary = batch_runner.run(operations, stop_on_error)
+        result = {
+            "status": "success" if not summary["failed"] and not summary["skipped"] else "error",
+            "message": f"Ran {summary['total']} operations: {summary['succeeded']} succeeded, "
+                       f"{summary['failed']} failed, {summary['skipped']} skipped.",
+            "results": results
+        }
+        result.update(summary)
+        return result
+    except Exception as e:
+        return {"status": "error", "message": f"Error running batch: {str(e)}"}
+
+def stream_batch_events(operations, stop_on_error=False, fmt="sse"):
+    """Progress of a batch as server-sent events or NDJSON, one result per completed operation"""
+    started = time.time()
+    results = []
+    for result in batch_runner.iter_run(operations, stop_on_error):
+        results.append(result)
+        progress = {"done": len(results), "total": len(operations)}
+        if fmt == "ndjson":
+            yield json.dumps(dict(result, **progress)) + "\n"
+        else:
+            yield f"id: {len(results)}\nevent: result\ndata: {json.dumps(dict(result, **progress))}\n\n"
+    summary = batch_runner.summary(results, time.time() - started)
+    if fmt == "ndjson":
+        yield json.dumps(dict(summary, event="end")) + "\n"
+    else:
+        yield f"event: end\ndata: {json.dumps(summary)}\n\n"
+
 # Browser operations
 def open_browser_func():
     """Open a new browser window"""
@@ -304,9 +743,14 @@ def open_browser_func():
         webbrowser.open("https://www.google.com")
         return {"status": "success", "message": "Opened browser window."}
     
-    if initialize_browser():
-        return {"status": "success", "message": "Browser opened successfully."}
-    else:
+    try:
+        # Starts a pooled session if none is running yet
+        with browser_pool.checkout():
+            return {"status": "success", "message": "Browser opened successfully."}
+    except PoolTimeout as e:
+        return {"status": "error", "message": f"Browser busy: {str(e)}"}
+    except Exception as e:
+        print(f"Failed to initialize browser: {str(e)}")
         webbrowser.open("https://www.google.com")
         return {"status": "success", "message": "Opened regular browser window."}
 
@@ -316,62 +760,151 @@ def open_website(website):
         if not website.startswith(('http://', 'https://')):
             website = f"https://{website}"
         
-        if initialize_browser():
-            browser.execute_script(f"window.open('{website}');")
-            return {"status": "success", "message": f"Opened {website} in a new tab."}
-        else:
-            webbrowser.open(website)
-            return {"status": "success", "message": f"Opened {website} in your default browser."}
+        if SELENIUM_AVAILABLE:
+            try:
+                with browser_pool.checkout() as driver:
+                    driver.execute_script("window.open(arguments[0]);", website)
+                return {"status": "success", "message": f"Opened {website} in a new tab."}
+            except PoolTimeout as e:
+                return {"status": "error", "message": f"Browser busy: {str(e)}"}
+            except Exception as e:
+                print(f"Browser automation failed: {str(e)}")
+        webbrowser.open(website)
+        return {"status": "success", "message": f"Opened {website} in your default browser."}
     except Exception as e:
         return {"status": "error", "message": f"Error opening website: {str(e)}"}
 
-def get_browser_history():
-    """Get browser history (simulated)"""
+def get_browser_history(offset=0, limit=50, domain=None):
+    """Get browser history, most recently visited first"""
     try:
-        history = [
-            {"url": "https://www.google.com", "title": "Google", "visit_count": 42, "last_visit": time.time()},
-            {"url": "https://github.com", "title": "GitHub", "visit_count": 15, "last_visit": time.time() - 3600},
-            {"url": "https://stackoverflow.com", "title": "Stack Overflow", "visit_count": 28, "last_visit": time.time() - 7200}
-        ]
-        return {"status": "success", "history": history}
+        store = subsystems.get("history")
+        store.ensure_fresh(HISTORY_SYNC_INTERVAL)
+        page = store.page(offset=offset, limit=limit, domain=domain)
+        return {
+            "status": "success",
+            "history": page["history"],
+            "total": page["total"],
+            "offset": offset,
+            "limit": limit
+        }
     except Exception as e:
         return {"status": "error", "message": f"Error getting browser history: {str(e)}"}
 
+def search_browser_history(query="", since=None, until=None, domain=None, limit=20):
+    """Search browser history titles and URLs
+
+    `query` may carry site:, since: and until: operators; explicit
+    arguments win over them. Times are unix timestamps or durations ago
+    ("24h", "7d").
+    """
+    try:
+        from browser_history import parse_search_operators, parse_time
+        text, operators = parse_search_operators(query)
+        since = since or operators.get("since")
+        until = until or operators.get("until")
+        domain = domain or operators.get("domain")
+
+        store = subsystems.get("history")
+        store.ensure_fresh(HISTORY_SYNC_INTERVAL)
+        started = time.perf_counter()
+        results = store.search(text, since=parse_time(since), until=parse_time(until), domain=domain, limit=limit)
+        return {
+            "status": "success",
+            "query": text,
+            "results": results,
+            "count": len(results),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid time filter: {str(e)}"}
+    except Exception as e:
+        return {"status": "error", "message": f"Error searching browser history: {str(e)}"}
+
+def sync_browser_history():
+    """Import new visits from the browser's history now"""
+    try:
+        store = subsystems.get("history")
+        imported = store.sync()
+        return {"status": "success", "message": f"Imported {sum(imported.values())} visits",
+                "imported": imported, "sources": store.source_status()}
+    except Exception as e:
+        return {"status": "error", "message": f"Error syncing browser history: {str(e)}"}
+
+# Intents
+def resolve_intent(text, use_llm=True):
+    """Map a spoken or typed phrase to a browser or operator command"""
+    try:
+        result = subsystems.get("intents").resolve(text, use_llm=use_llm)
+        return dict(result, status="success")
+    except Exception as e:
+        return {"status": "error", "message": f"Error resolving intent: {str(e)}"}
+
+# Extension telemetry
+def ingest_telemetry(body, encoding=None):
+    """Store a (possibly compressed) batch of tab events from the extension"""
+    try:
+        from telemetry import TelemetryError, decode_batch
+        try:
+            events = decode_batch(body, encoding)
+        except TelemetryError as e:
+            return {"status": "error", "message": str(e)}
+        result = subsystems.get("telemetry").ingest(events)
+        return {"status": "success", "accepted": result["accepted"], "rejected": result["rejected"]}
+    except Exception as e:
+        return {"status": "error", "message": f"Error storing telemetry: {str(e)}"}
+
+def get_telemetry_rollup(granularity="hour", since=None, until=None):
+    """Hourly or daily tab activity as columns of values"""
+    try:
+        from browser_history import parse_time
+        if granularity not in ("hour", "day"):
+            return {"status": "error", "message": "granularity must be 'hour' or 'day'"}
+        series = subsystems.get("telemetry").rollup(granularity, since=parse_time(since), until=parse_time(until))
+        return {"status": "success", "granularity": granularity, "count": len(series["time"]), "series": series}
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid time filter: {str(e)}"}
+    except Exception as e:
+        return {"status": "error", "message": f"Error getting telemetry: {str(e)}"}
+
+def get_telemetry_domains(since=None, until=None, limit=20, sort="active_seconds"):
+    """Most used domains by time in front, activations or navigations"""
+    try:
+        from browser_history import parse_time
+        if sort not in ("active_seconds", "activations", "navigations", "last_seen"):
+            return {"status": "error", "message": f"Unknown sort '{sort}'"}
+        domains = subsystems.get("telemetry").top_domains(since=parse_time(since), until=parse_time(until),
+                                                          limit=limit, sort=sort)
+        return {"status": "success", "domains": domains}
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid time filter: {str(e)}"}
+    except Exception as e:
+        return {"status": "error", "message": f"Error getting telemetry: {str(e)}"}
+
 # System operations
+def get_metrics_sampler():
+    """Return the metrics sampler, starting it on first use"""
+    return subsystems.get("metrics")
+
 def show_system_info():
     """Show system information"""
     try:
-        system_info = {
-            "system": platform.system(),
-            "node": platform.node(),
-            "release": platform.release(),
-            "version": platform.version(),
-            "machine": platform.machine(),
-            "processor": platform.processor(),
-            "python_version": platform.python_version(),
-            "platform": platform.platform(),
-            "hostname": socket.gethostname(),
-            "ip_address": socket.gethostbyname(socket.gethostname()),
-            "mac_address": ':'.join(re.findall('..', '%012x' % uuid.getnode()))
-        }
+        system_info = subsystems.get("host_facts").get()
         
         try:
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            cpu_usage = psutil.cpu_percent(interval=1)
+            sampler = get_metrics_sampler()
+            sample = sampler.latest(wait=sampler.interval * 2)
+            if sample is None:
+                raise RuntimeError("no metrics sampled yet")
             
             system_info.update({
-                "memory_total": f"{memory.total / (1024 ** 3):.2f} GB",
-                "memory_used": f"{memory.used / (1024 ** 3):.2f} GB",
-                "memory_free": f"{memory.available / (1024 ** 3):.2f} GB",
-                "memory_used_percent": f"{memory.percent}%",
-                "disk_total": f"{disk.total / (1024 ** 3):.2f} GB",
-                "disk_used": f"{disk.used / (1024 ** 3):.2f} GB",
-                "disk_free": f"{disk.free / (1024 ** 3):.2f} GB",
-                "disk_used_percent": f"{disk.percent}%",
-                "cpu_cores": psutil.cpu_count(),
-                "cpu_usage": f"{cpu_usage}%",
-                "boot_time": datetime.datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
+                "memory_used": f"{sample['memory_used'] / (1024 ** 3):.2f} GB",
+                "memory_free": f"{sample['memory_available'] / (1024 ** 3):.2f} GB",
+                "memory_used_percent": f"{sample['memory_percent']}%",
+                "disk_used": f"{sample['disk_used'] / (1024 ** 3):.2f} GB",
+                "disk_free": f"{sample['disk_free'] / (1024 ** 3):.2f} GB",
+                "disk_used_percent": f"{sample['disk_percent']}%",
+                "cpu_usage": f"{sample['cpu_percent']}%",
+                "sampled_at": sample["time"]
             })
         except Exception as e:
             system_info["note"] = f"Extended system info error: {str(e)}"
@@ -380,73 +913,308 @@ def show_system_info():
     except Exception as e:
         return {"status": "error", "message": f"Error getting system info: {str(e)}"}
 
-def get_running_processes():
+def refresh_host_facts(wait=False):
+    """Recompute static host facts"""
+    try:
+        host_facts = subsystems.get("host_facts")
+        host_facts.refresh(wait=wait)
+        if wait:
+            return {"status": "success", "message": "Host facts refreshed", "info": host_facts.get()}
+        return {"status": "success", "message": "Host facts refresh started"}
+    except Exception as e:
+        return {"status": "error", "message": f"Error refreshing host facts: {str(e)}"}
+
+def get_system_metrics_history(minutes=5):
+    """Get recent system metrics as columns of values"""
+    try:
+        sampler = get_metrics_sampler()
+        series = sampler.series(seconds=minutes * 60)
+        return {
+            "status": "success",
+            "interval": sampler.interval,
+            "count": len(series["time"]),
+            "columns": list(sampler.FIELDS),
+            "series": series
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Error getting metrics history: {str(e)}"}
+
+def get_running_processes(sort="cpu", order="desc", top=None, name=None, user=None, offset=0, limit=50):
     """Get list of running processes"""
     try:
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'username', 'cpu_percent', 'memory_percent']):
-            processes.append(proc.info)
+        process_monitor = subsystems.get("processes")
+        process_monitor.ensure_fresh()
         
-        return {"status": "success", "processes": processes[:50]}  # Limit to 50 for performance
+        result = process_monitor.query(sort=sort, descending=(order != "asc"), top=top,
+                                       name=name, user=user, offset=offset, limit=limit)
+        return {
+            "status": "success",
+            "processes": result["processes"],
+            "total": result["total"],
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "order": order,
+            "generation": process_monitor.polls
+        }
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
     except Exception as e:
         return {"status": "error", "message": f"Error getting processes: {str(e)}"}
 
-def cleanup_system():
-    """Clean up temporary files"""
+def cleanup_system(min_age=None, min_size=None, max_size=None, patterns=None, exclude=None,
+                   time_budget=None, max_entries=None, cursor=None):
+    """Scan the temp directory and cache a cleanup plan
+
+    A scan that runs out of budget returns the plan so far; passing its
+    plan_id as the cursor continues the scan.
+    """
     try:
         import tempfile
         
         temp_dir = tempfile.gettempdir()
-        total_files = sum(len(files) for _, _, files in os.walk(temp_dir))
+        budget = walk_budget(time_budget, max_entries)
+        if cursor:
+            plan = cleanup_planner.get(cursor)
+            if plan is None:
+                return {"status": "error", "message": f"No cleanup plan {cursor}; run cleanup_check again"}
+            scanned = plan.scanned
+            cleanup_planner.resume(plan, budget)
+        else:
+            scanned = 0
+            plan = cleanup_planner.scan(temp_dir, min_age=min_age, min_size=min_size, max_size=max_size,
+                                        patterns=patterns, exclude=exclude, budget=budget)
+        files_scanned.inc(plan.scanned - scanned, operation="cleanup_check")
+        total_files = len(plan.files)
         
         # Statistics only, no actual deletion
-        return {
+        result = plan.as_dict(include_files=20)
+        if plan.scan_complete:
+            message = f"Found {total_files} files ({plan.total_bytes / (1024 ** 2):.2f} MB) to clean up in temporary directory."
+            note = "Use confirm_cleanup endpoint with this plan_id to actually delete files"
+        else:
+            message = f"Found {total_files} files ({plan.total_bytes / (1024 ** 2):.2f} MB) so far; the scan isn't finished."
+            note = "Call cleanup_check again with this cursor to finish the scan before confirming"
+        result.update({
             "status": "success", 
-            "message": f"Found {total_files} files in temporary directory.",
-            "temp_dir": temp_dir,
-            "total_files": total_files,
-            "note": "Use confirm_cleanup endpoint to actually delete files"
-        }
+            "message": message,
+            "temp_dir": plan.root,
+            "note": note
+        })
+        result.update(walk_progress(budget, plan.scan_complete, None if plan.scan_complete else plan.id))
+        return result
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
     except Exception as e:
         return {"status": "error", "message": f"Error during system cleanup check: {str(e)}"}
 
-def confirm_cleanup():
-    """Actually perform the temporary file cleanup"""
+def confirm_cleanup(plan_id=None, max_per_second=None, wait=None, time_budget=None, max_entries=None):
+    """Actually perform the temporary file cleanup
+
+    Without a plan_id the temp directory is scanned within the usual walk
+    budget and, if the scan finishes, cleaned synchronously as before; if
+    it doesn't, nothing is deleted and the plan comes back as a cursor for
+    cleanup_check. With a plan_id, the cached plan is executed in the
+    background unless `wait` is set; poll cleanup_status for progress.
+    """
     try:
-        import tempfile
-        
-        temp_dir = tempfile.gettempdir()
-        deleted = 0
-        for root, dirs, files in os.walk(temp_dir):
-            for file in files:
-                try:
-                    file_path = os.path.join(root, file)
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-                        deleted += 1
-                except:
-                    pass
+        if plan_id:
+            plan = cleanup_planner.get(plan_id)
+            if plan is None:
+                return {"status": "error", "message": f"No cleanup plan {plan_id}; run cleanup_check again"}
+        else:
+            import tempfile
+            budget = walk_budget(time_budget, max_entries)
+            plan = cleanup_planner.scan(tempfile.gettempdir(), budget=budget)
+            files_scanned.inc(plan.scanned, operation="confirm_cleanup")
+            if not plan.scan_complete:
+                result = plan.as_dict()
+                result.update({
+                    "status": "success",
+                    "message": "The temp directory scan isn't finished; nothing was deleted.",
+                    "note": "Call cleanup_check with this cursor to finish the scan, then confirm_cleanup with the plan_id"
+                })
+                result.update(walk_progress(budget, False, plan.id))
+                return result
+            wait = True if wait is None else wait
         
-        return {"status": "success", "message": f"Cleanup complete. Deleted {deleted} temporary files."}
+        cleanup_planner.execute(plan, max_per_second=max_per_second, wait=bool(wait))
+        result = plan.as_dict()
+        if plan.status == "running":
+            result.update({"status": "success", "message": f"Cleanup of {len(plan.files)} files started."})
+        else:
+            result.update({"status": "success", "message": f"Cleanup complete. Deleted {plan.deleted} temporary files."})
+        return result
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
     except Exception as e:
         return {"status": "error", "message": f"Error during system cleanup: {str(e)}"}
 
-def execute_command(command):
-    """Execute a system command"""
+def cleanup_status(plan_id):
+    """Get a cleanup plan's progress"""
+    plan = cleanup_planner.get(plan_id)
+    if plan is None:
+        return {"status": "error", "message": f"No cleanup plan {plan_id}"}
+    result = plan.as_dict()
+    result["status"] = "success"
+    result["state"] = plan.status
+    return result
+
+def execute_command(command, timeout=None, cwd=None):
+    """Execute a system command and wait for it to finish"""
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        return {
+        job = job_registry.submit(command, timeout=timeout, cwd=cwd)
+        job.wait()
+        if job.status == "failed":
+            return {"status": "error", "message": f"Error executing command: {job.error}"}
+        result = {
             "status": "success",
             "command": command,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode
+            "stdout": job.output("stdout"),
+            "stderr": job.output("stderr"),
+            "returncode": job.returncode
         }
+        if job.status == "timeout":
+            result["stderr"] += f"\nCommand timed out after {job.timeout} seconds"
+        # The dropped chunks may have come from either stream, so this is
+        # reported alongside the output rather than spliced into it
+        result["dropped"] = job.dropped
+        result["dropped_bytes"] = job.total_bytes - job.buffered_bytes
+        result["truncated"] = result["dropped"] > 0
+        return result
+    except JobLimitError as e:
+        return {"status": "error", "message": str(e)}
     except Exception as e:
         return {"status": "error", "message": f"Error executing command: {str(e)}"}
 
+def start_job(command, timeout=None):
+    """Start a command in the background and return its job id"""
+    try:
+        job = job_registry.submit(command, timeout=timeout)
+        if job.status == "failed":
+            return {"status": "error", "message": f"Error starting command: {job.error}", "job": job.as_dict()}
+        return {"status": "success", "message": f"Started job {job.id}", "job": job.as_dict()}
+    except JobLimitError as e:
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        return {"status": "error", "message": f"Error starting command: {str(e)}"}
+
+def get_job(job_id, since=0):
+    """Get a job's status and any output numbered >= since"""
+    job = job_registry.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"No job with id {job_id}"}
+    chunks, next_seq, dropped = job.read(since)
+    return {
+        "status": "success",
+        "job": job.as_dict(),
+        "output": [{"seq": seq, "stream": stream, "text": text} for seq, stream, text in chunks],
+        "next_seq": next_seq,
+        "dropped": dropped
+    }
+
+def cancel_job(job_id):
+    """Cancel a running job"""
+    job = job_registry.cancel(job_id)
+    if job is None:
+        return {"status": "error", "message": f"No job with id {job_id}"}
+    return {"status": "success", "message": f"Job {job_id} is {job.status}", "job": job.as_dict()}
+
+def stream_job_events(job_id, since=0):
+    """Server-sent events for a job's output"""
+    for kind, payload in job_registry.stream(job_id, since):
+        if kind == "output":
+            seq, stream, text = payload
+            yield f"id: {seq}\nevent: {stream}\ndata: {json.dumps(text)}\n\n"
+        elif kind == "dropped":
+            yield f"event: dropped\ndata: {payload}\n\n"
+        elif kind == "heartbeat":
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: end\ndata: {json.dumps(payload.as_dict())}\n\n"
+
+def stream_fs_events(watcher, since=0):
+    """Server-sent events for changes under the watched folders"""
+    while True:
+        events, since, dropped = watcher.model.events.wait(since, timeout=15)
+        if dropped:
+            yield f"event: dropped\ndata: {dropped}\n\n"
+        if not events:
+            yield ": keep-alive\n\n"
+        for event in events:
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def stream_job_text(job_id, since=0):
+    """Plain chunked output for a job (stdout and stderr interleaved)"""
+    for kind, payload in job_registry.stream(job_id, since):
+        if kind == "output":
+            yield payload[2]
+        elif kind == "dropped":
+            yield f"\n[{payload} output chunks dropped]\n"
+        elif kind == "end":
+            yield f"\n[job {payload.id} {payload.status}, exit code {payload.returncode}]\n"
+
 # Terminal operations
-def handle_terminal_command(command):
+def run_in_terminal_session(command, session_id):
+    """Run a command in the session's own shell (cwd and environment persist per session)"""
+    if os.name != 'posix':
+        return run_in_directory_session(command, session_id)
+    try:
+        result = terminal_sessions.run(session_id, command, timeout=TERMINAL_COMMAND_TIMEOUT)
+    except (SessionTimeout, SessionLimitError) as e:
+        return {"status": "error", "output": str(e), "session_id": session_id}
+    dropped = result["dropped"]
+    return {
+        "status": "success" if result["returncode"] == 0 else "error",
+        "command": command,
+        "output": result["stdout"] + result["stderr"],
+        "stdout": result["stdout"],
+        "stderr": result["stderr"],
+        "returncode": result["returncode"],
+        "cwd": result["cwd"],
+        "dropped_bytes": dropped,
+        "truncated": any(dropped.values()),
+        "session_id": session_id
+    }
+
+def run_in_directory_session(command, session_id):
+    """Fallback for hosts without /bin/sh: cd, pwd and ls are built in, anything else runs in the session's directory"""
+    with terminal_cwds_lock:
+        cwd = terminal_cwds.pop(session_id, None) or os.getcwd()
+        terminal_cwds[session_id] = cwd
+        while len(terminal_cwds) > terminal_sessions.max_sessions:
+            terminal_cwds.popitem(last=False)
+    result = {"command": command, "stdout": "", "stderr": "", "returncode": 0, "session_id": session_id}
+    name, _, argument = command.strip().partition(' ')
+    argument = argument.strip().strip('"')
+    if name.lower() in ('cd', 'chdir') and argument:
+        new_dir = os.path.normpath(os.path.join(cwd, os.path.expanduser(argument)))
+        if os.path.isdir(new_dir):
+            with terminal_cwds_lock:
+                terminal_cwds[session_id] = cwd = new_dir
+            result["stdout"] = f"Changed directory to {new_dir}"
+        else:
+            result.update({"stderr": f"Error changing directory: {argument} is not a directory", "returncode": 1})
+    elif name.lower() in ('pwd', 'cd', 'chdir'):
+        result["stdout"] = cwd
+    elif name.lower() == 'ls' and not argument.startswith('-'):
+        try:
+            result["stdout"] = "\n".join(sorted(os.listdir(os.path.join(cwd, argument))))
+        except OSError as e:
+            result.update({"stderr": f"Error listing directory: {str(e)}", "returncode": 1})
+    else:
+        executed = execute_command(command, timeout=TERMINAL_COMMAND_TIMEOUT, cwd=cwd)
+        if "returncode" not in executed:
+            return {"status": "error", "output": executed["message"], "session_id": session_id}
+        result.update({key: executed[key] for key in ("stdout", "stderr", "returncode")})
+    result.update({
+        "status": "success" if result["returncode"] == 0 else "error",
+        "output": result["stdout"] + result["stderr"],
+        "cwd": cwd
+    })
+    return result
+
+def handle_terminal_command(command, session_id='default'):
     """Handle terminal commands"""
     try:
         if command.lower() == 'help':
@@ -460,7 +1228,7 @@ def handle_terminal_command(command):
                          "pwd - Show current directory\n"
                          "sysinfo - Show system information\n"
                          "processes - Show running processes\n"
-                         "history - Show browser history\n"
+                         "history [words] [site:x] [since:7d] - Show or search browser history\n"
             }
         elif command.lower() == 'sysinfo':
             info = show_system_info()
@@ -475,38 +1243,21 @@ def handle_terminal_command(command):
                 "output": "\n".join([f"{p['pid']}: {p['name']} (CPU: {p['cpu_percent']}%, MEM: {p['memory_percent']}%)" 
                           for p in processes["processes"]])
             }
-        elif command.lower().startswith('cd '):
-            new_dir = command[3:].strip()
-            try:
-                os.chdir(new_dir)
-                return {
-                    "status": "success",
-                    "output": f"Changed directory to {os.getcwd()}"
-                }
-            except Exception as e:
-                return {
-                    "status": "error",
-                    "output": f"Error changing directory: {str(e)}"
-                }
-        elif command.lower() == 'pwd':
-            return {
-                "status": "success",
-                "output": os.getcwd()
-            }
-        elif command.lower() == 'ls':
-            files = os.listdir()
-            return {
-                "status": "success",
-                "output": "\n".join(files)
-            }
-        elif command.lower() == 'history':
-            history = get_browser_history()
+        elif command.lower() == 'history' or command.lower().startswith('history '):
+            query = command[len('history'):].strip()
+            if query:
+                history = search_browser_history(query)
+                entries = history["results"]
+            else:
+                history = get_browser_history(limit=20)
+                entries = history["history"]
             return {
                 "status": "success",
-                "output": "\n".join([f"{h['title']} - {h['url']}" for h in history["history"]])
+                "output": "\n".join([f"{h['title']} - {h['url']}" for h in entries]) or "No matching history"
             }
         else:
-            return execute_command(command)
+            # ls, cd, pwd and everything else run in the session's shell
+            return run_in_terminal_session(command, session_id)
     except Exception as e:
         return {"status": "error", "output": f"Error processing command: {str(e)}"}
 
@@ -524,11 +1275,42 @@ def static_files(filename):
 def api_drives():
     return jsonify(list_drives())
 
-@app.route('/api/navigate', methods=['POST'])
+def request_params():
+    """Query string for GET, JSON body for POST"""
+    if request.method == 'GET':
+        return request.args
+    return request.get_json(silent=True) or {}
+
+def directory_etag(path, *extra):
+    """ETag for a listing of `path`'s names, from the directory's own mtime"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return make_etag(os.path.abspath(path), st.st_ino, st.st_mtime_ns, extra)
+
+@app.route('/api/navigate', methods=['GET', 'POST'])
 def api_navigate():
-    data = request.json
+    data = request_params()
     path = data.get('path', '.')
-    return jsonify(navigate_directory(path))
+    cursor = data.get('cursor')
+    columns = wants_columns()
+    # No ETag: folder sizes change with anything below them, which no
+    # cheap validator covers
+    result = navigate_directory(path, data.get('time_budget'), data.get('max_entries'), cursor)
+    if columns and result["status"] == "success":
+        result["folders"] = to_columns(result["folders"], ["name", "type", "path", "size"])
+        result["files"] = to_columns(result["files"], ["name", "type", "path", "size", "extension", "modified"])
+    return json_response(result)
+
+@app.route('/api/folder_size', methods=['POST'])
+def api_folder_size():
+    data = request.json
+    path = data.get('path')
+    cursor = data.get('cursor')
+    if not path and not cursor:
+        return jsonify({"status": "error", "message": "No path provided"})
+    return jsonify(get_folder_size(path, data.get('time_budget'), data.get('max_entries'), cursor))
 
 @app.route('/api/open_file', methods=['POST'])
 def api_open_file():
@@ -543,9 +1325,10 @@ def api_search_file():
     data = request.json
     file_name = data.get('file_name')
     path = data.get('path')
-    if not file_name:
+    cursor = data.get('cursor')
+    if not file_name and not cursor:
         return jsonify({"status": "error", "message": "No file name provided"})
-    return jsonify(search_for_file(file_name, path))
+    return jsonify(search_for_file(file_name, path, data.get('time_budget'), data.get('max_entries'), cursor))
 
 @app.route('/api/create_file', methods=['POST'])
 def api_create_file():
@@ -564,14 +1347,19 @@ def api_delete_file():
     directory = data.get('directory')
     if not filename:
         return jsonify({"status": "error", "message": "No filename provided"})
-    return jsonify(delete_file(filename, directory))
+    return jsonify(delete_file(filename, directory, bool(data.get('background'))))
 
-@app.route('/api/list_files', methods=['POST'])
+@app.route('/api/list_files', methods=['GET', 'POST'])
 def api_list_files():
-    data = request.json
+    data = request_params()
     directory = data.get('directory', '.')
     pattern = data.get('pattern', '*')
-    return jsonify(list_files(directory, pattern))
+    # A pattern reaching into subfolders isn't covered by the directory's mtime
+    etag = None if '/' in pattern or os.sep in pattern else directory_etag(directory, "list_files", pattern)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    return json_response(list_files(directory, pattern), etag)
 
 @app.route('/api/create_folder', methods=['POST'])
 def api_create_folder():
@@ -589,7 +1377,19 @@ def api_delete_folder():
     directory = data.get('directory')
     if not folder_name:
         return jsonify({"status": "error", "message": "No folder name provided"})
-    return jsonify(delete_folder(folder_name, directory))
+    return jsonify(delete_folder(folder_name, directory, bool(data.get('background'))))
+
+@app.route('/api/deletions', methods=['GET'])
+def api_list_deletions():
+    return jsonify({"status": "success", "deletions": deletion_engine.list()})
+
+@app.route('/api/deletions/<task_id>', methods=['GET'])
+def api_deletion_status(task_id):
+    return jsonify(deletion_status(task_id))
+
+@app.route('/api/deletions/<task_id>/cancel', methods=['POST'])
+def api_cancel_deletion(task_id):
+    return jsonify(cancel_deletion(task_id))
 
 @app.route('/api/organize_files', methods=['POST'])
 def api_organize_files():
@@ -617,6 +1417,23 @@ def api_move_item():
         return jsonify({"status": "error", "message": "Item name and destination are required"})
     return jsonify(move_item(item_name, destination, source))
 
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else data
+    try:
+        operations = batch_runner.validate(operations)
+    except BatchError as e:
+        return jsonify({"status": "error", "message": str(e), "errors": e.errors}), 400
+    stop_on_error = bool(data.get('stop_on_error')) if isinstance(data, dict) else False
+    stream = request.args.get('stream') or (data.get('stream') if isinstance(data, dict) else None)
+    if stream:
+        fmt = 'ndjson' if stream == 'ndjson' or request.args.get('format') == 'ndjson' else 'sse'
+        return Response(stream_batch_events(operations, stop_on_error, fmt),
+                        mimetype='application/x-ndjson' if fmt == 'ndjson' else 'text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    return jsonify(run_batch(operations, stop_on_error))
+
 @app.route('/api/upload_file', methods=['POST'])
 def api_upload_file():
     if 'file' not in request.files:
@@ -642,26 +1459,131 @@ def api_open_website():
         return jsonify({"status": "error", "message": "No website URL provided"})
     return jsonify(open_website(website))
 
+@app.route('/api/browser_pool', methods=['GET'])
+def api_browser_pool():
+    return jsonify({"status": "success", "pool": browser_pool.stats(), "headless": BROWSER_HEADLESS})
+
 @app.route('/api/browser_history', methods=['GET'])
 def api_browser_history():
-    return jsonify(get_browser_history())
+    return jsonify(get_browser_history(
+        offset=max(request.args.get('offset', 0, type=int), 0),
+        limit=min(max(request.args.get('limit', 50, type=int), 1), 500),
+        domain=request.args.get('domain')
+    ))
+
+@app.route('/api/browser_history/search', methods=['GET'])
+def api_search_browser_history():
+    return jsonify(search_browser_history(
+        query=request.args.get('q', ''),
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        domain=request.args.get('domain'),
+        limit=min(max(request.args.get('limit', 20, type=int), 1), 200)
+    ))
+
+@app.route('/api/browser_history/sync', methods=['POST'])
+def api_sync_browser_history():
+    return jsonify(sync_browser_history())
+
+# Intent API
+@app.route('/api/intent', methods=['GET', 'POST'])
+def api_intent():
+    data = request.get_json(silent=True) or {}
+    text = data.get('text') or request.args.get('q', '')
+    if not text.strip():
+        return jsonify({"status": "error", "message": "No text provided"})
+    use_llm = data.get('llm', request.args.get('llm', '1') != '0')
+    return jsonify(resolve_intent(text, bool(use_llm)))
+
+@app.route('/api/intent/stats', methods=['GET'])
+def api_intent_stats():
+    return jsonify({"status": "success", "stats": subsystems.get("intents").stats()})
+
+# Extension telemetry API
+@app.route('/api/telemetry', methods=['POST'])
+def api_ingest_telemetry():
+    result = ingest_telemetry(request.get_data(cache=False), request.headers.get('Content-Encoding'))
+    return jsonify(result), 200 if result["status"] == "success" else 400
+
+@app.route('/api/telemetry/rollup', methods=['GET'])
+def api_telemetry_rollup():
+    return jsonify(get_telemetry_rollup(
+        granularity=request.args.get('granularity', 'hour'),
+        since=request.args.get('since', '24h'),
+        until=request.args.get('until')
+    ))
+
+@app.route('/api/telemetry/domains', methods=['GET'])
+def api_telemetry_domains():
+    return jsonify(get_telemetry_domains(
+        since=request.args.get('since', '7d'),
+        until=request.args.get('until'),
+        limit=min(max(request.args.get('limit', 20, type=int), 1), 200),
+        sort=request.args.get('sort', 'active_seconds')
+    ))
 
 # System operations API
 @app.route('/api/system_info', methods=['GET'])
 def api_system_info():
     return jsonify(show_system_info())
 
+@app.route('/api/system_info/refresh', methods=['POST'])
+def api_refresh_system_info():
+    data = request.get_json(silent=True) or {}
+    return jsonify(refresh_host_facts(bool(data.get('wait'))))
+
+@app.route('/api/system_metrics', methods=['GET'])
+def api_system_metrics():
+    minutes = request.args.get('minutes', 5, type=float)
+    return jsonify(get_system_metrics_history(minutes))
+
 @app.route('/api/running_processes', methods=['GET'])
 def api_running_processes():
-    return jsonify(get_running_processes())
+    result = get_running_processes(
+        sort=request.args.get('sort', 'cpu'),
+        order=request.args.get('order', 'desc'),
+        top=request.args.get('top', type=int),
+        name=request.args.get('name'),
+        user=request.args.get('user'),
+        offset=max(0, request.args.get('offset', 0, type=int)),
+        limit=max(1, min(1000, request.args.get('limit', 50, type=int)))
+    )
+    if result["status"] != "success":
+        return json_response(result)
+    # The table only changes when the monitor polls
+    etag = make_etag("running_processes", result["generation"], sorted(request.args.items()))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    if wants_columns():
+        result["processes"] = to_columns(result["processes"])
+    return json_response(result, etag)
 
 @app.route('/api/cleanup_check', methods=['GET'])
 def api_cleanup_check():
-    return jsonify(cleanup_system())
+    min_age_hours = request.args.get('min_age_hours', type=float)
+    patterns = request.args.get('pattern')
+    exclude = request.args.get('exclude')
+    return jsonify(cleanup_system(
+        min_age=min_age_hours * 3600 if min_age_hours else None,
+        min_size=request.args.get('min_size', type=int),
+        max_size=request.args.get('max_size', type=int),
+        patterns=patterns.split(',') if patterns else None,
+        exclude=exclude.split(',') if exclude else None,
+        time_budget=request.args.get('time_budget', type=float),
+        max_entries=request.args.get('max_entries', type=int),
+        cursor=request.args.get('cursor')
+    ))
 
 @app.route('/api/confirm_cleanup', methods=['POST'])
 def api_confirm_cleanup():
-    return jsonify(confirm_cleanup())
+    data = request.get_json(silent=True) or {}
+    return jsonify(confirm_cleanup(data.get('plan_id'), data.get('max_per_second'), data.get('wait'),
+                                   data.get('time_budget'), data.get('max_entries')))
+
+@app.route('/api/cleanup/<plan_id>', methods=['GET'])
+def api_cleanup_status(plan_id):
+    return jsonify(cleanup_status(plan_id))
 
 @app.route('/api/execute_command', methods=['POST'])
 def api_execute_command():
@@ -669,7 +1591,71 @@ def api_execute_command():
     command = data.get('command')
     if not command:
         return jsonify({"status": "error", "message": "No command provided"})
-    return jsonify(execute_command(command))
+    return jsonify(execute_command(command, data.get('timeout')))
+
+@app.route('/api/jobs', methods=['GET'])
+def api_list_jobs():
+    return jsonify({"status": "success", "jobs": job_registry.list()})
+
+@app.route('/api/jobs', methods=['POST'])
+def api_start_job():
+    data = request.json
+    command = data.get('command')
+    if not command:
+        return jsonify({"status": "error", "message": "No command provided"})
+    return jsonify(start_job(command, data.get('timeout')))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    return jsonify(get_job(job_id, request.args.get('since', 0, type=int)))
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    return jsonify(cancel_job(job_id))
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def api_stream_job(job_id):
+    if job_registry.get(job_id) is None:
+        return jsonify({"status": "error", "message": f"No job with id {job_id}"}), 404
+    since = request.args.get('since', request.headers.get('Last-Event-ID', 0), type=int)
+    if request.args.get('format') == 'text':
+        return Response(stream_job_text(job_id, since), mimetype='text/plain')
+    return Response(stream_job_events(job_id, since), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# File watcher API
+@app.route('/api/fs/status', methods=['GET'])
+def api_fs_status():
+    watcher = subsystems.peek("watcher")
+    if watcher is None:
+        return jsonify({"status": "error", "message": "The file watcher is not running",
+                        "watcher": subsystems.subsystems["watcher"].as_dict()})
+    return jsonify({"status": "success", "watcher": watcher.status()})
+
+@app.route('/api/fs/events', methods=['GET'])
+def api_fs_events():
+    watcher = subsystems.peek("watcher")
+    if watcher is None:
+        return jsonify({"status": "error", "message": "The file watcher is not running"}), 404
+    since = request.args.get('since', 0, type=int)
+    wait = max(0.0, min(30.0, request.args.get('wait', 0, type=float)))
+    if wait:
+        events, next_seq, dropped = watcher.model.events.wait(since, timeout=wait)
+    else:
+        events, next_seq, dropped = watcher.model.events.read(since)
+    return jsonify({"status": "success", "events": events, "next_seq": next_seq, "dropped": dropped})
+
+@app.route('/api/fs/events/stream', methods=['GET'])
+def api_stream_fs_events():
+    watcher = subsystems.peek("watcher")
+    if watcher is None:
+        return jsonify({"status": "error", "message": "The file watcher is not running"}), 404
+    since = request.args.get('since', type=int)
+    if since is None:
+        # Last-Event-ID is the last event the client saw
+        since = int(request.headers['Last-Event-ID']) + 1 if request.headers.get('Last-Event-ID', '').isdigit() else 0
+    return Response(stream_fs_events(watcher, since), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # Terminal API
 @app.route('/api/terminal_command', methods=['POST'])
@@ -678,7 +1664,40 @@ def api_terminal_command():
     command = data.get('command')
     if not command:
         return jsonify({"status": "error", "message": "No command provided"})
-    return jsonify(handle_terminal_command(command))
+    session_id = data.get('session_id') or request.headers.get('X-Session-Id') or 'default'
+    return jsonify(handle_terminal_command(command, session_id))
+
+@app.route('/api/terminal_sessions', methods=['GET'])
+def api_terminal_sessions():
+    return jsonify({"status": "success", "sessions": terminal_sessions.list()})
+
+@app.route('/api/terminal_sessions/<session_id>', methods=['DELETE'])
+def api_close_terminal_session(session_id):
+    if terminal_sessions.close(session_id):
+        return jsonify({"status": "success", "message": f"Closed session {session_id}"})
+    return jsonify({"status": "error", "message": f"No session {session_id}"})
+
+# Health and readiness
+@app.route('/healthz', methods=['GET'])
+def api_healthz():
+    return jsonify({"status": "ok", "uptime": round(time.time() - subsystems.started_at, 1)})
+
+@app.route('/readyz', methods=['GET'])
+def api_readyz():
+    status = subsystems.status()
+    status["status"] = "ready" if status["ready"] else "starting"
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route('/api/warmup', methods=['POST'])
+def api_warmup():
+    subsystems.warm_up()
+    return jsonify({"status": "success", "message": "Warm-up started", "warmup": subsystems.warmup_state})
+
+if os.getenv("ZENITH_WARMUP") == "1":
+    subsystems.warm_up()
 
 if __name__ == '__main__':
+    # With the reloader, only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.getenv("ZENITH_WARMUP") != "0" and os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        subsystems.warm_up()
     app.run(debug=True)
\ No newline at end of file
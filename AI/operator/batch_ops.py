@@ -0,0 +1,215 @@
+"""Ordered batches of file operations, run in parallel where they don't overlap"""
+import concurrent.futures
+import glob
+import heapq
+import os
+import time
+
+
+class BatchError(ValueError):
+    """A batch that failed validation; `errors` lists {index, message} per bad operation"""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _path(name, directory=None):
+    return os.path.join(directory, name) if directory else name
+
+
+def _glob_root(pattern):
+    """The deepest directory of a glob pattern that has no wildcards in it"""
+    parts = []
+    for part in pattern.replace("\\", "/").split("/"):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return "/".join(parts) or "."
+
+
+def _create_file_paths(p):
+    filename = p["filename"] if "." in p["filename"] else p["filename"] + ".txt"
+    return [_path(filename, p.get("directory"))]
+
+
+def _delete_file_paths(p):
+    path = _path(p["filename"], p.get("directory"))
+    return [_glob_root(path) if "*" in path else path]
+
+
+def _move_item_paths(p):
+    source = _path(p["item_name"], p.get("source"))
+    return [source, os.path.join(p["destination"], os.path.basename(source))]
+
+
+# Parameters of each operation (as for its single-item endpoint) and the
+# paths it touches; the path rules mirror the handlers in app.py
+OPERATIONS = {
+    "create_file": (("filename",), ("directory", "content"), _create_file_paths),
+    "delete_file": (("filename",), ("directory",), _delete_file_paths),
+    "create_folder": (("folder_name",), ("directory",), lambda p: [_path(p["folder_name"], p.get("directory"))]),
+    "delete_folder": (("folder_name",), ("directory",), lambda p: [_path(p["folder_name"], p.get("directory"))]),
+    "rename_item": (("old_name", "new_name"), ("directory",),
+                    lambda p: [_path(p["old_name"], p.get("directory")), _path(p["new_name"], p.get("directory"))]),
+    "move_item": (("item_name", "destination"), ("source",), _move_item_paths),
+}
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _ancestors(key):
+    parent = os.path.dirname(key)
+    while parent != key:
+        yield parent
+        key, parent = parent, os.path.dirname(parent)
+
+
+def plan_dependencies(operations):
+    """For each operation, the indexes of earlier operations it must wait for
+
+    Two operations conflict when a path one touches is equal to, inside or
+    above a path the other touches (renaming a folder vs. creating a file
+    in it). Each operation waits for the earlier ones it conflicts with;
+    everything else may run concurrently. `under[p]` holds the operations
+    that touched p or anything below it since the last one that touched
+    p itself, which already waits for all of those.
+    """
+    touched = {}
+    under = {}
+    deps = []
+    for index, operation in enumerate(operations):
+        waits = set()
+        keys = {_key(path) for path in operation["paths"]}
+        for key in keys:
+            waits.update(under.get(key, ()))
+            for ancestor in _ancestors(key):
+                if ancestor in touched:
+                    waits.add(touched[ancestor])
+        for key in keys:
+            touched[key] = index
+            under[key] = [index]
+            for ancestor in _ancestors(key):
+                under.setdefault(ancestor, []).append(index)
+        waits.discard(index)
+        deps.append(sorted(waits))
+    return deps
+
+
+class BatchRunner:
+    """Validate and run ordered batches of operations with a thread pool
+
+    `handlers` maps operation names to functions taking the operation's
+    parameters and returning the usual {"status", "message"} dict. A batch
+    is rejected as a whole if any operation is malformed, before anything
+    runs. Operations whose paths overlap run in batch order; the rest run
+    on up to `workers` threads.
+    """
+
+    def __init__(self, handlers, workers=8, max_operations=10000):
+        self.handlers = handlers
+        self.workers = workers
+        self.max_operations = max_operations
+
+    def validate(self, operations):
+        """Normalized operations, or BatchError listing every invalid one"""
+        if not isinstance(operations, list) or not operations:
+            raise BatchError("Expected a non-empty list of operations")
+        if len(operations) > self.max_operations:
+            raise BatchError(f"Too many operations ({len(operations)}); the limit is {self.max_operations}")
+        errors = []
+        normalized = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                errors.append({"index": index, "message": "Operation must be an object"})
+                continue
+            name = operation.get("op")
+            if name not in self.handlers or name not in OPERATIONS:
+                errors.append({"index": index, "message": f"Unknown operation '{name}'"})
+                continue
+            required, optional, paths = OPERATIONS[name]
+            params = {k: v for k, v in operation.items() if k != "op"}
+            problems = [f"'{k}' is required" for k in required if not params.get(k)]
+            problems += [f"unknown parameter '{k}'" for k in params if k not in required and k not in optional]
+            problems += [f"'{k}' must be a string" for k, v in params.items()
+                         if v is not None and not isinstance(v, str)]
+            if problems:
+                errors.append({"index": index, "message": f"{name}: " + ", ".join(problems)})
+                continue
+            normalized.append({"index": index, "op": name, "params": params, "paths": paths(params)})
+        if errors:
+            raise BatchError(f"{len(errors)} of {len(operations)} operations are invalid", errors)
+        return normalized
+
+    def _call(self, operation):
+        started = time.perf_counter()
+        try:
+            result = self.handlers[operation["op"]](**operation["params"])
+        except Exception as e:
+            result = {"status": "error", "message": f"Error in {operation['op']}: {str(e)}"}
+        result = dict(result, index=operation["index"], op=operation["op"])
+        result["took_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def iter_run(self, operations, stop_on_error=False):
+        """Run validated operations, yielding each result as it finishes
+
+        With `stop_on_error`, operations that haven't started when one
+        fails are reported as skipped.
+        """
+        deps = plan_dependencies(operations)
+        waiting = [len(d) for d in deps]
+        dependents = [[] for _ in operations]
+        for index, waits in enumerate(deps):
+            for earlier in waits:
+                dependents[earlier].append(index)
+        # Ready operations start in batch order
+        ready = [i for i, count in enumerate(waiting) if count == 0]
+        started = [False] * len(operations)
+        running = {}
+        failed = False
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            while running or (ready and not (failed and stop_on_error)):
+                while ready and len(running) < self.workers * 2 and not (failed and stop_on_error):
+                    index = heapq.heappop(ready)
+                    started[index] = True
+                    running[pool.submit(self._call, operations[index])] = index
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    result = future.result()
+                    if result.get("status") != "success":
+                        failed = True
+                    for later in dependents[index]:
+                        waiting[later] -= 1
+                        if waiting[later] == 0:
+                            heapq.heappush(ready, later)
+                    yield result
+
+        for index, operation in enumerate(operations):
+            if not started[index]:
+                yield {"status": "skipped", "message": "Not run because an earlier operation failed",
+                       "index": operation["index"], "op": operation["op"], "took_ms": 0.0}
+
+    def run(self, operations, stop_on_error=False):
+        """Run validated operations; returns the results in batch order and a summary"""
+        started = time.perf_counter()
+        results = sorted(self.iter_run(operations, stop_on_error), key=lambda r: r["index"])
+        return results, self.summary(results, time.perf_counter() - started)
+
+    @staticmethod
+    def summary(results, elapsed):
+        counts = {"success": 0, "error": 0, "skipped": 0}
+        for result in results:
+            status = result.get("status")
+            counts[status if status in counts else "error"] += 1
+        return {
+            "total": len(results),
+            "succeeded": counts["success"],
+            "failed": counts["error"],
+            "skipped": counts["skipped"],
+            "took_ms": round(elapsed * 1000, 3),
+        }
@@ -0,0 +1,425 @@
+"""Incremental import of Chrome/Chromium history into a local SQLite store"""
+import contextlib
+import glob
+import math
+import os
+import pathlib
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Chrome stores times as microseconds since 1601-01-01 UTC
+CHROME_EPOCH_OFFSET = 11644473600
+
+
+def chrome_time_to_unix(value):
+    return value / 1_000_000 - CHROME_EPOCH_OFFSET
+
+
+def unix_to_chrome_time(timestamp):
+    return int((timestamp + CHROME_EPOCH_OFFSET) * 1_000_000)
+
+
+def url_domain(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_time(value, now=None):
+    """A unix timestamp, or a duration ago such as 90m, 24h, 7d or 2w"""
+    if value is None or value == "":
+        return None
+    value = str(value).strip().lower()
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([mhdw])", value)
+    if match:
+        now = time.time() if now is None else now
+        return now - float(match.group(1)) * DURATION_UNITS[match.group(2)]
+    return float(value)
+
+
+def parse_search_operators(text):
+    """Split "kubernetes site:github.com since:7d" into text and filters
+
+    Recognised operators are site: (or domain:), since: and until:; the
+    rest is the text query.
+    """
+    filters = {}
+    words = []
+    for word in (text or "").split():
+        key, sep, value = word.partition(":")
+        key = {"site": "domain"}.get(key.lower(), key.lower())
+        if sep and value and key in ("domain", "since", "until"):
+            filters[key] = value
+        else:
+            words.append(word)
+    return " ".join(words), filters
+
+
+def default_history_paths():
+    """History files of every Chrome/Chromium profile found for this user"""
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        local = os.getenv("LOCALAPPDATA", os.path.join(home, "AppData", "Local"))
+        bases = [os.path.join(local, "Google", "Chrome", "User Data"), os.path.join(local, "Chromium", "User Data")]
+    elif sys.platform == "darwin":
+        support = os.path.join(home, "Library", "Application Support")
+        bases = [os.path.join(support, "Google", "Chrome"), os.path.join(support, "Chromium")]
+    else:
+        config = os.getenv("XDG_CONFIG_HOME", os.path.join(home, ".config"))
+        bases = [os.path.join(config, "google-chrome"), os.path.join(config, "chromium")]
+
+    paths = []
+    for base in bases:
+        for profile in ["Default"] + sorted(glob.glob(os.path.join(base, "Profile *"))):
+            path = os.path.join(base, profile, "History")
+            if os.path.isfile(path):
+                paths.append(path)
+    return paths
+
+
+def _source_signature(path):
+    """(size, mtime_ns) of the database and its WAL, to skip unchanged sources"""
+    st = os.stat(path)
+    signature = [st.st_size, st.st_mtime_ns]
+    wal = path + "-wal"
+    if os.path.exists(wal):
+        wal_st = os.stat(wal)
+        signature += [wal_st.st_size, wal_st.st_mtime_ns]
+    return repr(signature)
+
+
+@contextlib.contextmanager
+def open_history(path):
+    """Read-only connection to a Chrome History database
+
+    A running Chrome keeps the database exclusively locked, so when a direct
+    read-only open fails the file (and its -wal/-journal sidecars, so that
+    SQLite recovers a consistent state) is copied to a temporary directory
+    and the copy is opened instead.
+    """
+    snapshot_dir = None
+    conn = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True, timeout=0)
+    try:
+        conn.execute("SELECT 1 FROM visits LIMIT 1").fetchall()
+    except sqlite3.OperationalError:
+        conn.close()
+        snapshot_dir = tempfile.mkdtemp(prefix="zenith-history-")
+        copy = os.path.join(snapshot_dir, "History")
+        for suffix in ("", "-wal", "-journal"):
+            if os.path.exists(path + suffix):
+                shutil.copyfile(path + suffix, copy + suffix)
+        conn = sqlite3.connect(copy)
+    try:
+        yield conn
+    finally:
+        conn.close()
+        if snapshot_dir:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+class HistoryStore:
+    """Local copy of browser history, kept in sync incrementally
+
+    Each source (a Chrome History file) remembers the newest visit_time it
+    has imported; a sync only reads visits after it, through Chrome's index
+    on visits.visit_time, and a source whose file hasn't changed since the
+    last sync isn't opened at all. Imported visits are kept after Chrome
+    expires them (it keeps about 90 days).
+
+    Syncs write through one connection and queries read through another,
+    so with WAL a request is answered from the committed data while an
+    import is running instead of waiting for it.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            last_visit_time INTEGER NOT NULL DEFAULT 0,
+            signature TEXT,
+            imported INTEGER NOT NULL DEFAULT 0,
+            synced_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS urls (
+            id INTEGER PRIMARY KEY,
+            url TEXT UNIQUE NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            domain TEXT NOT NULL DEFAULT '',
+            visit_count INTEGER NOT NULL DEFAULT 0,
+            last_visit REAL NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS urls_last_visit ON urls(last_visit);
+        CREATE INDEX IF NOT EXISTS urls_domain ON urls(domain, last_visit);
+        CREATE TABLE IF NOT EXISTS visits (
+            id INTEGER PRIMARY KEY,
+            source_id INTEGER NOT NULL,
+            url_id INTEGER NOT NULL,
+            visit_time REAL NOT NULL,
+            transition INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS visits_time ON visits(visit_time);
+        CREATE INDEX IF NOT EXISTS visits_url ON visits(url_id, visit_time);
+    """
+
+    # Full-text index over titles and URLs (URLs split on punctuation, so
+    # "kubernetes.io/docs" matches kubernetes, io and docs), kept in step
+    # with urls by triggers. Visit count updates don't touch it.
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE urls_fts USING fts5(
+            title, url, content='urls', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+        CREATE TRIGGER urls_fts_insert AFTER INSERT ON urls BEGIN
+            INSERT INTO urls_fts (rowid, title, url) VALUES (new.id, new.title, new.url);
+        END;
+        CREATE TRIGGER urls_fts_delete AFTER DELETE ON urls BEGIN
+            INSERT INTO urls_fts (urls_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+        END;
+        CREATE TRIGGER urls_fts_update AFTER UPDATE OF title, url ON urls
+        WHEN old.title IS NOT new.title OR old.url IS NOT new.url BEGIN
+            INSERT INTO urls_fts (urls_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+            INSERT INTO urls_fts (rowid, title, url) VALUES (new.id, new.title, new.url);
+        END;
+        INSERT INTO urls_fts (urls_fts) VALUES ('rebuild');
+    """
+
+    # Search ranking: BM25 text relevance (titles weigh 4x URLs), scaled up
+    # by log visit count and by recency, which halves every two weeks down
+    # to a floor of half weight
+    TITLE_WEIGHT = 4.0
+    URL_WEIGHT = 1.0
+    RECENCY_HALF_LIFE = 14 * 86400
+    SEARCH_CANDIDATES = 1000
+
+    VISITS_QUERY = """
+        SELECT v.visit_time, v.transition, u.url, u.title
+        FROM visits v JOIN urls u ON u.id = v.url
+        WHERE v.visit_time > ?
+        ORDER BY v.visit_time
+    """
+
+    def __init__(self, db_path, sources=None, batch_size=5000):
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.sources = sources
+        self.batch_size = batch_size
+        self.last_sync = 0.0
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.full_text = True
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'urls_fts'").fetchone():
+            try:
+                self.conn.executescript(self.FTS_SCHEMA)
+            except sqlite3.OperationalError as e:
+                # SQLite built without FTS5: search falls back to LIKE scans
+                print(f"History full-text index unavailable ({str(e)}); using plain search")
+                self.full_text = False
+        self.reader = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._read_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def source_paths(self):
+        return list(self.sources) if self.sources is not None else default_history_paths()
+
+    def sync(self):
+        """Import new visits from every source; returns {path: imported}"""
+        imported = {}
+        with self._lock:
+            for path in self.source_paths():
+                try:
+                    imported[path] = self.sync_source(path)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"History import from {path} failed: {str(e)}")
+                    imported[path] = 0
+            self.last_sync = time.monotonic()
+        return imported
+
+    def sync_source(self, path):
+        with self._lock:
+            signature = _source_signature(path)
+            row = self.conn.execute("SELECT id, last_visit_time, signature FROM sources WHERE path = ?",
+                                    (path,)).fetchone()
+            if row is None:
+                with self.conn:
+                    source_id = self.conn.execute("INSERT INTO sources (path) VALUES (?)", (path,)).lastrowid
+                last_visit_time = 0
+            else:
+                source_id, last_visit_time, previous = row
+                if previous == signature:
+                    return 0
+
+            imported = 0
+            with open_history(path) as source:
+                cursor = source.execute(self.VISITS_QUERY, (last_visit_time,))
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    with self.conn:
+                        self._import_batch(source_id, rows)
+                        last_visit_time = rows[-1][0]
+                        imported += len(rows)
+                        self.conn.execute(
+                            "UPDATE sources SET last_visit_time = ?, imported = imported + ? WHERE id = ?",
+                            (last_visit_time, len(rows), source_id))
+            with self.conn:
+                self.conn.execute("UPDATE sources SET signature = ?, synced_at = ? WHERE id = ?",
+                                  (signature, time.time(), source_id))
+            return imported
+
+    def _import_batch(self, source_id, rows):
+        for visit_time, transition, url, title in rows:
+            visited = chrome_time_to_unix(visit_time)
+            # Upsert then look the id up: RETURNING needs SQLite 3.35, which
+            # older Python builds don't bundle
+            self.conn.execute(
+                """INSERT INTO urls (url, title, domain, visit_count, last_visit) VALUES (?, ?, ?, 1, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       title = CASE WHEN excluded.title != '' THEN excluded.title ELSE urls.title END,
+                       visit_count = urls.visit_count + 1,
+                       last_visit = MAX(urls.last_visit, excluded.last_visit)""",
+                (url, title or "", url_domain(url), visited))
+            url_id = self.conn.execute("SELECT id FROM urls WHERE url = ?", (url,)).fetchone()[0]
+            self.conn.execute(
+                "INSERT INTO visits (source_id, url_id, visit_time, transition) VALUES (?, ?, ?, ?)",
+                (source_id, url_id, visited, transition or 0))
+
+    def ensure_fresh(self, max_age):
+        """Wake the background sync if the last sync is older than `max_age` seconds; never waits for it"""
+        if time.monotonic() - self.last_sync < max_age:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            self._wake.set()
+        else:
+            self.start(max_age)
+
+    def start(self, interval):
+        """Sync in a background thread every `interval` seconds"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="history-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            self.sync()
+            self._wake.wait(interval)
+            self._wake.clear()
+
+    def page(self, offset=0, limit=50, domain=None):
+        """URLs by most recent visit, newest first"""
+        where, params = "", []
+        if domain:
+            where, params = "WHERE domain = ?", [url_domain(f"http://{domain}")]
+        with self._read_lock:
+            total = self.reader.execute(f"SELECT COUNT(*) FROM urls {where}", params).fetchone()[0]
+            rows = self.reader.execute(
+                f"""SELECT url, title, visit_count, last_visit FROM urls {where}
+                    ORDER BY last_visit DESC LIMIT ? OFFSET ?""",
+                params + [limit, offset]).fetchall()
+        history = [{"url": url, "title": title, "visit_count": count, "last_visit": last_visit}
+                   for url, title, count, last_visit in rows]
+        return {"history": history, "total": total}
+
+    def search(self, text="", since=None, until=None, domain=None, limit=20, now=None):
+        """Ranked URLs matching `text`, optionally visited in [since, until) and on `domain`
+
+        The best SEARCH_CANDIDATES text matches (by BM25) are re-ranked by
+        the combined score in Python, so the cost depends on the match
+        count rather than the size of the history. `domain` also matches
+        its subdomains. Without text, the filtered URLs come back most
+        recent first. Without FTS5, text matches every word as a substring
+        of the title or URL and is ranked by visits and recency alone.
+        """
+        now = time.time() if now is None else now
+        conditions, params = [], []
+        if domain:
+            domain = url_domain(f"http://{domain}")
+            conditions.append("(u.domain = ? OR u.domain LIKE ?)")
+            params += [domain, f"%.{domain}"]
+        if until is not None:
+            conditions.append("EXISTS (SELECT 1 FROM visits v WHERE v.url_id = u.id"
+                              " AND v.visit_time >= ? AND v.visit_time < ?)")
+            params += [since or 0, until]
+        elif since is not None:
+            conditions.append("u.last_visit >= ?")
+            params.append(since)
+
+        query = fts_query(text or "")
+        with self._read_lock:
+            if query and not self.full_text:
+                for word in re.findall(r"\w+", text.lower()):
+                    pattern = "%" + word.replace("_", "\\_") + "%"
+                    conditions.append("(u.title LIKE ? ESCAPE '\\' OR u.url LIKE ? ESCAPE '\\')")
+                    params += [pattern, pattern]
+                rows = self.reader.execute(
+                    f"""SELECT u.url, u.title, u.visit_count, u.last_visit, 1.0 FROM urls u
+                        WHERE {' AND '.join(conditions)}
+                        ORDER BY u.last_visit DESC LIMIT ?""",
+                    params + [self.SEARCH_CANDIDATES]).fetchall()
+            elif not query:
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                rows = self.reader.execute(
+                    f"""SELECT u.url, u.title, u.visit_count, u.last_visit, 1.0 FROM urls u {where}
+                        ORDER BY u.last_visit DESC LIMIT ?""",
+                    params + [limit]).fetchall()
+            else:
+                where = " AND ".join(["urls_fts MATCH ?"] + conditions)
+                rows = self.reader.execute(
+                    f"""SELECT u.url, u.title, u.visit_count, u.last_visit,
+                               -bm25(urls_fts, {self.TITLE_WEIGHT}, {self.URL_WEIGHT})
+                        FROM urls_fts JOIN urls u ON u.id = urls_fts.rowid
+                        WHERE {where}
+                        ORDER BY bm25(urls_fts, {self.TITLE_WEIGHT}, {self.URL_WEIGHT}) LIMIT ?""",
+                    [query] + params + [self.SEARCH_CANDIDATES]).fetchall()
+
+        results = []
+        for url, title, visit_count, last_visit, relevance in rows:
+            recency = 0.5 + 0.5 * 0.5 ** (max(now - last_visit, 0) / self.RECENCY_HALF_LIFE)
+            results.append({
+                "url": url,
+                "title": title,
+                "visit_count": visit_count,
+                "last_visit": last_visit,
+                "score": max(relevance, 1e-6) * (1 + math.log1p(visit_count)) * recency,
+            })
+        if query:
+            results.sort(key=lambda r: r["score"], reverse=True)
+        results = results[:limit]
+        for result in results:
+            result["score"] = round(result["score"], 6)
+        return results
+
+    def source_status(self):
+        with self._read_lock:
+            rows = self.reader.execute("SELECT path, last_visit_time, imported, synced_at FROM sources").fetchall()
+        return [{"path": path,
+                 "last_visit": chrome_time_to_unix(last_visit_time) if last_visit_time else None,
+                 "imported": imported,
+                 "synced_at": synced_at} for path, last_visit_time, imported, synced_at in rows]
@@ -0,0 +1,147 @@
+"""A bounded, thread-safe pool of browser drivers"""
+import contextlib
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No driver became available within the checkout timeout"""
+
+
+class PoolClosed(Exception):
+    """The pool has been shut down"""
+
+
+def default_health_check(driver):
+    """A cheap round trip to the browser; raises if the session is dead"""
+    driver.current_url
+    return True
+
+
+class DriverPool:
+    """Hand out at most `size` drivers, one request at a time each
+
+    Drivers are created on demand by `factory()` (any object with a quit()
+    method works, which is how the pool is exercised without a browser), so
+    an idle server starts none. On checkout an idle driver is health
+    checked first; a dead one is quit and replaced transparently. When a
+    request fails while holding a driver, the driver is checked again
+    before going back to the pool. Checkout waits up to `checkout_timeout`
+    seconds for a free slot and then raises PoolTimeout.
+    """
+
+    def __init__(self, factory, size=2, checkout_timeout=30.0, health_check=default_health_check, max_uses=None):
+        self.factory = factory
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self.max_uses = max_uses
+        self.idle = []
+        self.created = 0
+        self.in_use = 0
+        self.replaced = 0
+        self.closed = False
+        self._uses = {}
+        self._cond = threading.Condition()
+
+    def _healthy(self, driver):
+        try:
+            return bool(self.health_check(driver))
+        except Exception:
+            return False
+
+    def _destroy(self, driver):
+        self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """Take a healthy driver out of the pool"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self.closed and not self.idle and self.created >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No browser driver available after {timeout}s ({self.size} in use)")
+                    self._cond.wait(remaining)
+                if self.closed:
+                    raise PoolClosed("Browser pool is closed")
+                driver = self.idle.pop() if self.idle else None
+                if driver is None:
+                    self.created += 1
+                self.in_use += 1
+
+            if driver is None:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self._cond:
+                        self.created -= 1
+                        self.in_use -= 1
+                        self._cond.notify()
+                    raise
+                self._uses[id(driver)] = 0
+                return driver
+
+            if self._healthy(driver):
+                return driver
+            # Dead session: free its slot and go round again, which creates a replacement
+            self._destroy(driver)
+            with self._cond:
+                self.created -= 1
+                self.in_use -= 1
+                self.replaced += 1
+
+    def release(self, driver, broken=False):
+        """Return a driver; broken ones (and any after close()) are quit"""
+        uses = self._uses.get(id(driver), 0) + 1
+        worn_out = self.max_uses is not None and uses >= self.max_uses
+        with self._cond:
+            self.in_use -= 1
+            keep = not (broken or worn_out or self.closed)
+            if keep:
+                self._uses[id(driver)] = uses
+                self.idle.append(driver)
+            else:
+                self.created -= 1
+                if broken:
+                    self.replaced += 1
+            self._cond.notify()
+        if not keep:
+            self._destroy(driver)
+
+    @contextlib.contextmanager
+    def checkout(self, timeout=None):
+        """`with pool.checkout() as driver:` - the driver is returned afterwards"""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, broken=not self._healthy(driver))
+            raise
+        self.release(driver)
+
+    def close(self):
+        """Quit the idle drivers; checked-out ones are quit when released"""
+        with self._cond:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.created -= len(idle)
+            self._cond.notify_all()
+        for driver in idle:
+            self._destroy(driver)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "created": self.created,
+                "idle": len(self.idle),
+                "in_use": self.in_use,
+                "replaced": self.replaced,
+                "closed": self.closed,
+            }
@@ -0,0 +1,245 @@
+"""Scan-once cleanup plans with parallel, rate-limited deletion"""
+import collections
+import concurrent.futures
+import fnmatch
+import os
+import threading
+import time
+import uuid
+
+from treewalk import Budget, TreeWalk
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` operations per second (None = unlimited)"""
+
+    def __init__(self, rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(rate or 0)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class CleanupPlan:
+    """The files a cleanup would delete, plus progress once it runs"""
+
+    def __init__(self, root, filters):
+        self.id = uuid.uuid4().hex[:12]
+        self.root = root
+        self.filters = filters
+        self.created = time.time()
+        self.files = []  # (path, size, mtime)
+        self.total_bytes = 0
+        self.scanned = 0
+        self.skipped_dirs = 0
+        self.scan_time = 0.0
+        self.scan_complete = False
+        self.walk = None
+        self.status = "planned"
+        self.deleted = 0
+        self.failed = 0
+        self.changed = 0
+        self.freed_bytes = 0
+        self.started = None
+        self.ended = None
+        self.errors = collections.deque(maxlen=20)
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+
+    def record(self, outcome, size=0, error=None):
+        with self._lock:
+            if outcome == "deleted":
+                self.deleted += 1
+                self.freed_bytes += size
+            elif outcome == "changed":
+                self.changed += 1
+            else:
+                self.failed += 1
+                if error:
+                    self.errors.append(error)
+
+    def as_dict(self, include_files=0):
+        processed = self.deleted + self.failed + self.changed
+        result = {
+            "plan_id": self.id,
+            "root": self.root,
+            "filters": self.filters,
+            "status": self.status,
+            "created": self.created,
+            "scan_time": round(self.scan_time, 3),
+            "scan_complete": self.scan_complete,
+            "scanned_files": self.scanned,
+            "total_files": len(self.files),
+            "reclaimable_bytes": self.total_bytes,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "skipped_changed": self.changed,
+            "freed_bytes": self.freed_bytes,
+            "progress": round(processed / len(self.files), 4) if self.files else 1.0,
+            "errors": list(self.errors),
+        }
+        if self.started:
+            elapsed = (self.ended or time.time()) - self.started
+            result["elapsed"] = round(elapsed, 3)
+            result["files_per_second"] = round(processed / elapsed, 1) if elapsed > 0 else 0.0
+        if include_files:
+            result["files"] = [{"path": p, "size": s} for p, s, _ in self.files[:include_files]]
+        return result
+
+
+class CleanupPlanner:
+    """Build cleanup plans with one directory walk and execute them in parallel
+
+    Plans are cached by id for `plan_ttl` seconds; executing an expired plan
+    is refused because the files on disk may have changed too much since.
+    Deletion re-checks each file's mtime and skips files that were modified
+    after the scan.
+    """
+
+    def __init__(self, workers=8, batch_size=256, plan_ttl=600, max_plans=20):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.plan_ttl = plan_ttl
+        self.max_plans = max_plans
+        self.plans = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def scan(self, root, min_age=None, min_size=None, max_size=None, patterns=None, exclude=None, budget=None):
+        """Walk `root` once and return a plan of the files matching every filter
+
+        min_age is in seconds since last modification; patterns and exclude
+        are lists of fnmatch patterns matched against the file name. If
+        `budget` runs out first the plan is returned with scan_complete
+        false; resume() carries on from where the walk stopped.
+        """
+        filters = {"min_age": min_age, "min_size": min_size, "max_size": max_size,
+                   "patterns": patterns or None, "exclude": exclude or None}
+        plan = CleanupPlan(root, filters)
+        plan.walk = TreeWalk(root)
+        with self._lock:
+            self.plans[plan.id] = plan
+            while len(self.plans) > self.max_plans:
+                self.plans.popitem(last=False)
+        return self.resume(plan, budget)
+
+    def resume(self, plan, budget=None):
+        """Continue a plan's scan until the walk is finished or `budget` runs out"""
+        if plan.scan_complete:
+            return plan
+        if not plan._scan_lock.acquire(blocking=False):
+            raise ValueError(f"Plan {plan.id} is already being scanned")
+        try:
+            self._scan(plan, budget or Budget())
+        finally:
+            plan._scan_lock.release()
+        return plan
+
+    def _scan(self, plan, budget):
+        filters = plan.filters
+        patterns, exclude = filters["patterns"], filters["exclude"]
+        min_size, max_size = filters["min_size"], filters["max_size"]
+        cutoff = plan.created - filters["min_age"] if filters["min_age"] else None
+        started = time.time()
+
+        for entry in plan.walk.walk(budget):
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                plan.scanned += 1
+                if patterns and not any(fnmatch.fnmatch(entry.name, p) for p in patterns):
+                    continue
+                if exclude and any(fnmatch.fnmatch(entry.name, p) for p in exclude):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if cutoff is not None and st.st_mtime > cutoff:
+                continue
+            if min_size is not None and st.st_size < min_size:
+                continue
+            if max_size is not None and st.st_size > max_size:
+                continue
+            plan.files.append((entry.path, st.st_size, st.st_mtime))
+            plan.total_bytes += st.st_size
+
+        plan.skipped_dirs = plan.walk.skipped_dirs
+        plan.scan_time += time.time() - started
+        if plan.walk.done:
+            plan.scan_complete = True
+            plan.walk = None
+
+    def get(self, plan_id):
+        with self._lock:
+            return self.plans.get(plan_id)
+
+    def expired(self, plan):
+        return time.time() - plan.created > self.plan_ttl
+
+    def execute(self, plan, max_per_second=None, wait=False, progress=None):
+        """Delete the plan's files in parallel batches
+
+        Runs in a background thread unless `wait` is true. `progress`, if
+        given, is called with the plan after each batch.
+        """
+        # Check and claim the plan in one step so two confirmations can't both run it
+        with plan._lock:
+            if plan.status != "planned":
+                raise ValueError(f"Plan {plan.id} is already {plan.status}")
+            if not plan.scan_complete:
+                raise ValueError(f"Plan {plan.id} has not finished scanning; resume the cleanup check first")
+            if self.expired(plan):
+                raise ValueError(f"Plan {plan.id} has expired; scan again")
+            plan.status = "running"
+            plan.started = time.time()
+        limiter = RateLimiter(max_per_second)
+
+        def delete_batch(batch):
+            for path, size, mtime in batch:
+                limiter.acquire()
+                try:
+                    if os.lstat(path).st_mtime != mtime:
+                        plan.record("changed")
+                        continue
+                    os.unlink(path)
+                    plan.record("deleted", size)
+                except FileNotFoundError:
+                    plan.record("changed")
+                except OSError as e:
+                    plan.record("failed", error=f"{path}: {e.strerror}")
+
+        def run():
+            try:
+                batches = [plan.files[i:i + self.batch_size] for i in range(0, len(plan.files), self.batch_size)]
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    for future in concurrent.futures.as_completed(pool.submit(delete_batch, b) for b in batches):
+                        future.result()
+                        if progress:
+                            progress(plan)
+                plan.status = "completed"
+            except Exception as e:
+                plan.status = "failed"
+                plan.errors.append(str(e))
+            finally:
+                plan.ended = time.time()
+
+        if wait:
+            run()
+        else:
+            threading.Thread(target=run, name=f"cleanup-{plan.id}", daemon=True).start()
+        return plan
@@ -0,0 +1,261 @@
+"""Parallel deletion of directory trees and wildcard matches, with progress"""
+import collections
+import concurrent.futures
+import os
+import stat
+import threading
+import time
+import uuid
+
+
+class DeletionTask:
+    """One tree or set of files being deleted, and how far it has got"""
+
+    def __init__(self, kind, target):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.target = target
+        self.status = "pending"
+        self.created = time.time()
+        self.started = None
+        self.ended = None
+        self.scan_complete = False
+        self.scanned_files = 0
+        self.scanned_dirs = 0
+        self.files_deleted = 0
+        self.dirs_deleted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.freed_bytes = 0
+        self.cancelled = False
+        self.errors = collections.deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    def record(self, outcome, size=0, error=None):
+        with self._lock:
+            if outcome == "file":
+                self.files_deleted += 1
+                self.freed_bytes += size
+            elif outcome == "dir":
+                self.dirs_deleted += 1
+            elif outcome == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+                if error:
+                    self.errors.append(error)
+
+    def as_dict(self):
+        total = self.scanned_files + self.scanned_dirs
+        deleted = self.files_deleted + self.dirs_deleted
+        result = {
+            "task_id": self.id,
+            "kind": self.kind,
+            "target": self.target,
+            "state": self.status,
+            "created": self.created,
+            "scan_complete": self.scan_complete,
+            "scanned_files": self.scanned_files,
+            "scanned_dirs": self.scanned_dirs,
+            "files_deleted": self.files_deleted,
+            "dirs_deleted": self.dirs_deleted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "freed_bytes": self.freed_bytes,
+            # Only meaningful once the scan is complete; until then the total keeps growing
+            "progress": round(deleted / total, 4) if total and self.scan_complete else (1.0 if self.done else 0.0),
+            "errors": list(self.errors),
+        }
+        if self.started:
+            elapsed = (self.ended or time.time()) - self.started
+            result["elapsed"] = round(elapsed, 3)
+            result["entries_per_second"] = round(deleted / elapsed, 1) if elapsed > 0 else 0.0
+        return result
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except PermissionError:
+        # Read-only files can't be removed on Windows until they're writable
+        if os.name != "nt":
+            raise
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+
+class DeletionEngine:
+    """Delete trees and file lists on a pool of `workers` threads
+
+    Trees are enumerated with os.scandir (without following symlinks)
+    while files are already being unlinked in batches of `batch_size`;
+    once every file is gone, directories are removed deepest level first,
+    each level in parallel. Tasks run in the caller's thread or in the
+    background, and the last `max_tasks` are kept for status queries.
+    """
+
+    def __init__(self, workers=8, batch_size=256, max_tasks=50):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_tasks = max_tasks
+        self.tasks = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _delete_files(self, task, batch):
+        for path, size in batch:
+            if task.cancelled:
+                return
+            try:
+                _unlink(path)
+                task.record("file", size)
+            except FileNotFoundError:
+                task.record("skipped")
+            except OSError as e:
+                task.record("failed", error=f"{path}: {e.strerror}")
+
+    def _delete_dirs(self, task, batch):
+        for path in batch:
+            if task.cancelled:
+                return
+            try:
+                os.rmdir(path)
+                task.record("dir")
+            except FileNotFoundError:
+                task.record("skipped")
+            except OSError as e:
+                task.record("failed", error=f"{path}: {e.strerror}")
+
+    def _submit_files(self, pool, task, entries, futures):
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                futures.append(pool.submit(self._delete_files, task, batch))
+                batch = []
+        if batch:
+            futures.append(pool.submit(self._delete_files, task, batch))
+
+    def _scan_tree(self, task, root, levels):
+        """Yield (path, size) for every non-directory under root; directories go into `levels` by depth"""
+        levels.append([root])
+        stack = [(root, 0)]
+        while stack and not task.cancelled:
+            directory, depth = stack.pop()
+            try:
+                entries = os.scandir(directory)
+            except OSError as e:
+                task.record("failed", error=f"{directory}: {e.strerror}")
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, depth + 1))
+                            if len(levels) <= depth + 1:
+                                levels.append([])
+                            levels[depth + 1].append(entry.path)
+                            task.scanned_dirs += 1
+                            continue
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        size = 0
+                    task.scanned_files += 1
+                    yield entry.path, size
+        # A cancelled walk leaves directories on the stack; only a finished one is complete
+        task.scan_complete = not stack
+
+    def _run_tree(self, task, root):
+        if os.path.islink(root) or not os.path.isdir(root):
+            task.scanned_files = 1
+            task.scan_complete = True
+            self._delete_files(task, [(root, os.lstat(root).st_size)])
+            return
+        task.scanned_dirs = 1
+        levels = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="delete") as pool:
+            futures = []
+            self._submit_files(pool, task, self._scan_tree(task, root, levels), futures)
+            for future in futures:
+                future.result()
+            # Every directory is emptied before its parent's level is removed
+            for level in reversed(levels):
+                if task.cancelled:
+                    return
+                batches = [level[i:i + self.batch_size] for i in range(0, len(level), self.batch_size)]
+                for future in [pool.submit(self._delete_dirs, task, b) for b in batches]:
+                    future.result()
+
+    def _run_files(self, task, paths):
+        def entries():
+            for path in paths:
+                if task.cancelled:
+                    return
+                try:
+                    st = os.lstat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    # Wildcard deletion removes files only, as before
+                    task.record("skipped")
+                    continue
+                task.scanned_files += 1
+                yield path, st.st_size
+            task.scan_complete = True
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="delete") as pool:
+            futures = []
+            self._submit_files(pool, task, entries(), futures)
+            for future in futures:
+                future.result()
+
+    def _start(self, task, run, wait):
+        with self._lock:
+            self.tasks[task.id] = task
+            while len(self.tasks) > self.max_tasks:
+                self.tasks.popitem(last=False)
+
+        def target():
+            task.status = "running"
+            task.started = time.time()
+            try:
+                run()
+                task.status = "cancelled" if task.cancelled else "completed"
+            except Exception as e:
+                task.status = "failed"
+                task.errors.append(str(e))
+            finally:
+                task.ended = time.time()
+
+        if wait:
+            target()
+        else:
+            threading.Thread(target=target, name=f"delete-{task.id}", daemon=True).start()
+        return task
+
+    def delete_tree(self, path, wait=True):
+        """Remove a file, symlink or whole directory tree"""
+        task = DeletionTask("tree", path)
+        return self._start(task, lambda: self._run_tree(task, path), wait)
+
+    def delete_files(self, paths, target=None, wait=True):
+        """Unlink every file in an iterable of paths (e.g. glob matches); directories are skipped"""
+        task = DeletionTask("files", target)
+        return self._start(task, lambda: self._run_files(task, paths), wait)
+
+    def get(self, task_id):
+        with self._lock:
+            return self.tasks.get(task_id)
+
+    def cancel(self, task_id):
+        task = self.get(task_id)
+        if task is not None and not task.done:
+            task.cancelled = True
+        return task
+
+    def list(self):
+        with self._lock:
+            return [task.as_dict() for task in self.tasks.values()]
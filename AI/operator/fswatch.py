@@ -0,0 +1,696 @@
+"""An in-memory model of watched directory trees, kept current by inotify or polling"""
+import collections
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import itertools
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+
+from snapshot import SnapshotError, SnapshotIndex, load_snapshot, save_snapshot
+from treestore import TreeStore
+
+
+class FsNode:
+    """A file or directory in the model; directories carry subtree totals"""
+
+    __slots__ = ("name", "parent", "is_dir", "size", "mtime", "children", "total_size", "file_count")
+
+    def __init__(self, name, parent, is_dir, size=0, mtime=0):
+        self.name = name
+        self.parent = parent
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+        self.children = {} if is_dir else None
+        self.total_size = 0
+        self.file_count = 0
+
+
+class EventLog:
+    """Numbered change events in a bounded buffer that readers can wait on"""
+
+    def __init__(self, max_events=10000):
+        self.events = collections.deque(maxlen=max_events)
+        self.next_seq = 0
+        self._cond = threading.Condition()
+
+    def publish(self, kind, path, is_dir):
+        with self._cond:
+            self.events.append({"seq": self.next_seq, "time": time.time(), "type": kind,
+                                "path": path, "is_dir": is_dir})
+            self.next_seq += 1
+            self._cond.notify_all()
+
+    def read(self, since=0, limit=1000):
+        """Return (events, next_seq, dropped) for events numbered >= since"""
+        with self._cond:
+            first = self.events[0]["seq"] if self.events else self.next_seq
+            dropped = max(0, first - since)
+            start = max(0, since - first)
+            events = list(itertools.islice(self.events, start, start + limit))
+            return events, events[-1]["seq"] + 1 if events else max(since, first), dropped
+
+    def wait(self, since, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.next_seq > since, timeout=timeout)
+        return self.read(since)
+
+
+class FsModel:
+    """Directory trees under `roots`, held in memory
+
+    Nodes are built with os.scandir without following symlinks. Each
+    directory keeps the total size and file count of its subtree, updated
+    along the parent chain as entries change, so folder sizes are lookups.
+    refresh_dir() re-reads one directory, applies the differences and
+    publishes created/deleted/modified events. `on_dir_added(path)` is
+    called before a new directory is read and `on_dir_removed(path)` after
+    one leaves the model, which is how the inotify backend keeps its
+    watches in step.
+    """
+
+    source = "memory"
+
+    def __init__(self, roots, max_events=10000):
+        self.roots = {}
+        self.root_paths = [os.path.abspath(root) for root in roots]
+        self.events = EventLog(max_events)
+        self.on_dir_added = None
+        self.on_dir_removed = None
+        self.entries = 0
+        self.dirs = 0
+        self.loaded = False
+        self.lock = threading.RLock()
+
+    def load(self, store=None):
+        """Read the roots from disk, or take those `store` (a TreeStore) has from it without any I/O"""
+        saved = {store.name_of(index): index for index in store.roots()} if store is not None else {}
+        with self.lock:
+            for root in self.root_paths:
+                if root in saved:
+                    self.roots[root] = self._copy_store(store, saved[root])
+                    continue
+                try:
+                    st = os.stat(root)
+                except OSError:
+                    continue
+                node = FsNode(root, None, True, 0, st.st_mtime_ns)
+                self.roots[root] = node
+                self._fill(node, root)
+            self.loaded = True
+
+    def _copy_store(self, store, top):
+        root = store.name_of(top)
+        top_node = FsNode(root, None, True, 0, store.mtime_ns[top])
+        top_node.total_size, top_node.file_count = store.subtree_size[top], store.subtree_files[top]
+        stack = [(top_node, top, root)]
+        while stack:
+            node, index, path = stack.pop()
+            if self.on_dir_added:
+                self.on_dir_added(path)
+            for child_index in store.children(index):
+                name = store.name_of(child_index)
+                is_dir = store.is_dir(child_index)
+                child = FsNode(name, node, is_dir, store.size[child_index], store.mtime_ns[child_index])
+                node.children[name] = child
+                self.entries += 1
+                if is_dir:
+                    self.dirs += 1
+                    child.total_size = store.subtree_size[child_index]
+                    child.file_count = store.subtree_files[child_index]
+                    stack.append((child, child_index, os.path.join(path, name)))
+        return top_node
+
+    def to_store(self, batch=2000):
+        """The model as a TreeStore, e.g. to save a snapshot
+
+        The lock is only held while about `batch` entries are copied, so
+        queries and refreshes keep running during a long copy. Each
+        directory's entries are copied in one go; a directory removed
+        meanwhile may still be in the result, which the next reconcile
+        fixes like any other change.
+        """
+        store = TreeStore()
+        with self.lock:
+            roots = list(self.roots.items())
+        for root, node in roots:
+            queue = collections.deque([(store.append(-1, root, 0, node.mtime, stat.S_IFDIR), node)])
+            while queue:
+                with self.lock:
+                    copied = 0
+                    while queue and copied < batch:
+                        index, node = queue.popleft()
+                        copied += len(node.children) + 1
+                        store.first_child[index] = len(store)
+                        store.child_count[index] = len(node.children)
+                        for name, child in node.children.items():
+                            child_index = store.append(index, name, child.size, child.mtime,
+                                                       stat.S_IFDIR if child.is_dir else stat.S_IFREG)
+                            if child.is_dir:
+                                queue.append((child_index, child))
+        store.compute_totals()
+        store.names.seal()
+        return store
+
+    def reconcile(self, force=False, stop=None):
+        """Re-read every directory whose mtime changed (all of them with `force`); returns the number of changes"""
+        changes = 0
+        for path in self.dir_paths():
+            if stop is not None and stop.is_set():
+                break
+            changes += self.refresh_dir(path, force=force)
+        return changes
+
+    def _fill(self, top, top_path):
+        """Read a new directory's whole subtree into the model and add its totals to the ancestors"""
+        dirs = [(top, top_path)]
+        stack = [(top, top_path)]
+        while stack:
+            node, path = stack.pop()
+            if self.on_dir_added:
+                self.on_dir_added(path)
+            try:
+                entries = os.scandir(path)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    is_dir = stat.S_ISDIR(st.st_mode)
+                    child = FsNode(entry.name, node, is_dir, 0 if is_dir else st.st_size, st.st_mtime_ns)
+                    node.children[entry.name] = child
+                    self.entries += 1
+                    if is_dir:
+                        self.dirs += 1
+                        dirs.append((child, entry.path))
+                        stack.append((child, entry.path))
+                    else:
+                        node.total_size += child.size
+                        node.file_count += 1
+        # Children were found after their parents, so this adds subtrees bottom-up
+        for node, _ in reversed(dirs[1:]):
+            node.parent.total_size += node.total_size
+            node.parent.file_count += node.file_count
+        self._adjust(top.parent, top.total_size, top.file_count)
+
+    def _adjust(self, node, size, count):
+        while node is not None:
+            node.total_size += size
+            node.file_count += count
+            node = node.parent
+
+    def _remove(self, node, path):
+        del node.parent.children[node.name]
+        self._adjust(node.parent, -(node.total_size if node.is_dir else node.size), -(node.file_count if node.is_dir else 1))
+        removed_dirs = []
+        stack = [(node, path)]
+        while stack:
+            current, current_path = stack.pop()
+            self.entries -= 1
+            if current.is_dir:
+                self.dirs -= 1
+                removed_dirs.append(current_path)
+                stack.extend((child, os.path.join(current_path, child.name)) for child in current.children.values())
+        if self.on_dir_removed:
+            for removed in removed_dirs:
+                self.on_dir_removed(removed)
+
+    def root_for(self, path):
+        for root in self.root_paths:
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    def covers(self, path):
+        """True if `path` is inside a watched root that has been loaded"""
+        return self.loaded and self.root_for(os.path.abspath(path)) in self.roots
+
+    def lookup(self, path):
+        path = os.path.abspath(path)
+        root = self.root_for(path)
+        node = self.roots.get(root)
+        if node is None:
+            return None
+        for part in os.path.relpath(path, root).split(os.sep):
+            if part in ("", "."):
+                continue
+            if not node.is_dir:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def refresh_dir(self, path, force=False):
+        """Re-read one directory and apply what changed; returns the number of changes
+
+        Unless `force` is set, nothing is read when the directory's mtime is
+        unchanged (entries were neither added, removed nor renamed).
+        """
+        path = os.path.abspath(path)
+        with self.lock:
+            node = self.lookup(path)
+            if node is None or not node.is_dir:
+                return 0
+            try:
+                st = os.stat(path)
+                if not force and st.st_mtime_ns == node.mtime:
+                    return 0
+                with os.scandir(path) as entries:
+                    current = {}
+                    for entry in entries:
+                        try:
+                            current[entry.name] = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+            except OSError:
+                if node.parent is None:
+                    return 0
+                self._remove(node, path)
+                self.events.publish("deleted", path, True)
+                return 1
+            node.mtime = st.st_mtime_ns
+
+            changes = 0
+            for name in [n for n in node.children if n not in current]:
+                child = node.children[name]
+                self._remove(child, os.path.join(path, name))
+                self.events.publish("deleted", os.path.join(path, name), child.is_dir)
+                changes += 1
+            for name, child_st in current.items():
+                child_path = os.path.join(path, name)
+                is_dir = stat.S_ISDIR(child_st.st_mode)
+                child = node.children.get(name)
+                if child is not None and child.is_dir != is_dir:
+                    self._remove(child, child_path)
+                    self.events.publish("deleted", child_path, child.is_dir)
+                    child = None
+                if child is None:
+                    child = FsNode(name, node, is_dir, 0 if is_dir else child_st.st_size, child_st.st_mtime_ns)
+                    node.children[name] = child
+                    self.entries += 1
+                    if is_dir:
+                        self.dirs += 1
+                        self._fill(child, child_path)
+                    else:
+                        self._adjust(node, child.size, 1)
+                    self.events.publish("created", child_path, is_dir)
+                    changes += 1
+                elif not is_dir and (child.size != child_st.st_size or child.mtime != child_st.st_mtime_ns):
+                    self._adjust(node, child_st.st_size - child.size, 0)
+                    child.size = child_st.st_size
+                    child.mtime = child_st.st_mtime_ns
+                    self.events.publish("modified", child_path, False)
+                    changes += 1
+            return changes
+
+    def dir_paths(self):
+        """Every directory in the model, parents before children"""
+        with self.lock:
+            paths = []
+            stack = list(self.roots.items())
+            while stack:
+                path, node = stack.pop()
+                paths.append(path)
+                stack.extend((os.path.join(path, name), child) for name, child in node.children.items() if child.is_dir)
+            return paths
+
+    def listing(self, path):
+        """(name, is_dir, size, mtime, file_count) for each entry of a directory, or None"""
+        self.refresh_dir(path)
+        with self.lock:
+            node = self.lookup(path)
+            if node is None or not node.is_dir:
+                return None
+            return [(name, child.is_dir, child.total_size if child.is_dir else child.size, child.mtime / 1e9,
+                     child.file_count if child.is_dir else 1)
+                    for name, child in node.children.items()]
+
+    def folder_size(self, path):
+        """(total size, file count) of a directory's subtree, or None"""
+        with self.lock:
+            node = self.lookup(path)
+            if node is None or not node.is_dir:
+                return None
+            return node.total_size, node.file_count
+
+    def glob(self, directory, pattern):
+        """Paths of the entries of `directory` whose names match `pattern`, as glob.glob would"""
+        listing = self.listing(directory)
+        if listing is None:
+            return None
+        # glob leaves out hidden names unless the pattern asks for them
+        hidden = pattern.startswith(".")
+        return [os.path.join(directory, name) for name, *_ in listing
+                if (hidden or not name.startswith(".")) and fnmatch.fnmatch(name, pattern)]
+
+    def search(self, pattern, path, limit=50):
+        """(path, size) of files below `path` whose names match the compiled regex"""
+        matches = []
+        with self.lock:
+            node = self.lookup(path)
+            if node is None or not node.is_dir:
+                return None
+            stack = [(path, node)]
+            while stack and len(matches) < limit:
+                current, node = stack.pop()
+                for name, child in node.children.items():
+                    child_path = os.path.join(current, name)
+                    if child.is_dir:
+                        stack.append((child_path, child))
+                    elif pattern.search(name):
+                        matches.append((child_path, child.size))
+                        if len(matches) >= limit:
+                            break
+        return matches
+
+    def stats(self):
+        with self.lock:
+            return {"roots": list(self.roots), "entries": self.entries, "dirs": self.dirs,
+                    "bytes": sum(node.total_size for node in self.roots.values()),
+                    "events": self.events.next_seq}
+
+
+# inotify(7) constants
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def load_inotify():
+    """libc's inotify functions through ctypes, or None where there aren't any"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyBackend:
+    """One inotify watch per directory; changed directories are re-read after a short quiet period"""
+
+    name = "inotify"
+
+    def __init__(self, model, libc, debounce=0.05, max_delay=0.5):
+        self.model = model
+        self.libc = libc
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wd_paths = {}
+        self.path_wds = {}
+        self.overflows = 0
+        self.unwatched = 0
+
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            # Running out of watches while loading means polling is the better choice;
+            # later, the directories that couldn't be watched are only counted
+            if code == errno.ENOSPC and not self.model.loaded:
+                raise OSError(code, "Out of inotify watches (see /proc/sys/fs/inotify/max_user_watches)")
+            self.unwatched += 1
+            return
+        self.wd_paths[wd] = path
+        self.path_wds[path] = wd
+
+    def remove(self, path):
+        wd = self.path_wds.pop(path, None)
+        # A directory moved inside the tree keeps its watch under the new path
+        if wd is not None and self.wd_paths.get(wd) == path:
+            del self.wd_paths[wd]
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def run(self, stop):
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        dirty = set()
+        first_dirty = None
+        while not stop.is_set():
+            timeout = self.debounce if dirty else 0.5
+            if poller.poll(timeout * 1000):
+                try:
+                    data = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    data = b""
+                offset = 0
+                while offset + EVENT_HEADER.size <= len(data):
+                    wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size + length
+                    if mask & IN_Q_OVERFLOW:
+                        self.overflows += 1
+                        dirty.update(self.model.dir_paths())
+                    elif mask & IN_IGNORED:
+                        path = self.wd_paths.pop(wd, None)
+                        if path is not None and self.path_wds.get(path) == wd:
+                            del self.path_wds[path]
+                    elif wd in self.wd_paths:
+                        path = self.wd_paths[wd]
+                        dirty.add(os.path.dirname(path) if mask & (IN_DELETE_SELF | IN_MOVE_SELF) else path)
+                first_dirty = first_dirty or time.monotonic()
+                if time.monotonic() - first_dirty < self.max_delay:
+                    continue
+            if dirty:
+                # Parents first, so a new subtree is read once rather than per level
+                for path in sorted(dirty, key=lambda p: p.count(os.sep)):
+                    self.model.refresh_dir(path, force=True)
+                dirty.clear()
+                first_dirty = None
+
+    def stats(self):
+        return {"watches": len(self.wd_paths), "unwatched_dirs": self.unwatched, "overflows": self.overflows}
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Re-read every directory and lstat its entries, `interval` seconds after the previous pass ended
+
+    Directory mtimes alone would miss files rewritten in place (they only
+    change when entries are added, removed or renamed), so each pass
+    compares every file's size and mtime too. Sizes served from the model
+    are then at most one pass plus `interval` old.
+    """
+
+    name = "polling"
+
+    def __init__(self, model, interval=5.0):
+        self.model = model
+        self.interval = interval
+        self.passes = 0
+        self.last_pass_seconds = None
+
+    def run(self, stop):
+        while not stop.wait(self.interval):
+            started = time.perf_counter()
+            for path in self.model.dir_paths():
+                if stop.is_set():
+                    return
+                self.model.refresh_dir(path, force=True)
+            self.passes += 1
+            self.last_pass_seconds = round(time.perf_counter() - started, 3)
+
+    def stats(self):
+        return {"interval": self.interval, "passes": self.passes, "last_pass_seconds": self.last_pass_seconds}
+
+    def close(self):
+        pass
+
+
+class FsWatcher:
+    """Load the model for `roots` and keep it current in a background thread
+
+    `backend` is "inotify", "polling" or "auto" (inotify on Linux,
+    polling elsewhere or if inotify can't be set up, e.g. when the watch
+    limit is reached).
+
+    With `snapshot_path`, the model is saved there every
+    `snapshot_interval` seconds if it changed, and when the watcher stops.
+    On the next start a readable snapshot answers queries at once while the
+    model is rebuilt from it in the background. Directories whose mtime
+    changed since it was saved are read again first; a second pass then
+    lstats every entry to catch files rewritten in place.
+    """
+
+    def __init__(self, roots, backend="auto", poll_interval=5.0, max_events=10000,
+                 snapshot_path=None, snapshot_interval=600.0):
+        self.model = FsModel(roots, max_events)
+        self.requested_backend = backend
+        self.poll_interval = poll_interval
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_index = None
+        self.snapshot_status = {}
+        self.backend = None
+        self.fallback_reason = None
+        self.started = None
+        self.load_seconds = None
+        self._saved_seq = None
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        store = self._open_snapshot() if self.snapshot_path else None
+        if store is None:
+            self._load()
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, args=(store,), name="fs-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _open_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return None
+        started = time.perf_counter()
+        try:
+            store = load_snapshot(self.snapshot_path)
+        except (OSError, SnapshotError) as e:
+            print(f"Ignoring the file index snapshot: {str(e)}")
+            self.snapshot_status["error"] = str(e)
+            return None
+        self.snapshot_index = SnapshotIndex(store, self.model.root_paths)
+        self.snapshot_status.update({"loaded_from": self.snapshot_path, "saved_at": store.created,
+                                     "open_seconds": round(time.perf_counter() - started, 4)})
+        return store
+
+    def _load(self, store=None):
+        started = time.perf_counter()
+        libc = load_inotify() if self.requested_backend in ("auto", "inotify") else None
+        if libc is not None:
+            try:
+                self.backend = InotifyBackend(self.model, libc)
+                self.model.on_dir_added = self.backend.add
+                self.model.on_dir_removed = self.backend.remove
+                self.model.load(store)
+            except OSError as e:
+                self.fallback_reason = str(e)
+                if isinstance(self.backend, InotifyBackend):
+                    self.backend.close()
+                self.backend = None
+                self.model = FsModel(self.model.root_paths, self.model.events.events.maxlen)
+        elif self.requested_backend == "inotify":
+            self.fallback_reason = "inotify is not available on this system"
+        if self.backend is None:
+            self.backend = PollingBackend(self.model, self.poll_interval)
+            self.model.load(store)
+        self.load_seconds = round(time.perf_counter() - started, 3)
+
+    def _run(self, store=None):
+        try:
+            if store is not None:
+                # The snapshot keeps answering until the model is built; then
+                # added, removed and renamed entries are picked up quickly (only
+                # directories with a new mtime), and in-place rewrites by the
+                # slower pass that compares every file's size and mtime
+                self._load(store)
+                self.snapshot_index = None
+                started = time.perf_counter()
+                changes = self.model.reconcile(stop=self._stop)
+                self.snapshot_status.update({"reconciled_changes": changes,
+                                             "reconcile_seconds": round(time.perf_counter() - started, 3)})
+                changes += self.model.reconcile(force=True, stop=self._stop)
+                self.snapshot_status.update({"reconciled_changes": changes,
+                                             "verify_seconds": round(time.perf_counter() - started, 3)})
+                if not changes:
+                    self._saved_seq = self.model.events.next_seq
+            if self.snapshot_path:
+                threading.Thread(target=self._checkpoint_periodically, name="fs-snapshot", daemon=True).start()
+            self.backend.run(self._stop)
+        except Exception as e:
+            print(f"File watcher stopped: {str(e)}")
+
+    def _checkpoint_periodically(self):
+        self.checkpoint()
+        while not self._stop.wait(self.snapshot_interval):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Save the model to snapshot_path if it changed since the last save; returns True if it did"""
+        with self._save_lock:
+            model = self.model
+            if not self.snapshot_path or not model.loaded:
+                return False
+            # Only the sequence number is read under the lock; to_store takes
+            # it batch by batch, which holding it here would defeat (it's an
+            # RLock). Changes made during the copy are saved again next time.
+            with model.lock:
+                seq = model.events.next_seq
+            if seq == self._saved_seq:
+                return False
+            store = model.to_store()
+            started = time.perf_counter()
+            try:
+                size = save_snapshot(store, self.snapshot_path)
+            except OSError as e:
+                print(f"Error saving the file index snapshot: {str(e)}")
+                self.snapshot_status["error"] = str(e)
+                return False
+            self._saved_seq = seq
+            self.snapshot_status.update({"saved_at": time.time(), "entries": len(store), "bytes": size,
+                                         "save_seconds": round(time.perf_counter() - started, 3)})
+            return True
+
+    def index_for(self, path):
+        """The model if it covers `path`, else the snapshot while the model is loading, else None"""
+        if self.model.covers(path):
+            return self.model
+        index = self.snapshot_index
+        if index is not None and index.covers(path):
+            return index
+        return None
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self.backend:
+            self.backend.close()
+        self.checkpoint()
+
+    def status(self):
+        status = self.model.stats()
+        status.update({"backend": self.backend.name if self.backend else None, "load_seconds": self.load_seconds,
+                       "loaded": self.model.loaded,
+                       "running": self._thread is not None and self._thread.is_alive()})
+        if self.backend:
+            status.update(self.backend.stats())
+        if self.fallback_reason:
+            status["fallback_reason"] = self.fallback_reason
+        if self.snapshot_path:
+            status["snapshot"] = dict(self.snapshot_status, path=self.snapshot_path,
+                                      serving=self.snapshot_index is not None)
+        return status
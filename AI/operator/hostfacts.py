@@ -0,0 +1,118 @@
+"""Static host facts, computed once in the background and served from memory"""
+import concurrent.futures
+import datetime
+import platform
+import re
+import socket
+import threading
+import time
+import uuid
+
+import psutil
+
+
+# Resolver calls run here so a hung DNS lookup can't hold up anything else
+_resolver = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="hostfacts-dns")
+
+
+def resolve_host_address(hostname, timeout=2.0):
+    """Resolve `hostname` to an IPv4 address, giving up after `timeout` seconds"""
+    future = _resolver.submit(socket.gethostbyname, hostname)
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        return None
+    except OSError:
+        return None
+
+
+def collect_host_facts(resolve_timeout=2.0, resolve=True):
+    """Collect facts that don't change while the server is running
+
+    With `resolve` false the resolver lookup is skipped and ip_address is
+    left out; everything else is local and quick.
+    """
+    hostname = socket.gethostname()
+    facts = {
+        "system": platform.system(),
+        "node": platform.node(),
+        "release": platform.release(),
+        "version": platform.version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "hostname": hostname,
+        "mac_address": ':'.join(re.findall('..', '%012x' % uuid.getnode())),
+    }
+    try:
+        facts.update({
+            "memory_total": f"{psutil.virtual_memory().total / (1024 ** 3):.2f} GB",
+            "disk_total": f"{psutil.disk_usage('/').total / (1024 ** 3):.2f} GB",
+            "cpu_cores": psutil.cpu_count(),
+            "boot_time": datetime.datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    except Exception as e:
+        facts["note"] = f"Extended system info error: {str(e)}"
+    if resolve:
+        facts["ip_address"] = resolve_host_address(hostname, resolve_timeout) or "unavailable"
+    return facts
+
+
+class HostFacts:
+    """Hold host facts in memory and refresh them in the background
+
+    get() never waits on a refresh: until the first collection finishes it
+    returns the cheap facts (everything except the resolver lookup), marked
+    as incomplete.
+    """
+
+    def __init__(self, resolve_timeout=2.0):
+        self.resolve_timeout = resolve_timeout
+        self.facts = None
+        self.collected_at = None
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self._local_facts = None
+
+    def refresh(self, wait=False):
+        """Recompute the facts in a background thread
+
+        Returns immediately unless `wait` is true. A refresh that is already
+        running is reused rather than starting another one.
+        """
+        with self._lock:
+            thread = self._refreshing
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._collect, name="hostfacts-refresh", daemon=True)
+                self._refreshing = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def _collect(self):
+        try:
+            facts = collect_host_facts(self.resolve_timeout)
+        except Exception as e:
+            print(f"Collecting host facts failed: {str(e)}")
+            return
+        with self._lock:
+            self.facts = facts
+            self.collected_at = time.time()
+
+    @property
+    def ready(self):
+        return self.facts is not None
+
+    def get(self):
+        """Return a copy of the current facts"""
+        facts = self.facts
+        if facts is not None:
+            return dict(facts)
+        self.refresh()
+        if self._local_facts is None:
+            self._local_facts = collect_host_facts(resolve=False)
+        facts = dict(self._local_facts)
+        facts["note"] = "Host facts are still being collected; ip_address is not available yet"
+        return facts
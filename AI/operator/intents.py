@@ -0,0 +1,289 @@
+"""Local intent resolution for voice and text commands, with an LLM fallback"""
+import collections
+import re
+import threading
+import time
+
+
+# Browser commands handled by the extension (speechControl.js)
+BROWSER_COMMANDS = [
+    "close tab", "close all tabs", "open new tab", "refresh page", "go back", "go forward",
+    "mute tab", "unmute tab", "pin tab", "unpin tab", "duplicate tab", "switch to tab",
+    "open history", "open downloads", "clear history", "zoom in", "zoom out", "reset zoom",
+    "take screenshot", "bookmark page",
+]
+
+# Operator commands; {slots} capture one or more words of the utterance
+OPERATOR_COMMANDS = {
+    "open_browser": ["open browser", "launch browser", "start browser"],
+    "open_website": ["open website {website}", "open {website} website", "go to {website}", "visit {website}",
+                     "browse to {website}"],
+    "create_file": ["create file {filename}", "make file {filename}", "new file {filename}"],
+    "delete_file": ["delete file {filename}", "remove file {filename}"],
+    "create_folder": ["create folder {folder_name}", "make folder {folder_name}", "new folder {folder_name}",
+                      "create directory {folder_name}", "make directory {folder_name}"],
+    "delete_folder": ["delete folder {folder_name}", "remove folder {folder_name}", "delete directory {folder_name}"],
+    "rename_item": ["rename {old_name} to {new_name}"],
+    "move_item": ["move {item_name} to {destination}"],
+    "open_file": ["open file {file_path}"],
+    "search_file": ["search for {file_name}", "find file {file_name}", "find {file_name}", "where is {file_name}"],
+    "list_files": ["list files", "show files", "list directory", "what files are here"],
+    "organize_files": ["organize files", "sort files", "tidy up files", "organize folder"],
+    "system_info": ["system info", "system information", "show system info", "computer info"],
+    "running_processes": ["running processes", "show processes", "list processes", "task manager"],
+    "cleanup": ["clean up", "cleanup temp files", "clean temp files", "free up space"],
+    "browser_history": ["show history", "browser history", "show browser history", "search history for {query}"],
+    "folder_size": ["folder size", "how big is {path}", "size of {path}"],
+}
+
+# Words people put around commands; skipping one costs a little
+FILLER_WORDS = {"please", "can", "could", "you", "would", "the", "a", "an", "this", "that", "my", "me",
+                "for", "i", "want", "to", "now", "just", "hey", "ok", "okay", "current", "some"}
+FILLER_COST = 0.25
+
+# Words that introduce a slot ("a folder called Projects") and are dropped
+SLOT_MARKERS = {"called", "named"}
+
+MIN_CONFIDENCE = 0.6
+
+
+def normalize(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def bounded_edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 as soon as it must exceed `limit`"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        best = i
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            best = min(best, current[j])
+        if best > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def token_cost(token, word):
+    """0 for a match, a fraction for a near miss, None if too different"""
+    if token == word:
+        return 0.0
+    limit = 0 if len(word) <= 2 else 1 if len(word) <= 6 else 2
+    if limit == 0:
+        return None
+    distance = bounded_edit_distance(token, word, limit)
+    return distance / len(word) if distance <= limit else None
+
+
+class _Node:
+    __slots__ = ("words", "slot", "intents")
+
+    def __init__(self):
+        self.words = {}
+        self.slot = None
+        self.intents = []
+
+
+class IntentResolver:
+    """Resolve a phrase to an intent: cache, then command trie, then token set, then LLM
+
+    Command templates are stored in a trie of words. Matching walks the
+    trie with the utterance's words, accepting small spelling errors
+    (edit distance scaled to word length), skipping filler words and
+    letting {slots} take one or more words. Phrases without a trie match
+    fall back to a token-set comparison against slot-free commands
+    ("please close this tab for me" -> "close tab"). Only if both miss is
+    `llm(phrase, commands)` asked for the closest command; its answer is
+    resolved locally again. Results, including misses, are kept in an
+    LRU cache of `cache_size` normalized phrases. Slot values are not
+    cached: a hit re-reads them from the phrase with only the cached
+    template, since phrases that normalize alike can differ in case or
+    punctuation ("Notes.txt" vs "notes txt").
+    """
+
+    def __init__(self, llm=None, cache_size=1024, min_confidence=MIN_CONFIDENCE):
+        self.llm = llm
+        self.cache_size = cache_size
+        self.min_confidence = min_confidence
+        self.root = _Node()
+        self.commands = []
+        self.templates = {}
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+        for command in BROWSER_COMMANDS:
+            self.add(command.replace(" ", "_"), command, target="browser")
+        for intent, templates in OPERATOR_COMMANDS.items():
+            for template in templates:
+                self.add(intent, template, target="operator")
+
+    def add(self, intent, template, target="operator"):
+        self._insert(self.root, intent, template, target)
+        if "{" in template:
+            # A trie of this template alone, for re-reading slots on cache hits
+            self.templates[template] = self._insert(_Node(), intent, template, target)
+        self.commands.append((intent, template, target))
+
+    def _insert(self, node, intent, template, target):
+        root = node
+        for word in template.split():
+            if word.startswith("{"):
+                if node.slot is None:
+                    node.slot = (word[1:-1], _Node())
+                node = node.slot[1]
+            else:
+                node = node.words.setdefault(word, _Node())
+        node.intents.append((intent, template, target))
+        return root
+
+    def _match(self, node, tokens, raw, i, cost, params, literals, best):
+        if cost >= best[0]:
+            return
+        if i == len(tokens):
+            if node.intents and literals:
+                best[:] = [cost, node.intents[0], dict(params), literals]
+            return
+        token = tokens[i]
+        child = node.words.get(token)
+        if child is not None:
+            self._match(child, tokens, raw, i + 1, cost, params, literals + 1, best)
+        for word, child in node.words.items():
+            if word != token:
+                extra = token_cost(token, word)
+                if extra is not None:
+                    self._match(child, tokens, raw, i + 1, cost + extra, params, literals + 1, best)
+        if node.slot is not None and token in SLOT_MARKERS and i + 1 < len(tokens):
+            self._match(node, tokens, raw, i + 1, cost, params, literals, best)
+        if node.slot is not None:
+            name, child = node.slot
+            # Slots take at least one word; try the shortest first
+            for j in range(i + 1, len(tokens) + 1):
+                params[name] = " ".join(raw[i:j])
+                self._match(child, tokens, raw, j, cost, params, literals, best)
+            params.pop(name, None)
+        if token in FILLER_WORDS:
+            self._match(node, tokens, raw, i + 1, cost + FILLER_COST, params, literals, best)
+
+    def _trie_match(self, tokens, raw, root=None):
+        best = [float("inf"), None, None, 0]
+        self._match(root or self.root, tokens, raw, 0, 0.0, {}, 0, best)
+        cost, command, params, literals = best
+        if command is None:
+            return None
+        return command, params, 1.0 - cost / (literals + 1)
+
+    def _token_set_match(self, tokens):
+        words = [t for t in tokens if t not in FILLER_WORDS] or tokens
+        best = None
+        for intent, template, target in self.commands:
+            if "{" in template:
+                continue
+            command_words = template.split()
+            matched = 0.0
+            for word in command_words:
+                costs = [c for c in (token_cost(t, word) for t in words) if c is not None]
+                if costs:
+                    matched += 1 - min(costs)
+            # Penalise unrelated extra words in the phrase
+            confidence = matched / len(command_words) * (len(command_words) / max(len(words), len(command_words))) ** 0.5
+            if best is None or confidence > best[1]:
+                best = ((intent, template, target), confidence)
+        if best is None:
+            return None
+        return best[0], {}, best[1]
+
+    @staticmethod
+    def _words(phrase):
+        """The phrase's words with surrounding punctuation removed, and their normalized tokens"""
+        raw = [re.sub(r"^[^\w./~-]+|[^\w./~-]+$", "", w) for w in phrase.split()]
+        raw = [w for w in raw if w]
+        return [normalize(w).replace(" ", "") for w in raw], raw
+
+    def _local(self, phrase):
+        tokens, raw = self._words(phrase)
+        for match, source in ((self._trie_match(tokens, raw), "trie"), (self._token_set_match(tokens), "token_set")):
+            if match is not None and match[2] >= self.min_confidence:
+                (intent, template, target), params, confidence = match
+                return {"intent": intent, "command": template, "target": target, "params": params,
+                        "confidence": round(confidence, 3), "source": source}
+        return None
+
+    def _from_cache(self, cached, phrase):
+        """A cached result for `phrase`, or None if its slots no longer match"""
+        if "params" in cached:
+            return dict(cached, source="cache")
+        match = self._trie_match(*self._words(phrase), root=self.templates[cached["command"]])
+        if match is None or match[2] < self.min_confidence:
+            return None
+        return dict(cached, params=match[1], confidence=round(match[2], 3), source="cache")
+
+    def _cache_entry(self, key, phrase, result):
+        """The key and value to cache `result` under"""
+        if result["command"] not in self.templates:
+            return key, result
+        if result["source"] == "llm":
+            # The slots came from the model's answer, not the phrase, so
+            # they can only be reused for exactly the same phrase
+            return (phrase,), result
+        return key, {k: v for k, v in result.items() if k != "params"}
+
+    def resolve(self, phrase, use_llm=True):
+        started = time.perf_counter()
+        key = normalize(phrase)
+        with self._lock:
+            for cache_key in (key, (phrase,)):
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.cache.move_to_end(cache_key)
+                    break
+        result = self._from_cache(cached, phrase) if cached is not None else None
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+        else:
+            with self._lock:
+                self.misses += 1
+            result = self._local(phrase)
+            if result is None and use_llm and self.llm is not None:
+                result = self._ask_llm(phrase)
+            if result is None:
+                result = {"intent": None, "command": None, "target": None, "params": {},
+                          "confidence": 0.0, "source": "none"}
+            # LLM failures aren't cached so the phrase is retried later
+            if result.get("source") != "llm_error":
+                cache_key, entry = self._cache_entry(key, phrase, result)
+                with self._lock:
+                    self.cache[cache_key] = entry
+                    self.cache.move_to_end(cache_key)
+                    while len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+        result = dict(result, phrase=phrase)
+        result["took_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def _ask_llm(self, phrase):
+        with self._lock:
+            self.llm_calls += 1
+        try:
+            answer = self.llm(phrase, [template for _, template, _ in self.commands])
+        except Exception as e:
+            print(f"Intent LLM fallback failed: {str(e)}")
+            return {"intent": None, "command": None, "target": None, "params": {},
+                    "confidence": 0.0, "source": "llm_error", "error": str(e)}
+        result = self._local(answer or "")
+        if result is None:
+            return None
+        result["source"] = "llm"
+        result["llm_answer"] = answer
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"cached": len(self.cache), "hits": self.hits, "misses": self.misses,
+                    "llm_calls": self.llm_calls, "commands": len(self.commands)}
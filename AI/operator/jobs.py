@@ -0,0 +1,248 @@
+"""Asynchronous command execution with a job registry and incremental output"""
+import codecs
+import collections
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+
+
+class JobLimitError(Exception):
+    """Raised when the concurrent job cap has been reached"""
+
+
+class Job:
+    """A command started by the registry
+
+    Output is kept as numbered chunks in a bounded buffer. Once more than
+    `max_output_bytes` have been buffered the oldest chunks are dropped, so
+    a long log tail can't grow server memory without limit; readers that
+    fall behind are told how much they missed.
+    """
+
+    FINISHED = ("exited", "failed", "timeout", "cancelled")
+
+    def __init__(self, command, timeout, max_output_bytes, cwd=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.timeout = timeout
+        self.cwd = cwd
+        self.status = "starting"
+        self.returncode = None
+        self.created = time.time()
+        self.started = None
+        self.ended = None
+        self.error = None
+        self.max_output_bytes = max_output_bytes
+        self.chunks = collections.deque()
+        self.buffered_bytes = 0
+        self.total_bytes = 0
+        self.next_seq = 0
+        self.proc = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in self.FINISHED
+
+    def append(self, stream, text):
+        if not text:
+            return
+        with self._cond:
+            size = len(text.encode('utf-8'))
+            self.chunks.append((self.next_seq, stream, text, size))
+            self.next_seq += 1
+            self.buffered_bytes += size
+            self.total_bytes += size
+            while self.buffered_bytes > self.max_output_bytes and len(self.chunks) > 1:
+                self.buffered_bytes -= self.chunks.popleft()[3]
+            self._cond.notify_all()
+
+    def finish(self, status, returncode=None, error=None):
+        with self._cond:
+            if self.done:
+                return
+            self.status = status
+            self.returncode = returncode
+            self.error = error
+            self.ended = time.time()
+            self._cond.notify_all()
+
+    def read(self, since=0):
+        """Return (chunks, next_seq, dropped) for chunks numbered >= since"""
+        with self._cond:
+            return self._read_locked(since)
+
+    def _read_locked(self, since):
+        first = self.chunks[0][0] if self.chunks else self.next_seq
+        dropped = max(0, first - since)
+        chunks = [(seq, stream, text) for seq, stream, text, _ in self.chunks if seq >= since]
+        return chunks, self.next_seq, dropped
+
+    def wait_for_output(self, since, timeout=None):
+        """Block until there is output numbered >= since or the job is done"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.next_seq > since or self.done, timeout=timeout)
+            return self._read_locked(since)
+
+    def wait(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout=timeout)
+
+    @property
+    def dropped(self):
+        """Number of chunks dropped from the front of the buffer"""
+        with self._cond:
+            return self.chunks[0][0] if self.chunks else self.next_seq
+
+    def output(self, stream=None):
+        with self._cond:
+            return "".join(text for _, s, text, _ in self.chunks if stream is None or s == stream)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "command": self.command,
+            "status": self.status,
+            "returncode": self.returncode,
+            "pid": self.proc.pid if self.proc else None,
+            "created": self.created,
+            "started": self.started,
+            "ended": self.ended,
+            "runtime": round((self.ended or time.time()) - self.started, 3) if self.started else None,
+            "timeout": self.timeout,
+            "output_bytes": self.total_bytes,
+            "next_seq": self.next_seq,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    """Start shell commands asynchronously and keep track of them by id
+
+    At most `max_concurrent` jobs run at once; further submissions are
+    rejected with JobLimitError. Each job gets a wall-clock timeout after
+    which its whole process group is killed. Finished jobs are kept (output
+    included) until `retention` newer jobs have finished.
+    """
+
+    def __init__(self, max_concurrent=4, default_timeout=300, max_timeout=3600,
+                 max_output_bytes=1024 * 1024, retention=50):
+        self.max_concurrent = max_concurrent
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.max_output_bytes = max_output_bytes
+        self.retention = retention
+        self.jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def running(self):
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if not job.done)
+
+    def submit(self, command, timeout=None, cwd=None, env=None):
+        """Start `command` in a shell and return its Job without waiting"""
+        timeout = min(timeout or self.default_timeout, self.max_timeout)
+        job = Job(command, timeout, self.max_output_bytes, cwd=cwd)
+        with self._lock:
+            if sum(1 for j in self.jobs.values() if not j.done) >= self.max_concurrent:
+                raise JobLimitError(f"Too many running jobs (limit {self.max_concurrent})")
+            self.jobs[job.id] = job
+            self._prune_locked()
+
+        try:
+            job.proc = subprocess.Popen(
+                command, shell=True, cwd=cwd, env=env,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                start_new_session=(os.name == 'posix')
+            )
+        except Exception as e:
+            job.finish("failed", error=str(e))
+            return job
+
+        job.started = time.time()
+        job.status = "running"
+        readers = [
+            threading.Thread(target=self._pump, args=(job, job.proc.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self._pump, args=(job, job.proc.stderr, "stderr"), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        threading.Thread(target=self._supervise, args=(job, readers), name=f"job-{job.id}", daemon=True).start()
+        return job
+
+    def _pump(self, job, pipe, stream):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            while True:
+                data = pipe.read1(8192)
+                if not data:
+                    break
+                job.append(stream, decoder.decode(data))
+            job.append(stream, decoder.decode(b'', final=True))
+        finally:
+            pipe.close()
+
+    def _supervise(self, job, readers):
+        try:
+            returncode = job.proc.wait(timeout=job.timeout)
+        except subprocess.TimeoutExpired:
+            self._kill(job)
+            returncode = job.proc.wait()
+            status = "timeout"
+        else:
+            status = "cancelled" if job.status == "cancelling" else "exited"
+        for reader in readers:
+            reader.join(timeout=5)
+        job.finish(status, returncode)
+
+    def _kill(self, job):
+        try:
+            if os.name == 'posix':
+                os.killpg(job.proc.pid, signal.SIGKILL)
+            else:
+                job.proc.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def cancel(self, job_id):
+        """Kill a running job; returns the Job or None if unknown"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.status = "cancelling"
+        if job.proc is not None:
+            self._kill(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [job.as_dict() for job in self.jobs.values()]
+
+    def _prune_locked(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in itertools.islice(finished, max(0, len(finished) - self.retention)):
+            del self.jobs[job_id]
+
+    def stream(self, job_id, since=0, heartbeat=15.0):
+        """Yield ("output", chunk) / ("dropped", n) / ("heartbeat", None) events until the job ends, then ("end", job)"""
+        job = self.get(job_id)
+        while True:
+            chunks, next_seq, dropped = job.wait_for_output(since, timeout=heartbeat)
+            if dropped:
+                yield "dropped", dropped
+            for chunk in chunks:
+                yield "output", chunk
+            if not chunks and not dropped and not job.done:
+                yield "heartbeat", None
+            since = next_seq
+            if job.done and since >= job.next_seq:
+                yield "end", job
+                return
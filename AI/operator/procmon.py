@@ -0,0 +1,195 @@
+"""Process table with persistent handles so CPU and IO figures are real deltas"""
+import heapq
+import threading
+import time
+
+import psutil
+
+
+class _Tracked:
+    """Per-process state kept between polls"""
+    __slots__ = ("proc", "pid", "name", "username", "cpu_percent", "rss",
+                 "memory_percent", "io_total", "io_rate")
+
+    def __init__(self, proc):
+        self.proc = proc
+        self.pid = proc.pid
+        self.name = ""
+        self.username = ""
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.memory_percent = 0.0
+        self.io_total = None
+        self.io_rate = 0.0
+
+    def as_dict(self):
+        return {
+            "pid": self.pid,
+            "name": self.name,
+            "username": self.username,
+            "cpu_percent": self.cpu_percent,
+            "memory_percent": self.memory_percent,
+            "memory_rss": self.rss,
+            "io_rate": self.io_rate,
+        }
+
+
+class ProcessMonitor:
+    """Keep psutil.Process handles alive between polls
+
+    psutil computes cpu_percent() as the delta since the previous call on the
+    same Process object, so fresh handles (what process_iter gives you on
+    every call) always report 0.0. Here each process is tracked from the
+    moment it is first seen until it exits. Static attributes (name,
+    username) are read once; each poll only reads CPU times, memory and IO
+    counters inside oneshot().
+    """
+
+    SORT_KEYS = {
+        "cpu": lambda t: t.cpu_percent,
+        "memory": lambda t: t.rss,
+        "io": lambda t: t.io_rate,
+        "pid": lambda t: t.pid,
+        "name": lambda t: t.name.lower(),
+    }
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.tracked = {}
+        self.last_poll = 0.0
+        self.polls = 0
+        self.total_memory = psutil.virtual_memory().total
+        self._lock = threading.Lock()
+        self._polled = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Poll in a background thread every `interval` seconds"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="process-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self):
+        # Two quick polls first so CPU percentages are usable right away
+        self.poll()
+        if self._stop.wait(0.1):
+            return
+        self.poll()
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Process polling failed: {str(e)}")
+
+    def poll(self):
+        """Refresh every tracked process and pick up new ones"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self.last_poll if self.last_poll else 0.0
+            current = set(psutil.pids())
+
+            for pid in list(self.tracked):
+                if pid not in current:
+                    del self.tracked[pid]
+
+            for pid in current:
+                tracked = self.tracked.get(pid)
+                if tracked is None:
+                    try:
+                        tracked = _Tracked(psutil.Process(pid))
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        continue
+                    self.tracked[pid] = tracked
+                    fresh = True
+                else:
+                    fresh = False
+
+                proc = tracked.proc
+                try:
+                    with proc.oneshot():
+                        if fresh:
+                            tracked.name = proc.name()
+                            try:
+                                tracked.username = proc.username()
+                            except (psutil.AccessDenied, KeyError):
+                                tracked.username = ""
+                        tracked.cpu_percent = proc.cpu_percent(interval=None)
+                        tracked.rss = proc.memory_info().rss
+                        tracked.memory_percent = round(tracked.rss * 100.0 / self.total_memory, 2)
+                        try:
+                            io = proc.io_counters()
+                            io_total = io.read_bytes + io.write_bytes
+                        except (psutil.AccessDenied, AttributeError, NotImplementedError):
+                            io_total = None
+                except psutil.NoSuchProcess:
+                    del self.tracked[pid]
+                    continue
+                except psutil.AccessDenied:
+                    continue
+
+                if io_total is not None and tracked.io_total is not None and elapsed > 0:
+                    tracked.io_rate = round(max(0, io_total - tracked.io_total) / elapsed, 1)
+                tracked.io_total = io_total
+
+            self.last_poll = now
+            self.polls += 1
+        with self._polled:
+            self._polled.notify_all()
+
+    def ensure_fresh(self):
+        """Poll now unless the background thread (or a recent call) already has"""
+        if self.polls < 2 and self.running:
+            # The background thread has just started; wait for its priming polls
+            with self._polled:
+                self._polled.wait_for(lambda: self.polls >= 2 or not self.running, timeout=max(2.0, self.interval * 2))
+        if self.polls < 2 and not self.running:
+            # The first poll only primes the CPU counters
+            self.poll()
+            time.sleep(0.1)
+            self.poll()
+        elif time.monotonic() - self.last_poll >= self.interval and not self.running:
+            self.poll()
+
+    def query(self, sort="cpu", descending=True, top=None, name=None, user=None, offset=0, limit=50):
+        """Filter, sort and page the process table
+
+        When only a page is needed, heapq picks the first offset+limit rows
+        instead of sorting every process.
+        """
+        key = self.SORT_KEYS.get(sort)
+        if key is None:
+            raise ValueError(f"Unknown sort key '{sort}'. Use one of: {', '.join(self.SORT_KEYS)}")
+
+        name = name.lower() if name else None
+        with self._lock:
+            rows = [t for t in self.tracked.values()
+                    if (not name or name in t.name.lower()) and (not user or user == t.username)]
+
+        total = len(rows)
+        wanted = offset + (limit if limit else total)
+        if top:
+            wanted = min(wanted, top)
+            total = min(total, top)
+
+        if wanted < len(rows):
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            rows = pick(wanted, rows, key=key)
+        else:
+            rows = sorted(rows, key=key, reverse=descending)
+
+        page = rows[offset:wanted]
+        return {"total": total, "processes": [t.as_dict() for t in page]}
@@ -0,0 +1,201 @@
+"""Index snapshots: a TreeStore on disk, queried through mmap without deserializing it
+
+Layout (little-endian header, columns in the writer's native byte order):
+
+    header      magic, version, section count, flags, entries, names,
+                name bytes, creation time
+    sections    (offset, length) for each column, the root indices and
+                the name table, in SECTIONS order
+    checksums   crc32 of header + section table, crc32 of the body
+    body        the sections, each starting on an 8-byte boundary
+
+A reader maps the file and casts each section to a memoryview, so opening
+a snapshot costs the same whatever the tree's size; only the pages a
+query touches are read.
+"""
+import array
+import fnmatch
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+
+from treestore import NameTable, TreeStore
+
+
+MAGIC = b"ZNTREE\r\n"  # the \r\n catches files mangled by newline translation
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQQQd")
+SECTION = struct.Struct("<QQ")
+CHECKSUMS = struct.Struct("<II")
+FLAG_BIG_ENDIAN = 0x1
+ALIGN = 8
+SECTIONS = TreeStore.COLUMNS + (("roots", "i"), ("name_offsets", "I"), ("name_data", "B"))
+
+
+class SnapshotError(ValueError):
+    """The file isn't a snapshot this version can read, or it is damaged"""
+
+
+def _pad(offset):
+    return -offset % ALIGN
+
+
+def _section_buffers(store):
+    for column, _ in TreeStore.COLUMNS:
+        yield getattr(store, column)
+    yield store.root_indices
+    yield store.names.offsets
+    yield store.names.data
+
+
+def save_snapshot(store, path):
+    """Write `store` to `path` atomically; returns the number of bytes written"""
+    buffers = [memoryview(buffer).cast("B") for buffer in _section_buffers(store)]
+    table_size = HEADER.size + SECTION.size * len(SECTIONS) + CHECKSUMS.size
+    offset = table_size + _pad(table_size)
+    body_start = offset
+    sections = []
+    for buffer in buffers:
+        sections.append((offset, buffer.nbytes))
+        offset += buffer.nbytes + _pad(buffer.nbytes)
+
+    header = HEADER.pack(MAGIC, VERSION, len(SECTIONS), FLAG_BIG_ENDIAN if sys.byteorder == "big" else 0,
+                         len(store), len(store.names), len(store.names.data), time.time())
+    header += b"".join(SECTION.pack(*section) for section in sections)
+    body_crc = 0
+    for buffer in buffers:
+        body_crc = zlib.crc32(buffer, body_crc)
+        body_crc = zlib.crc32(bytes(_pad(buffer.nbytes)), body_crc)
+
+    temp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(CHECKSUMS.pack(zlib.crc32(header), body_crc))
+        f.write(bytes(body_start - table_size))
+        for buffer in buffers:
+            f.write(buffer)
+            f.write(bytes(_pad(buffer.nbytes)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return offset
+
+
+def load_snapshot(path, verify=True):
+    """A read-only TreeStore whose columns are views of the mapped file
+
+    With `verify` the whole body is checksummed, which reads every page
+    once; the header is always checked.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise SnapshotError(f"{path} is too short to be a snapshot")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    magic, version, section_count, flags, entries, names, name_bytes, created = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a snapshot")
+    if version != VERSION or section_count != len(SECTIONS):
+        raise SnapshotError(f"{path} is a version {version} snapshot; this reader understands version {VERSION}")
+    if bool(flags & FLAG_BIG_ENDIAN) != (sys.byteorder == "big"):
+        raise SnapshotError(f"{path} was written on a machine with a different byte order")
+    table_end = HEADER.size + SECTION.size * section_count
+    if size < table_end + CHECKSUMS.size:
+        raise SnapshotError(f"{path} is truncated")
+    header_crc, body_crc = CHECKSUMS.unpack_from(view, table_end)
+    if zlib.crc32(view[:table_end]) != header_crc:
+        raise SnapshotError(f"{path} has a damaged header")
+    body_start = table_end + CHECKSUMS.size + _pad(table_end + CHECKSUMS.size)
+    if verify and zlib.crc32(view[body_start:]) != body_crc:
+        raise SnapshotError(f"{path} failed its checksum")
+
+    # Expected item counts; every column has one item per entry
+    expected = {"roots": None, "name_offsets": names + 1, "name_data": name_bytes}
+    sections = {}
+    for i, (section, typecode) in enumerate(SECTIONS):
+        offset, length = SECTION.unpack_from(view, HEADER.size + SECTION.size * i)
+        itemsize = array.array(typecode).itemsize
+        if offset < body_start or offset + length > size or length % itemsize:
+            raise SnapshotError(f"{path} has a bad '{section}' section")
+        values = view[offset:offset + length].cast(typecode)
+        if expected.get(section, entries) not in (None, len(values)):
+            raise SnapshotError(f"{path} has a bad '{section}' section")
+        sections[section] = values
+
+    store = TreeStore(sections, NameTable(sections["name_data"], sections["name_offsets"]), sections["roots"])
+    store.created = created
+    store.file_size = size
+    return store
+
+
+class SnapshotIndex:
+    """Answers the watcher's model queries from a snapshot until the live model is loaded
+
+    Only roots that are still watched are used. A listing is only served
+    if the directory's mtime still matches the snapshot, so it is never
+    stale; folder sizes and searches reflect the tree as it was saved.
+    """
+
+    source = "snapshot"
+
+    def __init__(self, store, roots):
+        self.store = store
+        watched = {os.path.abspath(root) for root in roots}
+        self.root_paths = [store.name_of(index) for index in store.roots() if store.name_of(index) in watched]
+
+    def covers(self, path):
+        path = os.path.abspath(path)
+        return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in self.root_paths)
+
+    def _directory(self, path):
+        if not self.covers(path):
+            return None
+        index = self.store.find(path)
+        if index is None or not self.store.is_dir(index):
+            return None
+        return index
+
+    def listing(self, path):
+        """Same as FsModel.listing, or None if the directory changed since the snapshot"""
+        index = self._directory(path)
+        if index is None:
+            return None
+        try:
+            if os.stat(path).st_mtime_ns != self.store.mtime_ns[index]:
+                return None
+        except OSError:
+            return None
+        store = self.store
+        return [(store.name_of(child), store.is_dir(child), store.subtree_size[child], store.mtime_ns[child] / 1e9,
+                 store.subtree_files[child]) for child in store.children(index)]
+
+    def folder_size(self, path):
+        index = self._directory(path)
+        if index is None:
+            return None
+        return self.store.subtree_size[index], self.store.subtree_files[index]
+
+    def glob(self, directory, pattern):
+        listing = self.listing(directory)
+        if listing is None:
+            return None
+        hidden = pattern.startswith(".")
+        return [os.path.join(directory, name) for name, *_ in listing
+                if (hidden or not name.startswith(".")) and fnmatch.fnmatch(name, pattern)]
+
+    def search(self, pattern, path, limit=50):
+        index = self._directory(path)
+        if index is None:
+            return None
+        found = self.store.search(pattern, under=index, limit=limit, files_only=True)
+        return [(self.store.path(i), self.store.size[i]) for i in found]
+
+    def stats(self):
+        return {"roots": self.root_paths, "entries": len(self.store), "created": self.store.created,
+                "file_size": self.store.file_size}
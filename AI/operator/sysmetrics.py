@@ -0,0 +1,139 @@
+"""Background sampling of system metrics into a fixed-size ring buffer"""
+import collections
+import threading
+import time
+
+import psutil
+
+
+class MetricsSampler:
+    """Sample CPU, memory, disk and network counters at a fixed interval
+
+    Samples are kept in a ring buffer of `history` entries, so memory use is
+    bounded no matter how long the server runs. Readers never block on
+    psutil: they get the latest sample or a slice of the buffer.
+    """
+
+    FIELDS = (
+        "time",
+        "cpu_percent",
+        "memory_percent",
+        "memory_used",
+        "memory_available",
+        "disk_percent",
+        "disk_used",
+        "disk_free",
+        "disk_read_bytes",
+        "disk_write_bytes",
+        "net_bytes_sent",
+        "net_bytes_recv",
+        "disk_read_rate",
+        "disk_write_rate",
+        "net_sent_rate",
+        "net_recv_rate",
+    )
+
+    def __init__(self, interval=1.0, history=3600, disk_path='/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.samples = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampled = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the sampler thread (no-op if already running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # Prime the CPU counter; the first sample is taken one interval
+            # later so its CPU figure covers a real window instead of ~0%
+            psutil.cpu_percent(interval=None)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Metrics sampling failed: {str(e)}")
+
+    def sample(self):
+        """Take one sample and append it to the ring buffer"""
+        now = time.time()
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        try:
+            disk_io = psutil.disk_io_counters()
+        except Exception:
+            disk_io = None
+        try:
+            net_io = psutil.net_io_counters()
+        except Exception:
+            net_io = None
+
+        sample = {
+            "time": round(now, 3),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": memory.percent,
+            "memory_used": memory.used,
+            "memory_available": memory.available,
+            "disk_percent": disk.percent,
+            "disk_used": disk.used,
+            "disk_free": disk.free,
+            "disk_read_bytes": disk_io.read_bytes if disk_io else 0,
+            "disk_write_bytes": disk_io.write_bytes if disk_io else 0,
+            "net_bytes_sent": net_io.bytes_sent if net_io else 0,
+            "net_bytes_recv": net_io.bytes_recv if net_io else 0,
+        }
+
+        with self._lock:
+            previous = self.samples[-1] if self.samples else None
+            elapsed = now - previous["time"] if previous else 0
+            for rate, counter in (("disk_read_rate", "disk_read_bytes"),
+                                  ("disk_write_rate", "disk_write_bytes"),
+                                  ("net_sent_rate", "net_bytes_sent"),
+                                  ("net_recv_rate", "net_bytes_recv")):
+                if elapsed > 0:
+                    sample[rate] = round(max(0, sample[counter] - previous[counter]) / elapsed, 1)
+                else:
+                    sample[rate] = 0.0
+            self.samples.append(sample)
+        self._sampled.set()
+        return sample
+
+    def latest(self, wait=None):
+        """Return the most recent sample, or None if nothing was sampled yet
+
+        With `wait`, block up to that many seconds for the first sample.
+        """
+        if wait is not None:
+            self._sampled.wait(wait)
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def series(self, seconds=None):
+        """Return samples from the last `seconds` in columnar form
+
+        Each field maps to a list of values, which is much smaller on the
+        wire than a list of per-sample dicts with repeated keys.
+        """
+        with self._lock:
+            samples = list(self.samples)
+        if seconds is not None and samples:
+            cutoff = samples[-1]["time"] - seconds
+            samples = [s for s in samples if s["time"] >= cutoff]
+        return {field: [s[field] for s in samples] for field in self.FIELDS}
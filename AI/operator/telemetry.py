@@ -0,0 +1,266 @@
+"""Append-only storage and rollups for the browser extension's tab telemetry"""
+import datetime
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+
+EVENT_TYPES = ("tab_count", "tab_created", "tab_removed", "tab_activated", "navigation", "active_time")
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+# One event per record: unix time, event type, open tabs, domain id (0 =
+# none) and milliseconds the domain was in front (active_time events)
+RECORD = struct.Struct("<IBHII")
+
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+
+
+class TelemetryError(ValueError):
+    """A batch that can't be decoded"""
+
+
+def decode_batch(body, encoding=None, max_bytes=MAX_BATCH_BYTES):
+    """Events from a request body, gzip/deflate compressed or plain JSON
+
+    The body is {"events": [...]} or a bare list. Decompression stops at
+    `max_bytes`, so a small compressed body can't expand without bound.
+    """
+    encoding = (encoding or "identity").lower()
+    if encoding in ("gzip", "deflate"):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, max_bytes + 1)
+        except zlib.error as e:
+            raise TelemetryError(f"Invalid {encoding} body: {str(e)}")
+        if len(body) > max_bytes or decompressor.unconsumed_tail:
+            raise TelemetryError(f"Batch larger than {max_bytes} bytes uncompressed")
+    elif encoding != "identity":
+        raise TelemetryError(f"Unsupported Content-Encoding '{encoding}'")
+
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise TelemetryError(f"Invalid JSON: {str(e)}")
+    events = payload.get("events") if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        raise TelemetryError("Expected a list of events")
+    return events
+
+
+def local_day(timestamp):
+    """Unix time of local midnight on the day of `timestamp`"""
+    day = datetime.date.fromtimestamp(timestamp)
+    return int(time.mktime(day.timetuple()))
+
+
+class Bucket:
+    """Counters for one hour, day or (day, domain)"""
+
+    __slots__ = ("events", "created", "removed", "activations", "navigations",
+                 "tab_samples", "tab_sum", "tab_max", "active_ms", "last_seen")
+
+    def __init__(self):
+        self.events = self.created = self.removed = self.activations = self.navigations = 0
+        self.tab_samples = self.tab_sum = self.tab_max = self.active_ms = self.last_seen = 0
+
+    def add(self, timestamp, code, tabs, active_ms):
+        self.events += 1
+        self.last_seen = max(self.last_seen, timestamp)
+        self.active_ms += active_ms
+        if code == 1:
+            self.created += 1
+        elif code == 2:
+            self.removed += 1
+        elif code == 3:
+            self.activations += 1
+        elif code == 4:
+            self.navigations += 1
+        if tabs:
+            self.tab_samples += 1
+            self.tab_sum += tabs
+            self.tab_max = max(self.tab_max, tabs)
+
+
+class TelemetryStore:
+    """Tab events in daily append-only segment files, with in-memory rollups
+
+    Each local day is one file of fixed-size records (RECORD, 15 bytes per
+    event); domains are interned once in domains.txt and records carry
+    their line number. Batches are appended with a single write. Hourly,
+    daily and per-domain-per-day rollups are updated as events arrive and
+    rebuilt from the segments on startup, so queries never touch the
+    files. Segments older than `retention_days` are deleted at startup.
+    """
+
+    ROLLUP_COLUMNS = ("events", "created", "removed", "activations", "navigations",
+                      "tabs_avg", "tabs_max", "active_seconds")
+
+    def __init__(self, directory, retention_days=90):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.domains = [""]
+        self.domain_ids = {"": 0}
+        self.hourly = {}
+        self.daily = {}
+        self.domain_daily = {}
+        self.records = 0
+        self._quarter_days = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _segment_path(self, day):
+        return os.path.join(self.directory, datetime.date.fromtimestamp(day).strftime("%Y-%m-%d") + ".tsr")
+
+    def _load(self):
+        domains_path = os.path.join(self.directory, "domains.txt")
+        if os.path.exists(domains_path):
+            with open(domains_path, encoding="utf-8") as f:
+                for line in f:
+                    self._intern(line.rstrip("\n"), persist=False)
+
+        cutoff = datetime.date.today() - datetime.timedelta(days=self.retention_days)
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".tsr"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                expired = datetime.date.fromisoformat(name[:-4]) < cutoff
+            except ValueError:
+                continue
+            if expired:
+                os.remove(path)
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            # A torn final record from a crash mid-write is ignored
+            usable = len(data) - len(data) % RECORD.size
+            for record in RECORD.iter_unpack(data[:usable]):
+                self._apply(*record)
+
+    def _intern(self, domain, persist=True):
+        domain_id = self.domain_ids.get(domain)
+        if domain_id is None:
+            if persist:
+                with open(os.path.join(self.directory, "domains.txt"), "a", encoding="utf-8") as f:
+                    f.write(domain + "\n")
+            domain_id = len(self.domains)
+            self.domains.append(domain)
+            self.domain_ids[domain] = domain_id
+        return domain_id
+
+    def _day(self, timestamp):
+        # Every UTC offset is a multiple of 15 minutes, so local days start
+        # on a quarter hour and one lookup per quarter hour is enough
+        quarter = timestamp // 900
+        day = self._quarter_days.get(quarter)
+        if day is None:
+            day = self._quarter_days[quarter] = local_day(quarter * 900)
+        return day
+
+    def _apply(self, timestamp, code, tabs, domain_id, active_ms):
+        hour = timestamp - timestamp % 3600
+        day = self._day(timestamp)
+        for rollup, key in ((self.hourly, hour), (self.daily, day), (self.domain_daily, (day, domain_id))):
+            bucket = rollup.get(key)
+            if bucket is None:
+                bucket = rollup[key] = Bucket()
+            bucket.add(timestamp, code, tabs, active_ms)
+        self.records += 1
+
+    def ingest(self, events, now=None):
+        """Validate, append and roll up a batch; returns accepted/rejected counts
+
+        Each event is {"t": milliseconds since the epoch, "type": one of
+        EVENT_TYPES, "tabs": open tab count, "domain": str, "active_ms":
+        int}; only t and type are required.
+        """
+        now = time.time() if now is None else now
+        oldest = now - self.retention_days * 86400
+        rows = []
+        rejected = 0
+        for event in events:
+            try:
+                timestamp = int(event["t"]) // 1000
+                code = EVENT_CODES[event["type"]]
+                tabs = min(max(int(event.get("tabs") or 0), 0), 0xFFFF)
+                active_ms = min(max(int(event.get("active_ms") or 0), 0), 0xFFFFFFFF)
+                domain = str(event.get("domain") or "").lower()[:253]
+            except (KeyError, TypeError, ValueError):
+                rejected += 1
+                continue
+            if not oldest <= timestamp <= now + 86400 or "\n" in domain:
+                rejected += 1
+                continue
+            rows.append((timestamp, code, tabs, domain, active_ms))
+
+        with self._lock:
+            by_day = {}
+            for timestamp, code, tabs, domain, active_ms in rows:
+                record = (timestamp, code, tabs, self._intern(domain), active_ms)
+                by_day.setdefault(self._day(timestamp), []).append(record)
+            for day, records in by_day.items():
+                data = b"".join(RECORD.pack(*record) for record in records)
+                fd = os.open(self._segment_path(day), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+                for record in records:
+                    self._apply(*record)
+        return {"accepted": len(rows), "rejected": rejected}
+
+    def rollup(self, granularity="hour", since=None, until=None):
+        """Columns of per-hour or per-day counters in [since, until)"""
+        buckets = self.hourly if granularity == "hour" else self.daily
+        since = since or 0
+        until = until or float("inf")
+        with self._lock:
+            keys = sorted(k for k in buckets if since <= k < until)
+            series = {column: [] for column in ("time",) + self.ROLLUP_COLUMNS}
+            for key in keys:
+                bucket = buckets[key]
+                series["time"].append(key)
+                series["events"].append(bucket.events)
+                series["created"].append(bucket.created)
+                series["removed"].append(bucket.removed)
+                series["activations"].append(bucket.activations)
+                series["navigations"].append(bucket.navigations)
+                series["tabs_avg"].append(round(bucket.tab_sum / bucket.tab_samples, 1) if bucket.tab_samples else None)
+                series["tabs_max"].append(bucket.tab_max)
+                series["active_seconds"].append(round(bucket.active_ms / 1000))
+        return series
+
+    def top_domains(self, since=None, until=None, limit=20, sort="active_seconds"):
+        """Per-domain totals over the days in [since, until), best first"""
+        since = local_day(since) if since else 0
+        until = until or float("inf")
+        totals = {}
+        with self._lock:
+            for (day, domain_id), bucket in self.domain_daily.items():
+                if domain_id == 0 or not since <= day < until:
+                    continue
+                total = totals.get(domain_id)
+                if total is None:
+                    total = totals[domain_id] = Bucket()
+                total.activations += bucket.activations
+                total.navigations += bucket.navigations
+                total.active_ms += bucket.active_ms
+                total.last_seen = max(total.last_seen, bucket.last_seen)
+            domains = [{
+                "domain": self.domains[domain_id],
+                "activations": total.activations,
+                "navigations": total.navigations,
+                "active_seconds": round(total.active_ms / 1000),
+                "last_seen": total.last_seen,
+            } for domain_id, total in totals.items()]
+        domains.sort(key=lambda d: d.get(sort, 0), reverse=True)
+        return domains[:limit]
+
+    def stats(self):
+        with self._lock:
+            return {"records": self.records, "domains": len(self.domains) - 1,
+                    "hours": len(self.hourly), "days": len(self.daily), "record_bytes": RECORD.size}
@@ -0,0 +1,269 @@
+"""Long-lived shell processes, one per terminal session"""
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+
+
+class SessionTimeout(Exception):
+    """Raised when a command doesn't finish within its timeout"""
+
+
+class SessionLimitError(Exception):
+    """Raised when the concurrent command cap has been reached"""
+
+
+class TerminalSession:
+    """A persistent /bin/sh that commands are piped into
+
+    The shell keeps its own working directory and environment between
+    commands, so `cd` and `export` behave as in a real terminal without
+    touching the server process. After each command the shell prints a
+    per-command marker line carrying the exit status and current directory,
+    which is how we know where one command's output ends.
+
+    Each stream keeps at most `max_output_bytes` of a command's output; the
+    oldest bytes are dropped past that and counted, like a Job's buffer.
+    """
+
+    def __init__(self, session_id, shell='/bin/sh', cwd=None, env=None, max_output_bytes=1024 * 1024):
+        self.session_id = session_id
+        self.shell = shell
+        self.initial_cwd = cwd or os.getcwd()
+        self.env = env
+        self.max_output_bytes = max_output_bytes
+        self.cwd = self.initial_cwd
+        self.created = time.time()
+        self.last_used = self.created
+        self.commands = 0
+        self.proc = None
+        self._buffers = {"stdout": bytearray(), "stderr": bytearray()}
+        self._dropped = {"stdout": 0, "stderr": 0}
+        self._seen = {"stdout": False, "stderr": False}
+        self._marker = None
+        self._cond = threading.Condition()
+        self._run_lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self.proc = subprocess.Popen(
+            [self.shell], cwd=self.cwd, env=self.env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+        for name, pipe in (("stdout", self.proc.stdout), ("stderr", self.proc.stderr)):
+            threading.Thread(target=self._pump, args=(name, pipe, self.proc),
+                             name=f"terminal-{self.session_id}-{name}", daemon=True).start()
+
+    def _pump(self, name, pipe, proc):
+        while True:
+            data = pipe.read1(8192)
+            with self._cond:
+                if proc is not self.proc:
+                    return
+                if not data:
+                    self._cond.notify_all()
+                    return
+                buffer = self._buffers[name]
+                buffer.extend(data)
+                if self._marker is not None and not self._seen[name]:
+                    # Search only the new bytes, plus enough before them to
+                    # catch a marker split across two reads
+                    start = max(0, len(buffer) - len(data) - len(self._marker) + 1)
+                    self._seen[name] = buffer.find(self._marker, start) != -1
+                excess = len(buffer) - self.max_output_bytes
+                if excess > 0:
+                    del buffer[:excess]
+                    self._dropped[name] += excess
+                self._cond.notify_all()
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def run(self, command, timeout=30.0):
+        """Run `command` in this session's shell and return its result"""
+        with self._run_lock:
+            if not self.alive:
+                # The previous shell exited (e.g. the user typed `exit`)
+                self._start()
+
+            marker = f"__zenith_done_{uuid.uuid4().hex}__"
+            script = (
+                # Commands read from /dev/null so they can't swallow the marker
+                f"{{ {command}\n}} < /dev/null\n"
+                f"printf '\\n{marker} %s %s\\n' \"$?\" \"$(pwd)\"\n"
+                f"printf '\\n{marker}\\n' >&2\n"
+            )
+            marker_bytes = marker.encode('utf-8')
+            with self._cond:
+                for name in self._buffers:
+                    self._buffers[name].clear()
+                    self._dropped[name] = 0
+                    self._seen[name] = False
+                self._marker = marker_bytes
+
+            self.last_used = time.time()
+            self.commands += 1
+            try:
+                self.proc.stdin.write(script.encode('utf-8'))
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self._restart()
+                raise
+
+            deadline = time.monotonic() + timeout
+            with self._cond:
+                done = self._cond.wait_for(
+                    lambda: (self._seen["stdout"] and self._seen["stderr"]) or self.proc.poll() is not None,
+                    timeout=max(0, deadline - time.monotonic())
+                )
+                finished = self._seen["stdout"]
+                dropped = dict(self._dropped)
+                stdout = bytes(self._buffers["stdout"])
+                stderr = bytes(self._buffers["stderr"])
+                self._buffers["stdout"].clear()
+                self._buffers["stderr"].clear()
+                self._marker = None
+            self.last_used = time.time()
+
+            if not done:
+                # We can't tell what state the shell is in, so start over
+                self._restart()
+                raise SessionTimeout(f"Command timed out after {timeout} seconds; session was restarted")
+
+            if not finished:
+                # The shell exited while running the command
+                return {
+                    "stdout": stdout.decode('utf-8', errors='replace'),
+                    "stderr": stderr.decode('utf-8', errors='replace'),
+                    "returncode": self.proc.poll(),
+                    "cwd": self.cwd,
+                    "dropped": dropped,
+                }
+
+            out, _, trailer = stdout.rpartition(b"\n" + marker_bytes + b" ")
+            returncode, _, cwd = trailer.decode('utf-8', errors='replace').rstrip("\n").partition(" ")
+            err = stderr.rpartition(b"\n" + marker_bytes)[0]
+            self.cwd = cwd or self.cwd
+            return {
+                "stdout": out.decode('utf-8', errors='replace'),
+                "stderr": err.decode('utf-8', errors='replace'),
+                "returncode": int(returncode) if returncode.lstrip('-').isdigit() else None,
+                "cwd": self.cwd,
+                "dropped": dropped,
+            }
+
+    def _restart(self):
+        self.close()
+        self._start()
+
+    def close(self):
+        proc = self.proc
+        if proc is None:
+            return
+        with self._cond:
+            self.proc = None
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        proc.wait()
+        for pipe in (proc.stdin, proc.stdout, proc.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def as_dict(self):
+        return {
+            "session_id": self.session_id,
+            "cwd": self.cwd,
+            "pid": self.proc.pid if self.proc else None,
+            "created": self.created,
+            "last_used": self.last_used,
+            "commands": self.commands,
+        }
+
+
+class SessionManager:
+    """Create terminal sessions on demand and reap idle ones
+
+    Sessions idle for longer than `idle_timeout` seconds are closed by a
+    background reaper. When `max_sessions` is reached, the least recently
+    used session is closed to make room. At most `max_running` commands run
+    at once across all sessions; further ones are rejected with
+    SessionLimitError.
+    """
+
+    def __init__(self, idle_timeout=900, max_sessions=16, reap_interval=60, cwd=None,
+                 max_running=4, max_output_bytes=1024 * 1024):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_running = max_running
+        self.max_output_bytes = max_output_bytes
+        self.running = 0
+        self.reap_interval = reap_interval
+        self.cwd = cwd
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def get(self, session_id):
+        """Return the session for `session_id`, starting a shell if needed"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                while len(self.sessions) >= self.max_sessions:
+                    oldest = min(self.sessions.values(), key=lambda s: s.last_used)
+                    del self.sessions[oldest.session_id]
+                    oldest.close()
+                session = TerminalSession(session_id, cwd=self.cwd, max_output_bytes=self.max_output_bytes)
+                self.sessions[session_id] = session
+            if self._reaper is None or not self._reaper.is_alive():
+                self._reaper = threading.Thread(target=self._reap_loop, name="terminal-reaper", daemon=True)
+                self._reaper.start()
+        return session
+
+    def run(self, session_id, command, timeout=30.0):
+        with self._lock:
+            if self.running >= self.max_running:
+                raise SessionLimitError(f"Too many running terminal commands (limit {self.max_running})")
+            self.running += 1
+        try:
+            return self.get(session_id).run(command, timeout=timeout)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def close(self, session_id):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session is not None
+
+    def reap(self):
+        """Close sessions that have been idle too long; returns how many"""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            idle = [s for s in self.sessions.values() if s.last_used < cutoff and not s._run_lock.locked()]
+            for session in idle:
+                del self.sessions[session.session_id]
+        for session in idle:
+            session.close()
+        return len(idle)
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Reaping terminal sessions failed: {str(e)}")
+
+    def list(self):
+        with self._lock:
+            return [s.as_dict() for s in self.sessions.values()]
@@ -0,0 +1,254 @@
+"""A compact, array-backed store for indexing very large directory trees"""
+import array
+import collections
+import heapq
+import os
+import stat
+import sys
+
+
+class NameTable:
+    """Distinct entry names, each stored once as UTF-8 in a single buffer
+
+    Name i is data[offsets[i]:offsets[i + 1]]. While the table is being
+    built a dict maps names to ids so repeated names (node_modules,
+    index.js, __init__.py...) share one id; seal() drops it once the tree
+    is complete.
+    """
+
+    def __init__(self, data=None, offsets=None):
+        self.data = bytearray() if data is None else data
+        self.offsets = array.array("I", [0]) if offsets is None else offsets
+        self._ids = {} if data is None else None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def intern(self, name):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            self.data += name.encode("utf-8", "surrogateescape")
+            self.offsets.append(len(self.data))
+            name_id = self._ids[name] = len(self.offsets) - 2
+        return name_id
+
+    def raw(self, name_id):
+        return bytes(self.data[self.offsets[name_id]:self.offsets[name_id + 1]])
+
+    def name(self, name_id):
+        return self.raw(name_id).decode("utf-8", "surrogateescape")
+
+    def seal(self):
+        self._ids = None
+
+    def nbytes(self):
+        total = len(self.data) + self.offsets.itemsize * len(self.offsets)
+        if self._ids:
+            total += sys.getsizeof(self._ids) + sum(sys.getsizeof(name) for name in self._ids)
+        return total
+
+
+class TreeStore:
+    """Directory trees as parallel columns instead of one object per entry
+
+    Entry i is described by parent[i] (-1 for a root, whose name is its
+    absolute path), name[i] (an id in `names`), size[i], mtime_ns[i] and
+    mode[i]. Entries are added breadth first, so the children of a
+    directory are contiguous: first_child[i] and child_count[i] give their
+    range. subtree_size and subtree_files hold each directory's totals (a
+    file's own size and 1).
+
+    The columns only need indexing and len(), so the same queries work on
+    array.array columns built here and on memoryviews of a snapshot file.
+    """
+
+    COLUMNS = (
+        ("parent", "i"),
+        ("name", "I"),
+        ("size", "q"),
+        ("mtime_ns", "q"),
+        ("mode", "H"),
+        ("first_child", "i"),
+        ("child_count", "I"),
+        ("subtree_size", "q"),
+        ("subtree_files", "I"),
+    )
+
+    SORT_KEYS = ("name", "size", "mtime", "files")
+
+    def __init__(self, columns=None, names=None, roots=None):
+        if columns is None:
+            columns = {column: array.array(typecode) for column, typecode in self.COLUMNS}
+        for column, _ in self.COLUMNS:
+            setattr(self, column, columns[column])
+        self.names = names if names is not None else NameTable()
+        self.root_indices = roots if roots is not None else array.array("i")
+
+    def __len__(self):
+        return len(self.parent)
+
+    @classmethod
+    def scan(cls, *roots):
+        """Index the trees under `roots` (breadth first, symlinks not followed)"""
+        store = cls()
+        for root in roots:
+            root = os.path.abspath(root)
+            store._scan_root(root, os.stat(root))
+        store.compute_totals()
+        store.names.seal()
+        return store
+
+    def append(self, parent, name, size, mtime_ns, mode):
+        """Add an entry and return its index (a directory's children go in one contiguous run)"""
+        if parent < 0:
+            self.root_indices.append(len(self.parent))
+        is_dir = stat.S_ISDIR(mode)
+        self.parent.append(parent)
+        self.name.append(self.names.intern(name))
+        self.size.append(0 if is_dir else size)
+        self.mtime_ns.append(mtime_ns)
+        self.mode.append(mode & 0xFFFF)
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        self.subtree_size.append(0 if is_dir else size)
+        self.subtree_files.append(0 if is_dir else 1)
+        return len(self.parent) - 1
+
+    def _scan_root(self, root, st):
+        queue = collections.deque([(self.append(-1, root, 0, st.st_mtime_ns, st.st_mode), root)])
+        while queue:
+            index, path = queue.popleft()
+            try:
+                with os.scandir(path) as entries:
+                    listed = []
+                    for entry in entries:
+                        try:
+                            listed.append((entry.name, entry.path, entry.stat(follow_symlinks=False)))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            self.first_child[index] = len(self.parent)
+            self.child_count[index] = len(listed)
+            for name, child_path, child_st in listed:
+                child = self.append(index, name, child_st.st_size, child_st.st_mtime_ns, child_st.st_mode)
+                if stat.S_ISDIR(child_st.st_mode):
+                    queue.append((child, child_path))
+
+    def compute_totals(self):
+        """Fill subtree_size and subtree_files from the leaves up"""
+        parent, subtree_size, subtree_files = self.parent, self.subtree_size, self.subtree_files
+        # Breadth-first order puts every child after its parent
+        for index in range(len(parent) - 1, -1, -1):
+            up = parent[index]
+            if up >= 0:
+                subtree_size[up] += subtree_size[index]
+                subtree_files[up] += subtree_files[index]
+
+    # Queries
+
+    def roots(self):
+        return list(self.root_indices)
+
+    def is_dir(self, index):
+        return stat.S_ISDIR(self.mode[index])
+
+    def name_of(self, index):
+        return self.names.name(self.name[index])
+
+    def path(self, index):
+        parts = []
+        while index >= 0:
+            parts.append(self.name_of(index))
+            index = self.parent[index]
+        return os.path.join(*reversed(parts))
+
+    def children(self, index):
+        first = self.first_child[index]
+        return range(first, first + self.child_count[index]) if first >= 0 else range(0)
+
+    def find(self, path):
+        """Index of the entry at `path`, or None"""
+        path = os.path.abspath(path)
+        for root in self.roots():
+            root_path = self.name_of(root)
+            if path == root_path:
+                return root
+            if not path.startswith(root_path.rstrip(os.sep) + os.sep):
+                continue
+            index = root
+            for part in os.path.relpath(path, root_path).split(os.sep):
+                wanted = part.encode("utf-8", "surrogateescape")
+                index = next((c for c in self.children(index) if self.names.raw(self.name[c]) == wanted), None)
+                if index is None:
+                    return None
+            return index
+        return None
+
+    def _sort_key(self, key):
+        if key == "name":
+            return lambda i: self.name_of(i).lower()
+        if key == "size":
+            return self.subtree_size.__getitem__
+        if key == "mtime":
+            return self.mtime_ns.__getitem__
+        if key == "files":
+            return self.subtree_files.__getitem__
+        raise ValueError(f"Unknown sort key '{key}'. Use one of: {', '.join(self.SORT_KEYS)}")
+
+    def sorted_children(self, index, key="name", reverse=False, limit=None):
+        """A directory's children ordered by name, size (subtree total for folders), mtime or files"""
+        sort_key = self._sort_key(key)
+        children = self.children(index)
+        if limit is not None and limit < len(children):
+            pick = heapq.nlargest if reverse else heapq.nsmallest
+            return pick(limit, children, key=sort_key)
+        return sorted(children, key=sort_key, reverse=reverse)
+
+    def iter_subtree(self, index):
+        """Every entry below `index` (not including it)"""
+        stack = [index]
+        while stack:
+            for child in self.children(stack.pop()):
+                yield child
+                if self.first_child[child] >= 0:
+                    stack.append(child)
+
+    def largest_files(self, limit=20, under=None):
+        """The `limit` biggest files, in the whole store or below one directory"""
+        candidates = self.iter_subtree(under) if under is not None else range(len(self))
+        return heapq.nlargest(limit, (i for i in candidates if not self.is_dir(i)), key=self.size.__getitem__)
+
+    def search(self, pattern, under=None, limit=50, files_only=False):
+        """Entries whose names match the compiled regex; each distinct name is tested once"""
+        matching = set()
+        for name_id in range(len(self.names)):
+            if pattern.search(self.names.name(name_id)):
+                matching.add(name_id)
+        if not matching:
+            return []
+        candidates = self.iter_subtree(under) if under is not None else range(len(self))
+        found = []
+        for index in candidates:
+            if self.name[index] in matching and not (files_only and self.is_dir(index)):
+                found.append(index)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def entry(self, index):
+        """An entry as the file APIs describe it"""
+        name = self.name_of(index)
+        if self.is_dir(index):
+            return {"name": name, "type": "folder", "path": self.path(index),
+                    "size": self.subtree_size[index], "files": self.subtree_files[index]}
+        return {"name": name, "type": "file", "path": self.path(index), "size": self.size[index],
+                "extension": os.path.splitext(name)[1].lower(), "modified": self.mtime_ns[index] / 1e9}
+
+    def nbytes(self):
+        """Memory held by the columns and the name table"""
+        total = self.names.nbytes() + self.root_indices.itemsize * len(self.root_indices)
+        for column, _ in self.COLUMNS:
+            values = getattr(self, column)
+            total += values.itemsize * len(values)
+        return total
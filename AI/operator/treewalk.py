@@ -0,0 +1,112 @@
+"""Resumable directory walks with time and entry budgets"""
+import collections
+import os
+import threading
+import time
+import uuid
+
+
+class Budget:
+    """Stop a walk after `seconds` of wall time or `entries` directory entries (None = no limit)"""
+
+    def __init__(self, seconds=None, entries=None):
+        self.seconds = seconds
+        self.entries = entries
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds if seconds else None
+        self.used = 0
+        self.reason = None
+
+    def charge(self, n=1):
+        self.used += n
+
+    def exhausted(self):
+        if self.reason is None:
+            if self.entries is not None and self.used >= self.entries:
+                self.reason = "entries"
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.reason = "time"
+        return self.reason is not None
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+class TreeWalk:
+    """Depth-first walk of a tree that can stop at any entry and carry on later
+
+    The state is the stack of directories still to list plus the entries
+    of the directory being processed, so a walk parked between requests
+    holds no open handles. Directories are yielded like any other entry
+    and descended into; symlinks are never followed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.stack = [root]
+        self.pending = collections.deque()
+        self.scanned = 0
+        self.dirs = 0
+        self.skipped_dirs = 0
+        self.done = False
+
+    def walk(self, budget):
+        """Yield os.DirEntry objects until the tree is finished or `budget` is exhausted"""
+        while not budget.exhausted():
+            if not self.pending:
+                if not self.stack:
+                    self.done = True
+                    return
+                directory = self.stack.pop()
+                try:
+                    with os.scandir(directory) as entries:
+                        self.pending.extend(entries)
+                except OSError:
+                    self.skipped_dirs += 1
+                    continue
+                self.dirs += 1
+                continue
+            entry = self.pending.popleft()
+            budget.charge()
+            self.scanned += 1
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    self.stack.append(entry.path)
+            except OSError:
+                pass
+            yield entry
+
+
+class CursorStore:
+    """Partial results parked under a continuation token until the client resumes
+
+    Each token can be used once (a resumed request that stops again gets a
+    new one), so two clients can't advance the same walk concurrently.
+    Tokens expire after `ttl` seconds; only the newest `max_cursors` are kept.
+    """
+
+    def __init__(self, ttl=600, max_cursors=200):
+        self.ttl = ttl
+        self.max_cursors = max_cursors
+        self.cursors = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, kind, state):
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.cursors[token] = (kind, time.time(), state)
+            while len(self.cursors) > self.max_cursors:
+                self.cursors.popitem(last=False)
+        return token
+
+    def take(self, token, kind):
+        """The state saved under `token` for `kind`, or None if unknown or expired"""
+        with self._lock:
+            saved = self.cursors.get(token)
+            if saved is None or saved[0] != kind:
+                return None
+            del self.cursors[token]
+        if time.time() - saved[1] > self.ttl:
+            return None
+        return saved[2]
@@ -0,0 +1,134 @@
+"""Lazily created subsystems with an optional background warm-up"""
+import threading
+import time
+
+
+class SubsystemUnavailable(Exception):
+    """Raised by a loader when its subsystem can't work here (e.g. a missing package)"""
+
+
+class Subsystem:
+    """A named resource built by `loader` on first use or during warm-up
+
+    get() is thread safe: concurrent first callers wait for one load
+    instead of each running the loader. A loader that fails is retried on
+    the next get(); one that raises SubsystemUnavailable is not.
+    """
+
+    def __init__(self, name, loader, required=True, ready_check=None):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.ready_check = ready_check
+        self.state = "pending"
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == "ready":
+            return self.value
+        with self._lock:
+            if self.state == "ready":
+                return self.value
+            if self.state == "unavailable":
+                raise SubsystemUnavailable(self.error)
+            self.state = "loading"
+            started = time.perf_counter()
+            try:
+                self.value = self.loader()
+                self.state = "ready"
+                self.error = None
+            except SubsystemUnavailable as e:
+                self.state = "unavailable"
+                self.error = str(e)
+                raise
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                raise
+            finally:
+                self.load_seconds = round(time.perf_counter() - started, 4)
+        return self.value
+
+    @property
+    def ready(self):
+        if self.state != "ready":
+            return False
+        return self.ready_check is None or bool(self.ready_check(self.value))
+
+    def as_dict(self):
+        status = {
+            "state": self.state,
+            "ready": self.ready,
+            "required": self.required,
+            "load_seconds": self.load_seconds,
+        }
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+class Subsystems:
+    """Registry of lazy subsystems and the warm-up that preloads them"""
+
+    def __init__(self):
+        self.subsystems = {}
+        self.started_at = time.time()
+        self.warmup_state = "idle"
+        self._warmup_thread = None
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, required=True, ready_check=None):
+        self.subsystems[name] = Subsystem(name, loader, required, ready_check)
+        return self.subsystems[name]
+
+    def get(self, name):
+        return self.subsystems[name].get()
+
+    def peek(self, name):
+        """The subsystem's value if it is already loaded, else None (never loads it)"""
+        subsystem = self.subsystems.get(name)
+        return subsystem.value if subsystem is not None and subsystem.state == "ready" else None
+
+    def warm_up(self, names=None, background=True):
+        """Load the subsystems (all, in registration order, by default)
+
+        Failures are recorded on each subsystem, not raised. Returns the
+        warm-up thread, or None when `background` is false.
+        """
+        names = list(names or self.subsystems)
+        with self._lock:
+            if self._warmup_thread is not None and self._warmup_thread.is_alive():
+                return self._warmup_thread
+            self.warmup_state = "running"
+            if background:
+                self._warmup_thread = threading.Thread(target=self._warm, args=(names,), name="warmup", daemon=True)
+                self._warmup_thread.start()
+                return self._warmup_thread
+        self._warm(names)
+        return None
+
+    def _warm(self, names):
+        for name in names:
+            try:
+                self.subsystems[name].get()
+            except SubsystemUnavailable:
+                pass
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {str(e)}")
+        self.warmup_state = "done"
+
+    @property
+    def ready(self):
+        """True once every required subsystem is ready"""
+        return all(s.ready for s in self.subsystems.values() if s.required)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "warmup": self.warmup_state,
+            "uptime": round(time.time() - self.started_at, 1),
+            "subsystems": {name: s.as_dict() for name, s in self.subsystems.items()},
+        }
@@ -6,7 +6,12 @@ import re
 from flask import Flask, render_template, request, redirect, url_for, flash, session
 from werkzeug.utils import secure_filename
 
+from request_metrics import instrument_app, files_scanned, files_moved, bytes_moved
+from request_profiler import install_profiler
+
 app = Flask(__name__)
+instrument_app(app, name='organizer')
+install_profiler(app)
 app.secret_key = 'development-key'  # Change this for production!
 
 # Configure upload folder
@@ -84,7 +89,9 @@ def suggest_category_by_content_pattern(filename):
 
 def get_files_with_sorting_info(directory, sort_order):
     files_info = []
-    for item in os.listdir(directory):
+    items = os.listdir(directory)
+    files_scanned.inc(len(items), operation="get_files_with_sorting_info")
+    for item in items:
         item_path = os.path.join(directory, item)
         if os.path.isfile(item_path):
             file_info = {
@@ -251,15 +258,22 @@ def organize():
             os.makedirs(category_path, exist_ok=True)
     
     # Move files to appropriate categories
+    moved = 0
+    moved_bytes = 0
     for file, category in file_categories.items():
         source_path = os.path.join(upload_folder, file)
         dest_path = os.path.join(upload_folder, category, file)
         
         try:
+            size = os.path.getsize(source_path)
             shutil.move(source_path, dest_path)
+            moved += 1
+            moved_bytes += size
             results.append(f"Moved '{file}' to '{category}'")
         except Exception as e:
             results.append(f"Error moving '{file}': {str(e)}")
+    files_moved.inc(moved, operation="organize")
+    bytes_moved.inc(moved_bytes, operation="organize")
     
     # Generate results tree
     organized_tree = []
@@ -0,0 +1,223 @@
+"""Repeatable benchmarks for the file functions of both apps and the categorizer
+
+    python benchmarks/run_benchmarks.py --preset medium --output results.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --fail-on-regression
+
+Every run builds the same synthetic tree (see treegen.py) from the preset
+and seed, times each benchmark `--repeat` times after a warm-up run, and
+writes the timings as JSON. With --baseline, each benchmark's median is
+compared against the stored one and anything slower by more than
+--threshold is reported as a regression. Baselines are machine specific:
+record one on the machine you compare on.
+"""
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import treegen
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+OPERATOR_DIR = os.path.join(REPO_ROOT, 'AI', 'operator')
+CATEGORIZER_PATH = os.path.join(REPO_ROOT, 'uploads', '20250505153516', 'Code', 'llm-file-categorizer-main_categorizer.py')
+
+
+def load_module(name, path, extra_path=None):
+    """Import a file under a unique module name (both apps are called app.py)"""
+    if extra_path and extra_path not in sys.path:
+        sys.path.insert(0, extra_path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        spec.loader.exec_module(module)
+    sys.modules[name] = module
+    return module
+
+
+class Benchmark:
+    def __init__(self, name, func, setup=None, items=None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.items = items
+
+    def run(self, repeat, warmup=1):
+        timings = []
+        for i in range(warmup + repeat):
+            args = self.setup() if self.setup else ()
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                self.func(*args)
+                elapsed = time.perf_counter() - started
+            if i >= warmup:
+                timings.append(elapsed)
+        result = {
+            "repeat": repeat,
+            "min": round(min(timings), 6),
+            "median": round(statistics.median(timings), 6),
+            "mean": round(statistics.mean(timings), 6),
+            "stdev": round(statistics.stdev(timings), 6) if len(timings) > 1 else 0.0,
+        }
+        if self.items:
+            result["items"] = self.items
+            result["items_per_second"] = round(self.items / result["median"], 1) if result["median"] else None
+        return result
+
+
+def build_benchmarks(workdir, tree, flat_files, seed, only=None):
+    """The benchmark list; modules that can't be imported here are skipped"""
+    benchmarks = []
+    skipped = {}
+    tree_root = tree["root"]
+    flat_root = os.path.join(workdir, 'flat')
+
+    def fresh_flat():
+        treegen.generate_flat(flat_root, flat_files, seed=seed)
+        return (flat_root,)
+
+    fresh_flat()
+
+    try:
+        operator = load_module('operator_app', os.path.join(OPERATOR_DIR, 'app.py'), OPERATOR_DIR)
+        benchmarks += [
+            Benchmark("operator.navigate_directory", operator.navigate_directory, lambda: (tree_root,), tree["files"]),
+            Benchmark("operator.search_for_file", operator.search_for_file,
+                      lambda: ("no_such_file_anywhere", tree_root), tree["files"]),
+            Benchmark("operator.get_folder_size", operator.get_folder_size, lambda: (tree_root,), tree["files"]),
+            Benchmark("operator.organize_files", operator.organize_files, fresh_flat, flat_files),
+        ]
+    except ImportError as e:
+        skipped["operator"] = str(e)
+
+    try:
+        organizer = load_module('organizer_app', os.path.join(REPO_ROOT, 'app.py'), REPO_ROOT)
+        benchmarks += [
+            Benchmark("organizer.get_files_with_sorting_info[name]", organizer.get_files_with_sorting_info,
+                      lambda: (flat_root, "1"), flat_files),
+            Benchmark("organizer.get_files_with_sorting_info[size_desc]", organizer.get_files_with_sorting_info,
+                      lambda: (flat_root, "5"), flat_files),
+        ]
+    except ImportError as e:
+        skipped["organizer"] = str(e)
+
+    try:
+        categorizer = load_module('categorizer', CATEGORIZER_PATH)
+        categorizer.set_backend(categorizer.StubBackend(seed=seed))
+        names = sorted(os.listdir(flat_root))
+        benchmarks += [
+            Benchmark("categorizer.get_files_with_sorting_info", categorizer.get_files_with_sorting_info,
+                      lambda: (flat_root, "1"), flat_files),
+        ]
+        for mode, label in (("1", "extension"), ("2", "date"), ("3", "pattern"), ("5", "llm_stub")):
+            benchmarks.append(Benchmark(
+                f"categorizer.classify[{label}]",
+                lambda folder, files, mode=mode: categorizer.categorize_files(folder, files, mode, interactive=False),
+                lambda: (flat_root, names), flat_files))
+    except ImportError as e:
+        skipped["categorizer"] = str(e)
+
+    # organize_files moves files out of the flat folder, so it runs last
+    benchmarks.sort(key=lambda b: b.name == "operator.organize_files")
+    if only:
+        benchmarks = [b for b in benchmarks if any(pattern in b.name for pattern in only)]
+    return benchmarks, skipped
+
+
+def compare(results, baseline, threshold):
+    """Median ratios against a baseline; ratio > 1 + threshold is a regression"""
+    comparison = {}
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous or not previous.get("median"):
+            comparison[name] = {"status": "new"}
+            continue
+        ratio = current["median"] / previous["median"]
+        status = "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 - threshold else "unchanged"
+        comparison[name] = {
+            "status": status,
+            "baseline_median": previous["median"],
+            "median": current["median"],
+            "ratio": round(ratio, 3),
+        }
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the file-operation benchmarks")
+    parser.add_argument("--preset", choices=sorted(treegen.PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--flat-files", type=int, default=500, help="Files in the flat folder used by the organizers")
+    parser.add_argument("--size-distribution", default="lognormal", choices=["fixed", "uniform", "lognormal", "pareto"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", action="append", help="Only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--workdir", help="Where to build the trees (default: a temporary directory)")
+    parser.add_argument("--output", help="Write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", help="Also write the results to this path")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown counted as a regression (default: 0.2)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="zenith-bench-")
+    try:
+        tree = treegen.generate_tree(os.path.join(workdir, 'tree'), size_distribution=args.size_distribution,
+                                     seed=args.seed, **treegen.PRESETS[args.preset])
+        benchmarks, skipped = build_benchmarks(workdir, tree, args.flat_files, args.seed, args.only)
+
+        results = {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "preset": args.preset,
+                "seed": args.seed,
+                "flat_files": args.flat_files,
+                "tree": {k: v for k, v in tree.items() if k != "root"},
+            },
+            "benchmarks": {},
+        }
+        if skipped:
+            results["meta"]["skipped"] = skipped
+        for benchmark in benchmarks:
+            results["benchmarks"][benchmark.name] = benchmark.run(args.repeat)
+            print(f"{benchmark.name}: {results['benchmarks'][benchmark.name]['median'] * 1000:.2f} ms", file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.threshold)
+        regressions = [name for name, c in results["comparison"].items() if c["status"] == "regression"]
+
+    text = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text)
+
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Memory per indexed entry: per-entry dicts vs. node objects vs. the array-backed TreeStore
+
+    python benchmarks/tree_memory.py --preset large
+    python benchmarks/tree_memory.py --preset medium --output memory.json
+
+Builds the same synthetic tree as run_benchmarks.py (see treegen.py) and
+indexes it three ways: a list of dicts like the ones navigate_directory
+and get_files_with_sorting_info build, the watcher's FsModel (one
+__slots__ object per entry) and TreeStore (parallel arrays plus a name
+table). Memory is what tracemalloc sees allocated by each build and still
+alive afterwards; it covers Python objects, not the interpreter itself.
+TreeStore query timings are reported alongside.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import treegen
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+OPERATOR_DIR = os.path.join(REPO_ROOT, 'AI', 'operator')
+sys.path.insert(0, OPERATOR_DIR)
+
+from fswatch import FsModel
+from treestore import TreeStore
+
+
+def build_dicts(root):
+    """One dict per entry, as the file APIs return them"""
+    entries = []
+    for directory, dirnames, filenames in os.walk(root):
+        for name in dirnames:
+            path = os.path.join(directory, name)
+            entries.append({"name": name, "type": "folder", "path": path, "modified": os.path.getmtime(path)})
+        for name in filenames:
+            path = os.path.join(directory, name)
+            st = os.stat(path)
+            entries.append({"name": name, "type": "file", "path": path, "size": st.st_size,
+                            "extension": os.path.splitext(name)[1].lower(), "modified": st.st_mtime})
+    return entries
+
+
+def build_model(root):
+    model = FsModel([root])
+    model.load()
+    return model
+
+
+def measure(build, root, entries):
+    """Build once under tracemalloc; returns the result and its memory and time"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = build(root)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return result, {
+        "bytes": used,
+        "bytes_per_entry": round(used / entries, 1),
+        "build_seconds": round(elapsed, 4),
+    }
+
+
+def time_query(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) * 1000, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory cost of tree representations")
+    parser.add_argument("--preset", choices=sorted(treegen.PRESETS), default="medium")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Where to build the tree (default: a temporary directory)")
+    parser.add_argument("--output", help="Write results JSON here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="zenith-bench-")
+    try:
+        tree = treegen.generate_tree(os.path.join(workdir, 'tree'), seed=args.seed, **treegen.PRESETS[args.preset])
+        root = tree["root"]
+        entries = tree["files"] + tree["directories"] - 1
+
+        results = {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "preset": args.preset,
+                "seed": args.seed,
+                "entries": entries,
+            },
+            "representations": {},
+        }
+        for name, build in (("dicts", build_dicts), ("fswatch.FsModel", build_model), ("treestore.TreeStore", TreeStore.scan)):
+            built, stats = measure(build, root, entries)
+            results["representations"][name] = stats
+            print(f"{name}: {stats['bytes_per_entry']} bytes/entry, built in {stats['build_seconds'] * 1000:.1f} ms",
+                  file=sys.stderr)
+            if name == "treestore.TreeStore":
+                store = built
+                stats["self_reported_bytes"] = store.nbytes()
+            del built
+
+        top = store.find(root)
+        pattern = re.compile(r"report_2_0001", re.IGNORECASE)
+        results["treestore_queries_ms"] = {
+            "find": time_query(lambda: store.find(os.path.join(root, "dir_1_000", "dir_2_001"))),
+            "children_by_size": time_query(lambda: store.sorted_children(top, "size", reverse=True)),
+            "children_by_name": time_query(lambda: store.sorted_children(top, "name")),
+            "subtree_size": time_query(lambda: store.subtree_size[top]),
+            "largest_files_20": time_query(lambda: store.largest_files(20)),
+            "search": time_query(lambda: store.search(pattern)),
+        }
+        dicts = results["representations"]["dicts"]["bytes_per_entry"]
+        compact = results["representations"]["treestore.TreeStore"]["bytes_per_entry"]
+        results["dicts_to_treestore_ratio"] = round(dicts / compact, 1) if compact else None
+        print(f"TreeStore uses {results['dicts_to_treestore_ratio']}x less memory than dicts", file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Deterministic synthetic directory trees for benchmarks
+
+The same parameters and seed always produce the same tree: names, layout,
+extensions and sizes. Files are created sparse (truncated to their size),
+so large trees are cheap to generate while still reporting realistic
+sizes to os.path.getsize / stat.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+
+
+DEFAULT_EXTENSIONS = {
+    '.txt': 10, '.pdf': 8, '.docx': 5, '.xlsx': 3, '.csv': 3,
+    '.jpg': 12, '.png': 10, '.gif': 2,
+    '.mp4': 2, '.mp3': 3,
+    '.zip': 2, '.py': 8, '.js': 8, '.json': 5, '.html': 3,
+    '.log': 6, '': 2,
+}
+
+NAME_WORDS = [
+    'report', 'invoice', 'photo', 'backup', 'notes', 'draft', 'final', 'data',
+    'project', 'resume', 'screenshot', 'meeting', 'budget', 'plan', 'log',
+    'summary', 'archive', 'test', 'config', 'readme',
+]
+
+PRESETS = {
+    "small": {"depth": 2, "fanout": 3, "files_per_dir": 20},
+    "medium": {"depth": 3, "fanout": 4, "files_per_dir": 40},
+    "large": {"depth": 4, "fanout": 5, "files_per_dir": 60},
+}
+
+
+def sample_size(rng, distribution, mean_size):
+    """Draw a file size in bytes from the named distribution"""
+    if distribution == "fixed":
+        return mean_size
+    if distribution == "uniform":
+        return rng.randint(0, 2 * mean_size)
+    if distribution == "lognormal":
+        # Heavy tail: most files small, a few very large; sigma=1.5
+        sigma = 1.5
+        mu = math.log(max(mean_size, 1)) - sigma ** 2 / 2
+        return int(rng.lognormvariate(mu, sigma))
+    if distribution == "pareto":
+        alpha = 1.5
+        return int(mean_size * (alpha - 1) / alpha * rng.paretovariate(alpha))
+    raise ValueError(f"Unknown size distribution '{distribution}'")
+
+
+def generate_tree(root, depth=3, fanout=4, files_per_dir=40, size_distribution="lognormal",
+                  mean_size=64 * 1024, extensions=None, seed=0, clean=True):
+    """Create a synthetic tree under `root` and return a summary dict
+
+    depth:          directory levels below root (0 = files in root only)
+    fanout:         subdirectories per directory
+    files_per_dir:  files in every directory
+    extensions:     {extension: weight} mix, DEFAULT_EXTENSIONS by default
+    """
+    rng = random.Random(seed)
+    extensions = extensions or DEFAULT_EXTENSIONS
+    ext_names = sorted(extensions)
+    ext_weights = [extensions[e] for e in ext_names]
+
+    if clean and os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+
+    files = 0
+    directories = 0
+    total_bytes = 0
+    pending = [(root, 0)]
+    while pending:
+        directory, level = pending.pop()
+        directories += 1
+        for i in range(files_per_dir):
+            ext = rng.choices(ext_names, ext_weights)[0]
+            name = f"{rng.choice(NAME_WORDS)}_{level}_{i:05d}{ext}"
+            size = sample_size(rng, size_distribution, mean_size)
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.truncate(size)
+            files += 1
+            total_bytes += size
+        if level < depth:
+            for j in range(fanout):
+                child = os.path.join(directory, f"dir_{level + 1}_{j:03d}")
+                os.mkdir(child)
+                pending.append((child, level + 1))
+
+    return {
+        "root": root,
+        "seed": seed,
+        "depth": depth,
+        "fanout": fanout,
+        "files_per_dir": files_per_dir,
+        "size_distribution": size_distribution,
+        "mean_size": mean_size,
+        "directories": directories,
+        "files": files,
+        "bytes": total_bytes,
+    }
+
+
+def generate_flat(root, files, size_distribution="lognormal", mean_size=64 * 1024, extensions=None, seed=0):
+    """A single directory of `files` files (what the organizers work on)"""
+    return generate_tree(root, depth=0, fanout=0, files_per_dir=files, size_distribution=size_distribution,
+                         mean_size=mean_size, extensions=extensions, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic directory tree")
+    parser.add_argument("root")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--depth", type=int)
+    parser.add_argument("--fanout", type=int)
+    parser.add_argument("--files-per-dir", type=int)
+    parser.add_argument("--size-distribution", default="lognormal", choices=["fixed", "uniform", "lognormal", "pareto"])
+    parser.add_argument("--mean-size", type=int, default=64 * 1024)
+    parser.add_argument("--extensions", help='JSON {extension: weight} mix, e.g. \'{".txt": 3, ".jpg": 1}\'')
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    options = dict(PRESETS[args.preset])
+    for key in ("depth", "fanout", "files_per_dir"):
+        if getattr(args, key) is not None:
+            options[key] = getattr(args, key)
+    summary = generate_tree(args.root, size_distribution=args.size_distribution, mean_size=args.mean_size,
+                            extensions=json.loads(args.extensions) if args.extensions else None,
+                            seed=args.seed, **options)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
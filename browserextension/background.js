@@ -1,5 +1,29 @@
 // Background script for Browser Statistics extension
 
+// Local operator server (AI/operator/app.py) that stores tab telemetry
+const OPERATOR_URL = 'http://127.0.0.1:5000';
+const TELEMETRY_FLUSH_INTERVAL = 60 * 1000; // 1 minute
+const TELEMETRY_MAX_QUEUE = 5000;
+const TELEMETRY_PERSIST_DELAY = 10 * 1000; // batch storage writes
+
+// Events not yet sent to the operator, each numbered by seq; mirrored to
+// storage (at most every TELEMETRY_PERSIST_DELAY) so they survive the
+// service worker being stopped
+let telemetryQueue = [];
+let telemetrySeq = 0;
+let telemetryFlushing = false;
+let telemetryPersistTimer = null;
+chrome.storage.local.get(['telemetryQueue'], function(result) {
+    // Stored events are older than anything queued since startup, so they
+    // are renumbered below zero to keep the queue in seq order
+    const stored = result.telemetryQueue || [];
+    stored.forEach(function(event, i) { event.seq = i - stored.length; });
+    telemetryQueue = stored.concat(telemetryQueue);
+});
+
+// Domain of the tab currently in front and since when
+let activeDomain = null;
+
 // Initialize any data storage when the extension is installed
 chrome.runtime.onInstalled.addListener(function() {
     console.log('Browser Statistics extension installed');
@@ -125,16 +149,119 @@ function captureSystemInfo() {
     });
 }
 
+// Function to queue a telemetry event for the operator
+function recordTelemetry(event) {
+    telemetryQueue.push(Object.assign({ t: Date.now(), seq: telemetrySeq++ }, event));
+    if (telemetryQueue.length > TELEMETRY_MAX_QUEUE) {
+        telemetryQueue = telemetryQueue.slice(-TELEMETRY_MAX_QUEUE);
+    }
+    persistTelemetrySoon();
+}
+
+// Function to write the queue to storage once events stop arriving for a moment
+function persistTelemetrySoon() {
+    if (telemetryPersistTimer !== null) return;
+    telemetryPersistTimer = setTimeout(function() {
+        telemetryPersistTimer = null;
+        chrome.storage.local.set({
+            'telemetryQueue': telemetryQueue
+        });
+    }, TELEMETRY_PERSIST_DELAY);
+}
+
+// Function to get the domain of a URL, without www.
+function domainOf(url) {
+    try {
+        return new URL(url).hostname.replace(/^www\./, '');
+    } catch (error) {
+        return '';
+    }
+}
+
+// Function to credit the time spent on the previous domain and start
+// timing a new one (null when the browser loses focus)
+function switchActiveDomain(domain) {
+    const now = Date.now();
+    if (activeDomain && activeDomain.domain) {
+        recordTelemetry({ type: 'active_time', domain: activeDomain.domain, active_ms: now - activeDomain.since });
+    }
+    activeDomain = domain === null ? null : { domain: domain, since: now };
+}
+
+// Function to send queued telemetry to the operator as one gzip batch
+async function flushTelemetry() {
+    // One flush at a time, so the same events are never sent twice
+    if (telemetryQueue.length === 0 || telemetryFlushing) return;
+    telemetryFlushing = true;
+    
+    const batch = telemetryQueue.slice(0);
+    const lastSent = batch[batch.length - 1].seq;
+    try {
+        const stream = new Blob([JSON.stringify({ events: batch })]).stream()
+            .pipeThrough(new CompressionStream('gzip'));
+        const response = await fetch(`${OPERATOR_URL}/api/telemetry`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Content-Encoding': 'gzip' },
+            body: await new Response(stream).arrayBuffer()
+        });
+        // 400 means the batch itself was rejected; resending won't help
+        if (response.ok || response.status === 400) {
+            // Drop by seq: the queue may have been trimmed or grown meanwhile
+            telemetryQueue = telemetryQueue.filter(function(event) { return event.seq > lastSent; });
+            persistTelemetrySoon();
+        }
+    } catch (error) {
+        // Operator not running; keep the queue for the next flush
+    } finally {
+        telemetryFlushing = false;
+    }
+}
+
+setInterval(flushTelemetry, TELEMETRY_FLUSH_INTERVAL);
+
 // Listen for tab creation and removal to keep statistics
 chrome.tabs.onCreated.addListener(function(tab) {
     chrome.tabs.query({}, function(tabs) {
         recordTabsHistory(tabs.length);
+        recordTelemetry({ type: 'tab_created', tabs: tabs.length });
     });
 });
 
 chrome.tabs.onRemoved.addListener(function(tabId, removeInfo) {
     chrome.tabs.query({}, function(tabs) {
         recordTabsHistory(tabs.length);
+        recordTelemetry({ type: 'tab_removed', tabs: tabs.length });
+    });
+});
+
+// Track which domain is in front for per-domain time
+chrome.tabs.onActivated.addListener(function(activeInfo) {
+    chrome.tabs.get(activeInfo.tabId, function(tab) {
+        if (chrome.runtime.lastError || !tab) return;
+        const domain = domainOf(tab.url || '');
+        switchActiveDomain(domain);
+        recordTelemetry({ type: 'tab_activated', domain: domain });
+    });
+});
+
+chrome.tabs.onUpdated.addListener(function(tabId, changeInfo, tab) {
+    if (!changeInfo.url) return;
+    const domain = domainOf(changeInfo.url);
+    if (tab.active && (!activeDomain || activeDomain.domain !== domain)) {
+        switchActiveDomain(domain);
+    }
+    recordTelemetry({ type: 'navigation', domain: domain });
+});
+
+chrome.windows.onFocusChanged.addListener(function(windowId) {
+    if (windowId === chrome.windows.WINDOW_ID_NONE) {
+        switchActiveDomain(null);
+        return;
+    }
+    chrome.tabs.query({ active: true, windowId: windowId }, function(tabs) {
+        if (tabs.length > 0) {
+            switchActiveDomain(domainOf(tabs[0].url || ''));
+        }
     });
 });
 
@@ -151,6 +278,7 @@ function collectPeriodicStats() {
     chrome.tabs.query({}, function(tabs) {
         // Update tab history
         recordTabsHistory(tabs.length);
+        recordTelemetry({ type: 'tab_count', tabs: tabs.length });
         
         // Store hourly tab count in a rolling array
         chrome.storage.local.get(['hourlyTabCounts'], function(result) {
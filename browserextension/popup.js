@@ -1,3 +1,7 @@
+// Local operator server (AI/operator/app.py), used for indexed history
+// search and the tab activity summaries behind the dashboards
+const OPERATOR_URL = 'http://127.0.0.1:5000';
+
 // Main initialization function
 document.addEventListener('DOMContentLoaded', function() {
     // Load all data when popup opens
@@ -9,6 +13,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Set up close tabs button
     document.getElementById('close-tabs-btn').addEventListener('click', closeSelectedTabs);
     
+    // Set up history search
+    setupHistorySearch();
+    
     // Set up tab switching
     setupTabNavigation();
     
@@ -64,34 +71,24 @@ function getTabsInfo() {
         const tabCount = tabs.length;
         document.getElementById('tab-count').textContent = tabCount;
         
-        // Count domains
-        const domains = {};
-        tabs.forEach(tab => {
-            try {
-                const url = new URL(tab.url);
-                const domain = url.hostname;
-                domains[domain] = (domains[domain] || 0) + 1;
-            } catch (e) {
-                // Handle invalid URLs
+        // Top domains by time in front over the last week, from the
+        // operator; without it, count the open tabs per domain
+        fetchTelemetry('domains', { since: '7d', limit: 3 }).then(data => {
+            let domainText = '';
+            if (data && data.domains.length > 0) {
+                domainText = `Top domains (7 days): ${data.domains.map(d =>
+                    `${d.domain} (${formatTime(d.active_seconds)})`).join(', ')}`;
+            } else {
+                const topDomains = countTabDomains(tabs).slice(0, 3);
+                if (topDomains.length > 0) {
+                    domainText = `Top domains: ${topDomains.map(d => `${d[0]} (${d[1]})`).join(', ')}`;
+                } else {
+                    domainText = 'No domains found';
+                }
             }
+            document.getElementById('tab-domains').textContent = domainText;
         });
         
-        // Get the top domains
-        const domainEntries = Object.entries(domains);
-        domainEntries.sort((a, b) => b[1] - a[1]);
-        
-        const topDomains = domainEntries.slice(0, 3);
-        let domainText = '';
-        
-        if (topDomains.length > 0) {
-            domainText = `Top domains: ${topDomains.map(d => 
-                `${d[0].replace('www.', '')} (${d[1]})`).join(', ')}`;
-        } else {
-            domainText = 'No domains found';
-        }
-        
-        document.getElementById('tab-domains').textContent = domainText;
-        
         // Create tabs list with checkboxes for deletion
         const tabsList = document.getElementById('open-tabs-list');
         if (!tabsList) return;
@@ -187,34 +184,86 @@ function getHistoryInfo() {
         }
         
         // Show the most recent 10 history items
-        historyItems.slice(0, 10).forEach(item => {
-            const historyItem = document.createElement('div');
-            historyItem.className = 'stat-item';
-            
-            const title = document.createElement('div');
-            title.className = 'title';
-            title.textContent = item.title || 'Untitled Page';
-            
-            const url = document.createElement('div');
-            url.className = 'url';
-            url.textContent = item.url;
-            
-            const visitDate = new Date(item.lastVisitTime);
-            const meta = document.createElement('div');
-            meta.className = 'meta';
-            meta.textContent = `Visited: ${visitDate.toLocaleString()}`;
-            
-            historyItem.appendChild(title);
-            historyItem.appendChild(url);
-            historyItem.appendChild(meta);
-            historyList.appendChild(historyItem);
-        });
+        renderHistoryItems(historyItems.slice(0, 10));
         
         // Create history chart
         createHistoryChart(historyItems);
     });
 }
 
+// Function to render history entries ({title, url, lastVisitTime} in ms)
+function renderHistoryItems(items) {
+    const historyList = document.getElementById('history-list');
+    if (!historyList) return;
+    
+    historyList.innerHTML = '';
+    
+    if (items.length === 0) {
+        historyList.innerHTML = '<div class="loading">No history items found.</div>';
+        return;
+    }
+    
+    items.forEach(item => {
+        const historyItem = document.createElement('div');
+        historyItem.className = 'stat-item';
+        
+        const title = document.createElement('div');
+        title.className = 'title';
+        title.textContent = item.title || 'Untitled Page';
+        
+        const url = document.createElement('div');
+        url.className = 'url';
+        url.textContent = item.url;
+        
+        const visitDate = new Date(item.lastVisitTime);
+        const meta = document.createElement('div');
+        meta.className = 'meta';
+        meta.textContent = `Visited: ${visitDate.toLocaleString()}`;
+        
+        historyItem.appendChild(title);
+        historyItem.appendChild(url);
+        historyItem.appendChild(meta);
+        historyList.appendChild(historyItem);
+    });
+}
+
+// Function to set up the history search box
+function setupHistorySearch() {
+    const input = document.getElementById('history-search');
+    if (!input) return;
+    
+    let timer = null;
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const query = input.value.trim();
+            if (query) {
+                searchHistory(query);
+            } else {
+                getHistoryInfo();
+            }
+        }, 200);
+    });
+}
+
+// Function to search history through the operator's full-text index
+// (supports site:, since: and until:), falling back to chrome.history
+async function searchHistory(query) {
+    try {
+        const params = new URLSearchParams({ q: query, limit: 10 });
+        const response = await fetch(`${OPERATOR_URL}/api/browser_history/search?${params}`);
+        const data = await response.json();
+        if (data.status !== 'success') throw new Error(data.message);
+        renderHistoryItems(data.results.map(r => ({
+            title: r.title,
+            url: r.url,
+            lastVisitTime: r.last_visit * 1000
+        })));
+    } catch (error) {
+        chrome.history.search({ text: query, startTime: 0, maxResults: 10 }, renderHistoryItems);
+    }
+}
+
 // Function to create history chart
 function createHistoryChart(historyItems) {
     const historyChartElement = document.getElementById('history-chart');
@@ -332,6 +381,45 @@ function getDownloadsInfo() {
     });
 }
 
+// Function to fetch a telemetry summary from the operator; null if it
+// isn't running or has nothing to report
+async function fetchTelemetry(path, params) {
+    try {
+        const response = await fetch(`${OPERATOR_URL}/api/telemetry/${path}?${new URLSearchParams(params)}`);
+        const data = await response.json();
+        return data.status === 'success' ? data : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+// Function to count open tabs per domain, most first
+function countTabDomains(tabs) {
+    const domains = {};
+    tabs.forEach(tab => {
+        try {
+            const url = new URL(tab.url);
+            const domain = url.hostname.replace('www.', '');
+            domains[domain] = (domains[domain] || 0) + 1;
+        } catch (e) {
+            // Handle invalid URLs
+        }
+    });
+    const domainEntries = Object.entries(domains);
+    domainEntries.sort((a, b) => b[1] - a[1]);
+    return domainEntries;
+}
+
+// Function to add the last 24 hours of tab activity from the operator's hourly rollup
+async function addActivityStats(usageStats) {
+    const data = await fetchTelemetry('rollup', { granularity: 'hour', since: '24h' });
+    if (!data || data.count === 0) return;
+    const sum = values => values.reduce((total, value) => total + value, 0);
+    addUsageItem(usageStats, 'Active Time (24h)', formatTime(sum(data.series.active_seconds)));
+    addUsageItem(usageStats, 'Tabs Opened (24h)', sum(data.series.created));
+    addUsageItem(usageStats, 'Most Tabs Open (24h)', Math.max(...data.series.tabs_max));
+}
+
 // Function to get and display browser usage statistics
 function getUsageStats() {
     // Get storage usage data
@@ -358,6 +446,8 @@ function getUsageStats() {
                     addUsageItem(usageStats, 'Incognito Windows', incognitoCount);
                 }
                 
+                addActivityStats(usageStats);
+                
                 // Create usage chart
                 createUsageChart(tabs);
             });
@@ -365,27 +455,21 @@ function getUsageStats() {
     });
 }
 
-// Function to create usage chart
-function createUsageChart(tabs) {
+// Function to create usage chart: minutes in front per domain over the
+// last week from the operator, or open tabs per domain without it
+async function createUsageChart(tabs) {
     const usageChartElement = document.getElementById('usage-chart');
     if (!usageChartElement) return;
     
-    // Group tabs by domain
-    const domains = {};
-    tabs.forEach(tab => {
-        try {
-            const url = new URL(tab.url);
-            const domain = url.hostname.replace('www.', '');
-            domains[domain] = (domains[domain] || 0) + 1;
-        } catch (e) {
-            // Handle invalid URLs
-        }
-    });
+    const telemetry = await fetchTelemetry('domains', { since: '7d', limit: 20 });
+    let domainEntries = telemetry ? telemetry.domains
+        .filter(d => d.active_seconds > 0)
+        .map(d => [d.domain, Math.round(d.active_seconds / 60)]) : [];
+    if (domainEntries.length === 0) {
+        domainEntries = countTabDomains(tabs);
+    }
     
     // Get top 5 domains
-    const domainEntries = Object.entries(domains);
-    domainEntries.sort((a, b) => b[1] - a[1]);
-    
     const topDomains = domainEntries.slice(0, 5);
     const otherCount = domainEntries.slice(5).reduce((sum, entry) => sum + entry[1], 0);
     
@@ -122,7 +122,20 @@ class VoiceControl {
       }
     }
 
-    // If no exact match, try to find the closest command
+    // Then ask the operator's intent resolver, which matches locally and
+    // only calls an LLM for phrases it can't place
+    const intent = await this.resolveIntent(transcript);
+    if (intent && intent.target === 'browser' && this.commands[intent.command]) {
+      this.updateFeedback(`Executing: ${intent.command}`, false);
+      await this.commands[intent.command].call(this);
+      return;
+    }
+    if (intent && intent.target === 'operator') {
+      this.updateFeedback(`"${intent.command}" is an operator command; run it from the operator app`, false);
+      return;
+    }
+
+    // If the operator isn't available, try to find the closest command
     const closestCommand = this.findClosestCommand(transcript);
     if (closestCommand) {
       const confirmExecute = confirm(`Did you mean "${closestCommand}"?`);
@@ -138,6 +151,26 @@ class VoiceControl {
     }
   }
 
+  async resolveIntent(transcript) {
+    // OPERATOR_URL comes from popup.js
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), 3000);
+    try {
+      const response = await fetch(`${OPERATOR_URL}/api/intent`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ text: transcript }),
+        signal: controller.signal
+      });
+      const data = await response.json();
+      return data.status === 'success' && data.intent ? data : null;
+    } catch (error) {
+      return null;
+    } finally {
+      clearTimeout(timer);
+    }
+  }
+
   findClosestCommand(transcript) {
     let bestMatch = null;
     let bestScore = 0;
@@ -0,0 +1,203 @@
+"""Lightweight request instrumentation with a Prometheus text /metrics endpoint"""
+import bisect
+import threading
+import time
+
+from flask import Response, g, request
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self.values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self.values.items())
+        lines = self.header()
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """A set of metrics rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+files_scanned = REGISTRY.counter(
+    "zenith_files_scanned_total", "Directory entries examined by file operations", ("operation",))
+bytes_moved = REGISTRY.counter(
+    "zenith_bytes_moved_total", "Bytes moved by file operations", ("operation",))
+files_moved = REGISTRY.counter(
+    "zenith_files_moved_total", "Files moved by file operations", ("operation",))
+
+
+def instrument_app(app, name=None, registry=REGISTRY, endpoint='/metrics'):
+    """Record per-route latency, in-flight requests and response sizes for `app`
+
+    Routes are labelled by their URL rule (e.g. /api/jobs/<job_id>), not the
+    raw path, so label cardinality stays bounded. `name` becomes the "app"
+    label. The metrics are served as Prometheus text at `endpoint`.
+    """
+    latency = registry.histogram(
+        "http_request_duration_seconds", "Request latency by route", ("app", "method", "route", "status"))
+    in_flight = registry.gauge(
+        "http_requests_in_flight", "Requests currently being handled", ("app", "route"))
+    response_size = registry.histogram(
+        "http_response_size_bytes", "Response body size by route", ("app", "route"), buckets=SIZE_BUCKETS)
+    app_name = name or app.import_name
+
+    def route_label():
+        return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        g._metrics_route = route_label()
+        g._metrics_recorded = False
+        in_flight.inc(app=app_name, route=g._metrics_route)
+
+    @app.after_request
+    def _metrics_record(response):
+        started = g.get('_metrics_start')
+        if started is not None:
+            route = g._metrics_route
+            latency.observe(time.perf_counter() - started, app=app_name, method=request.method,
+                            route=route, status=str(response.status_code))
+            # Streamed responses have no length up front
+            if not response.is_streamed:
+                response_size.observe(response.calculate_content_length() or 0, app=app_name, route=route)
+            g._metrics_recorded = True
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        started = g.get('_metrics_start')
+        if started is None:
+            return
+        if not g.get('_metrics_recorded'):
+            latency.observe(time.perf_counter() - started, app=app_name, method=request.method,
+                            route=g._metrics_route, status="500")
+        in_flight.dec(app=app_name, route=g._metrics_route)
+
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule(endpoint, 'metrics', metrics)
+    return app
@@ -0,0 +1,196 @@
+"""Opt-in profiling of single requests, kept in memory for later download"""
+import collections
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+from flask import Response, g, jsonify, request
+
+
+class StackSampler:
+    """Sample one thread's Python stack at a fixed interval
+
+    Produces folded ("collapsed") stacks, one line per distinct stack with
+    its sample count, which flame graph tools consume directly.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """The last `keep` request profiles"""
+
+    def __init__(self, keep=20):
+        self.profiles = collections.OrderedDict()
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self.profiles[profile["id"]] = profile
+            while len(self.profiles) > self.keep:
+                self.profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self.profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [{k: v for k, v in p.items() if k not in ("profiler", "sampler")} for p in self.profiles.values()]
+
+
+def _pstats_text(profiler, sort="cumulative", limit=60):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def _pstats_dump(profiler):
+    # Same format as Stats.dump_stats(), loadable with pstats.Stats(path)
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def install_profiler(app, admin_token=None, keep=20, endpoint='/debug/profiles'):
+    """Let admins profile individual requests to `app`
+
+    A request is profiled when it carries `X-Profile: 1` (cProfile) or
+    `X-Profile: sample` (stack sampling), or the `_profile` query parameter
+    with the same values, together with a valid `X-Admin-Token`. The token
+    comes from `admin_token` or the ZENITH_ADMIN_TOKEN environment variable;
+    without one, profiling stays disabled. Profiled responses carry an
+    `X-Profile-Id` header. The last `keep` profiles can be listed and
+    downloaded at `endpoint`.
+    """
+    token = admin_token or os.getenv("ZENITH_ADMIN_TOKEN")
+    store = ProfileStore(keep)
+
+    def is_admin():
+        supplied = request.headers.get('X-Admin-Token', '')
+        return bool(token) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+    def requested_mode():
+        flag = (request.headers.get('X-Profile') or request.args.get('_profile') or '').lower()
+        if flag in ('1', 'true', 'cprofile'):
+            return "cprofile"
+        if flag == 'sample':
+            return "sample"
+        return None
+
+    @app.before_request
+    def _profile_start():
+        mode = requested_mode()
+        if mode is None or not is_admin() or request.path.startswith(endpoint):
+            return
+        g._profile = {
+            "id": uuid.uuid4().hex[:12],
+            "mode": mode,
+            "method": request.method,
+            "path": request.path,
+            "route": request.url_rule.rule if request.url_rule is not None else None,
+            "timestamp": time.time(),
+            "started": time.perf_counter(),
+        }
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            g._profile["profiler"] = profiler
+            profiler.enable()
+        else:
+            sampler = StackSampler(threading.get_ident())
+            g._profile["sampler"] = sampler
+            sampler.start()
+
+    @app.after_request
+    def _profile_header(response):
+        profile = g.get('_profile')
+        if profile is not None:
+            response.headers['X-Profile-Id'] = profile["id"]
+            profile["status"] = response.status_code
+        return response
+
+    @app.teardown_request
+    def _profile_finish(exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        if "profiler" in profile:
+            profile["profiler"].disable()
+        else:
+            profile["sampler"].stop()
+            profile["samples"] = profile["sampler"].samples
+        profile["duration"] = round(time.perf_counter() - profile.pop("started"), 6)
+        if exc is not None:
+            profile["error"] = str(exc)
+        store.add(profile)
+
+    def forbidden():
+        return jsonify({"status": "error", "message": "Admin token required"}), 403
+
+    def list_profiles():
+        if not is_admin():
+            return forbidden()
+        return jsonify({"status": "success", "profiles": store.list()})
+
+    def dump_profile(profile_id):
+        """?format=text (default), pstats (binary, for pstats/snakeviz) or collapsed (sampled profiles)"""
+        if not is_admin():
+            return forbidden()
+        profile = store.get(profile_id)
+        if profile is None:
+            return jsonify({"status": "error", "message": f"No profile {profile_id}"}), 404
+
+        fmt = request.args.get('format', 'text')
+        if "sampler" in profile:
+            if fmt not in ('collapsed', 'text'):
+                return jsonify({"status": "error", "message": "Sampled profiles are only available as collapsed stacks"}), 400
+            return Response(profile["sampler"].collapsed(), mimetype='text/plain')
+        if fmt == 'pstats':
+            return Response(_pstats_dump(profile["profiler"]), mimetype='application/octet-stream',
+                            headers={"Content-Disposition": f"attachment; filename={profile_id}.pstats"})
+        if fmt == 'text':
+            return Response(_pstats_text(profile["profiler"], request.args.get('sort', 'cumulative')),
+                            mimetype='text/plain')
+        return jsonify({"status": "error",
+                        "message": "Collapsed stacks need a sampled profile (X-Profile: sample)"}), 400
+
+    app.add_url_rule(endpoint, 'list_profiles', list_profiles)
+    app.add_url_rule(f'{endpoint}/<profile_id>', 'dump_profile', dump_profile)
+    return store
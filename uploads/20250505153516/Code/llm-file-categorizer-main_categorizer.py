@@ -1,9 +1,20 @@
 import os
+import sys
 import shutil
 import time
 import mimetypes
 import datetime
 import re
+import random
+import threading
+import zlib
+import ast
+import json
+import math
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from termcolor import colored
 
 # Try to import Gemini API, but don't fail if not available
@@ -13,23 +24,265 @@ try:
     # Load environment variables from .env file
     load_dotenv()
     GEMINI_AVAILABLE = True
-    print(colored("Gemini API module detected.", "green"))
+    print(colored("Gemini API module detected.", "green"), file=sys.stderr)
     
     # Check if API key is available
     api_key = os.getenv("GEMINI_API_KEY")
     if api_key:
         genai.configure(api_key=api_key)
-        print(colored("Gemini API key found and configured.", "green"))
+        print(colored("Gemini API key found and configured.", "green"), file=sys.stderr)
         GEMINI_CONFIGURED = True
     else:
-        print(colored("No Gemini API key found in environment variables.", "yellow"))
-        print(colored("Local categorization will be used as fallback.", "yellow"))
+        print(colored("No Gemini API key found in environment variables.", "yellow"), file=sys.stderr)
+        print(colored("Local categorization will be used as fallback.", "yellow"), file=sys.stderr)
         GEMINI_CONFIGURED = False
         
 except ImportError:
     GEMINI_AVAILABLE = False
     GEMINI_CONFIGURED = False
-    print(colored("Gemini API not available. Using local categorization only.", "yellow"))
+    print(colored("Gemini API not available. Using local categorization only.", "yellow"), file=sys.stderr)
+
+# LLM backends
+class LLMBackendError(Exception):
+    """Raised when an LLM backend call fails."""
+
+class CircuitOpenError(LLMBackendError):
+    """Raised when the circuit breaker is open and calls are being short-circuited."""
+
+class CircuitBreaker:
+    """
+    Simple closed/open/half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and every
+    call fails fast for `reset_timeout` seconds. The first call after that is
+    let through as a probe; its outcome closes or re-opens the breaker.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                return True
+            if self.state == "half_open":
+                # Only one probe at a time
+                return False
+            return True
+
+    def is_open(self):
+        with self._lock:
+            return self.state == "open" and self.clock() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = self.clock()
+
+class LLMBackend:
+    """
+    Base class for LLM backends.
+
+    Subclasses implement `_generate(contents, model)` and return the response
+    text. `generate` adds the per-call timeout, retries with jittered
+    exponential backoff and the circuit breaker on top.
+    """
+    name = "base"
+    text_model = "gemini-pro"
+    vision_model = "gemini-pro-vision"
+    supports_images = False
+
+    def __init__(self, timeout=30.0, max_retries=2, backoff_base=0.5, backoff_max=8.0,
+                 breaker=None, rng=None, sleep=time.sleep):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+        # Optional semaphore shared between processes to cap in-flight calls
+        self.semaphore = None
+
+    def available(self):
+        """Whether calls are currently being let through."""
+        return not self.breaker.is_open()
+
+    def backoff_delay(self, attempt):
+        # "Full jitter" backoff: uniform(0, min(cap, base * 2^attempt))
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def generate(self, contents, model=None):
+        """
+        Send `contents` (a prompt string or a list of parts) to `model` and
+        return the response text.
+        """
+        model = model or self.text_model
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} backend circuit is open")
+            try:
+                if self.semaphore is not None:
+                    with self.semaphore:
+                        text = self._generate(contents, model)
+                else:
+                    text = self._generate(contents, model)
+            except Exception as e:
+                self.breaker.record_failure()
+                last_error = e
+                if attempt < self.max_retries:
+                    self.sleep(self.backoff_delay(attempt))
+                continue
+            self.breaker.record_success()
+            return text
+        raise LLMBackendError(f"{self.name} backend failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def _generate(self, contents, model):
+        raise NotImplementedError
+
+class GeminiBackend(LLMBackend):
+    """Gemini backend holding one long-lived GenerativeModel per model name."""
+    name = "gemini"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self.supports_images = hasattr(genai.types, 'Part')
+
+    def get_model(self, model):
+        with self._models_lock:
+            if model not in self._models:
+                self._models[model] = genai.GenerativeModel(model)
+            return self._models[model]
+
+    def _generate(self, contents, model):
+        response = self.get_model(model).generate_content(
+            contents, request_options={"timeout": self.timeout}
+        )
+        return response.text
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic local backend for tests and benchmarks.
+
+    Answers depend only on the prompt, so repeated runs produce the same
+    categories. `latency` (seconds, plus up to `jitter` extra) and
+    `error_rate` are injected from a seeded RNG so failure sequences are
+    reproducible too.
+    """
+    name = "stub"
+    supports_images = False
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 categories=None, **kwargs):
+        kwargs.setdefault("rng", random.Random(seed))
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.categories = categories or ["Documents", "Images", "Videos", "Audio", "Archives", "Code", "Other"]
+        self.fault_rng = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _generate(self, contents, model):
+        if isinstance(contents, (list, tuple)):
+            prompt = "\n".join(part for part in contents if isinstance(part, str))
+        else:
+            prompt = str(contents)
+
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self.fault_rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self.fault_rng.random() < self.error_rate
+
+        if delay > self.timeout:
+            self.sleep(self.timeout)
+            raise TimeoutError(f"stub call exceeded timeout of {self.timeout}s")
+        if delay:
+            self.sleep(delay)
+        if fail:
+            raise LLMBackendError("stub injected error")
+
+        # The output format instruction comes last in every prompt, after any
+        # file contents that might contain the same words.
+        digest = zlib.crc32(prompt.encode("utf-8"))
+        tasks = re.findall(r"Wrap the (description|categories|category) in", prompt)
+        task = tasks[-1] if tasks else "description"
+        if task == "categories":
+            return f"<categories>{', '.join(self.categories)}</categories>"
+        if task == "category":
+            match = re.search(r"<categories>\s*(.*?)\s*</categories>", prompt[prompt.rfind("<categories>"):], re.DOTALL)
+            try:
+                choices = ast.literal_eval(match.group(1)) if match else self.categories
+            except (ValueError, SyntaxError):
+                choices = self.categories
+            return f"<category>{choices[digest % len(choices)]}</category>"
+        return f"<description>Stub description {digest:08x}</description>"
+
+def create_backend(name=None):
+    """
+    Create the backend named by `name` or the CATEGORIZER_BACKEND environment
+    variable. Returns None when no LLM backend can be used.
+    """
+    name = (name or os.getenv("CATEGORIZER_BACKEND") or "gemini").lower()
+    options = {
+        "timeout": float(os.getenv("CATEGORIZER_LLM_TIMEOUT", "30")),
+        "max_retries": int(os.getenv("CATEGORIZER_LLM_RETRIES", "2")),
+        "breaker": CircuitBreaker(
+            failure_threshold=int(os.getenv("CATEGORIZER_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("CATEGORIZER_BREAKER_RESET", "30")),
+        ),
+    }
+    if name == "stub":
+        return StubBackend(
+            latency=float(os.getenv("CATEGORIZER_STUB_LATENCY", "0")),
+            jitter=float(os.getenv("CATEGORIZER_STUB_JITTER", "0")),
+            error_rate=float(os.getenv("CATEGORIZER_STUB_ERROR_RATE", "0")),
+            seed=int(os.getenv("CATEGORIZER_STUB_SEED", "0")),
+            **options
+        )
+    if name == "gemini" and GEMINI_AVAILABLE and GEMINI_CONFIGURED:
+        return GeminiBackend(**options)
+    return None
+
+_backend = None
+_backend_initialized = False
+
+def get_backend():
+    """Return the process-wide LLM backend, creating it on first use."""
+    global _backend, _backend_initialized
+    if not _backend_initialized:
+        _backend = create_backend()
+        _backend_initialized = True
+    return _backend
+
+def set_backend(backend):
+    """Replace the process-wide LLM backend (None disables LLM categorization)."""
+    global _backend, _backend_initialized
+    _backend = backend
+    _backend_initialized = True
+
+def llm_available():
+    backend = get_backend()
+    return backend is not None and backend.available()
 
 def print_directory_tree(directory):
     """
@@ -286,9 +539,10 @@ def suggest_category_by_content_pattern(filename):
 
 def get_file_description_gemini(file_path):
     """
-    Get the description of a file using the Gemini Pro model.
+    Get the description of a file using the configured LLM backend.
     """
-    if not GEMINI_AVAILABLE or not GEMINI_CONFIGURED:
+    backend = get_backend()
+    if backend is None or not backend.available():
         return None
         
     mime_type, _ = mimetypes.guess_type(file_path)
@@ -301,8 +555,7 @@ def get_file_description_gemini(file_path):
                 file_content = f.read().strip()[:10000]  # Get first 10,000 characters of file content
             
             # Text-only mode
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(
+            description_text = backend.generate(
                 f"""
                 Describe this text file. This is the name of the file: <name>{os.path.basename(file_path)}</name>.
                 Here is a portion of the file:
@@ -319,10 +572,9 @@ def get_file_description_gemini(file_path):
                     file_data = f.read()
                 
                 # Check if image API is supported in this version
-                if hasattr(genai.types, 'Part'):
+                if backend.supports_images:
                     # Multimodal mode for image processing
-                    model = genai.GenerativeModel('gemini-pro-vision')
-                    response = model.generate_content(
+                    description_text = backend.generate(
                         [
                             genai.types.Part.from_data(file_data, mime_type=mime_type),
                             genai.types.Part.from_text(
@@ -331,7 +583,8 @@ def get_file_description_gemini(file_path):
                                 Wrap the description in <description></description> tags. Keep your response concise and to the point - Maximum of 30 words.
                                 """
                             )
-                        ]
+                        ],
+                        model=backend.vision_model
                     )
                 else:
                     # Fall back to just the filename if Part is not available
@@ -339,8 +592,7 @@ def get_file_description_gemini(file_path):
             
             except (AttributeError, TypeError) as e:
                 # Fall back for image files if Part is not supported
-                model = genai.GenerativeModel('gemini-pro')
-                response = model.generate_content(
+                description_text = backend.generate(
                     f"""
                     This is an image file: {os.path.basename(file_path)} with mime type {mime_type}.
                     Based just on the filename, suggest what this image might contain.
@@ -350,8 +602,7 @@ def get_file_description_gemini(file_path):
         
         else:
             # For other file types, just use the filename
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(
+            description_text = backend.generate(
                 f"""
                 Describe the contents of this file. This is the name of the file: <name>{os.path.basename(file_path)}</name>.
                 Wrap the description in <description></description> tags. Keep your response concise and to the point - 5-10 words should be enough.
@@ -359,7 +610,6 @@ def get_file_description_gemini(file_path):
             )
         
         # Extract description from response
-        description_text = response.text
         try:
             description = description_text.split('<description>')[1].split('</description>')[0].strip()
         except IndexError:
@@ -370,6 +620,8 @@ def get_file_description_gemini(file_path):
         print(colored(f"File description: {description}", "green"))
         return description
         
+    except CircuitOpenError:
+        return None
     except Exception as e:
         print(colored(f"Error getting file description from Gemini: {str(e)}", "red"))
         print(colored("Falling back to local categorization.", "yellow"))
@@ -377,14 +629,14 @@ def get_file_description_gemini(file_path):
 
 def get_category_suggestion_gemini(file_descriptions):
     """
-    Get category suggestions for the given file descriptions using Gemini Pro model.
+    Get category suggestions for the given file descriptions using the configured LLM backend.
     """
-    if not GEMINI_AVAILABLE or not GEMINI_CONFIGURED:
+    backend = get_backend()
+    if backend is None or not backend.available():
         return []
         
     try:
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(
+        response_text = backend.generate(
             f"""
             You are given a list of file descriptions. You need to categorize these files into different categories. Here are the file descriptions:
             <file_descriptions>
@@ -394,7 +646,6 @@ def get_category_suggestion_gemini(file_descriptions):
             """
         )
         
-        response_text = response.text
         try:
             categories_text = response_text.split('<categories>')[1].split('</categories>')[0].strip()
             categories = [cat.strip() for cat in categories_text.split(', ')]
@@ -406,6 +657,8 @@ def get_category_suggestion_gemini(file_descriptions):
         print(colored(f"Suggested categories: {categories}", "green"))
         return categories
         
+    except CircuitOpenError:
+        return []
     except Exception as e:
         print(colored(f"Error getting category suggestions from Gemini: {str(e)}", "red"))
         print(colored("Falling back to local categorization.", "yellow"))
@@ -413,14 +666,14 @@ def get_category_suggestion_gemini(file_descriptions):
 
 def get_file_category_gemini(file_description, categories):
     """
-    Get the category for a file based on its description using Gemini Pro model.
+    Get the category for a file based on its description using the configured LLM backend.
     """
-    if not GEMINI_AVAILABLE or not GEMINI_CONFIGURED:
+    backend = get_backend()
+    if backend is None or not backend.available():
         return None
         
     try:
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(
+        response_text = backend.generate(
             f"""
             You are given a file description. You need to suggest a category for this file. Here is the file description:
             <file_description>
@@ -434,7 +687,6 @@ def get_file_category_gemini(file_description, categories):
             """
         )
         
-        response_text = response.text
         try:
             category = response_text.split('<category>')[1].split('</category>')[0].strip()
         except IndexError:
@@ -457,75 +709,83 @@ def get_file_category_gemini(file_description, categories):
         print(colored(f"File category: {category}", "green"))
         return category
         
+    except CircuitOpenError:
+        return None
     except Exception as e:
         print(colored(f"Error getting file category from Gemini: {str(e)}", "red"))
         print(colored("Falling back to local categorization.", "yellow"))
         return None
 
-def main():
+LOCAL_CATEGORIES = ["Documents", "Images", "Videos", "Audio", "Archives", "Code", "Other"]
+
+LOG_FILE_NAME = "organization_log.jsonl"
+
+# Organization event log
+class OrganizationLog:
     """
-    Main function to categorize files in a folder.
+    Append-only JSONL event stream for organization runs.
+
+    Every event is written (and flushed) as soon as it happens, as a single
+    O_APPEND write, so several processes can safely share one log file and a
+    crashed run still leaves everything up to the crash on disk. A log with
+    no path discards all events.
+    """
+    def __init__(self, path=None, **run_info):
+        self.path = path
+        self.run_id = f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{random.getrandbits(24):06x}"
+        self.started = time.perf_counter()
+        self._fd = None
+        if path:
+            self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.event("run_start", **run_info)
+
+    def event(self, event, **fields):
+        if self._fd is None:
+            return
+        record = {"ts": round(time.time(), 6), "run": self.run_id, "event": event}
+        record.update(fields)
+        os.write(self._fd, (json.dumps(record, default=str) + "\n").encode("utf-8"))
+
+    @contextlib.contextmanager
+    def phase(self, name, **fields):
+        """Time a phase of the run and log it when it ends."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.event("phase", phase=name, duration=round(time.perf_counter() - started, 6), **fields)
+
+    def close(self, **fields):
+        if self._fd is None:
+            return
+        self.event("run_end", duration=round(time.perf_counter() - self.started, 6), **fields)
+        os.close(self._fd)
+        self._fd = None
+
+def scan_files(folder_path, sort_order, log):
+    """Scan phase: list and sort the files to organize, skipping our own log."""
+    with log.phase("scan"):
+        files_info = get_files_with_sorting_info(folder_path, sort_order)
+        files_info = [file_info for file_info in files_info if file_info['name'] != LOG_FILE_NAME]
+    log.event("scan", files=len(files_info), bytes=sum(file_info['size'] for file_info in files_info))
+    return files_info
+
+def categorize_files_gemini(folder_path, files, log):
+    """
+    Categorize files using the LLM backend, falling back to local
+    categorization for any file the backend can't handle.
     """
-    print("=" * 60)
-    print(colored("Hybrid File Categorizer", "cyan"))
-    print(colored("Supports both Gemini AI and local categorization", "cyan"))
-    print("=" * 60)
-    
-    folder_path = input("Enter the folder path: ")
-    
-    if not os.path.exists(folder_path):
-        print(colored(f"Error: Folder path '{folder_path}' does not exist.", "red"))
-        return
-    
-    print("Choose the mode to organize your files:")
-    print("1. By file type (Documents, Images, Videos, etc.)")
-    print("2. By date (Year/Month)")
-    print("3. By content pattern (detect patterns in filenames)")
-    print("4. Custom categorization (you'll be asked to review each file)")
-    if GEMINI_AVAILABLE and GEMINI_CONFIGURED:
-        print("5. Using Gemini AI (intelligent categorization based on content)")
-    
-    mode = input("Enter your choice: ")
-    
-    print("Choose the sorting order for files:")
-    print("1. Alphabetical (A-Z)")
-    print("2. Creation time (oldest first)")
-    print("3. Modified time (oldest first)")
-    print("4. Size (smallest first)")
-    print("5. Size (largest first)")
-    
-    sort_order = input("Enter your sorting choice (default: 1): ") or "1"
-    
-    start_time = time.time()
-    
-    # Get files with sorting information
-    files_info = get_files_with_sorting_info(folder_path, sort_order)
-    files = [file_info['name'] for file_info in files_info]
-    
-    load_time = time.time() - start_time
-    
-    print("-" * 60)
-    print(colored(f"Time taken to load and sort file paths: {load_time:.2f} seconds", "cyan"))
-    print("-" * 60)
-    
-    # Print directory tree before organizing
-    print_directory_tree(folder_path)
-    
-    if not files:
-        print(colored(f"No files found in {folder_path}", "yellow"))
-        return
-    
-    # Dictionary to store file -> category mappings
     file_categories = {}
-    
-    # Use Gemini API mode
-    if mode == "5" and GEMINI_AVAILABLE and GEMINI_CONFIGURED:
-        file_descriptions = []
-        file_desc_map = {}  # Map filenames to descriptions
-        
-        # Get descriptions for all files
+    file_descriptions = []
+    file_desc_map = {}  # Map filenames to descriptions
+
+    # Get descriptions for all files
+    with log.phase("describe", files=len(files)):
         for file in files:
             file_path = os.path.join(folder_path, file)
+            started = time.perf_counter()
+            source = "llm"
+            error = None
             try:
                 description = get_file_description_gemini(file_path)
                 if description:
@@ -533,45 +793,83 @@ def main():
                     file_desc_map[file] = description
                 else:
                     # If Gemini fails, use local categorization
+                    source = "rule"
                     file_desc_map[file] = f"File with extension {os.path.splitext(file)[1]}"
                     file_descriptions.append(f"{file}: {file_desc_map[file]}")
             except Exception as e:
                 print(colored(f"Error processing file {file}: {str(e)}", "red"))
+                source = "rule"
+                error = str(e)
                 file_desc_map[file] = f"File with extension {os.path.splitext(file)[1]}"
                 file_descriptions.append(f"{file}: {file_desc_map[file]}")
-        
-        # Get category suggestions
+            log.event("describe", file=file, source=source,
+                      latency=round(time.perf_counter() - started, 6), error=error)
+
+    # Get category suggestions
+    with log.phase("suggest"):
         try:
             categories = get_category_suggestion_gemini(file_descriptions)
             if not categories:
                 # If Gemini fails, use local categories
-                categories = ["Documents", "Images", "Videos", "Audio", "Archives", "Code", "Other"]
+                categories = LOCAL_CATEGORIES
         except Exception as e:
             print(colored(f"Error getting category suggestions: {str(e)}", "red"))
-            categories = ["Documents", "Images", "Videos", "Audio", "Archives", "Code", "Other"]
-        
-        # Assign categories to files
+            categories = LOCAL_CATEGORIES
+
+    # Assign categories to files. Files with identical descriptions (e.g. the
+    # local fallback ones) get the same category without another LLM call.
+    category_cache = {}
+    with log.phase("classify", files=len(files)):
         for file in files:
+            started = time.perf_counter()
+            error = None
             try:
-                if file in file_desc_map:
-                    category = get_file_category_gemini(file_desc_map[file], categories)
-                    if not category:
+                description = file_desc_map.get(file)
+                if description in category_cache:
+                    category = category_cache[description]
+                    source = "cache"
+                elif description is not None:
+                    category = get_file_category_gemini(description, categories)
+                    source = "llm"
+                    if category:
+                        category_cache[description] = category
+                    else:
                         # If Gemini fails, use local categorization
                         category = suggest_category_by_extension(os.path.join(folder_path, file))
+                        source = "rule"
                 else:
                     category = suggest_category_by_extension(os.path.join(folder_path, file))
-                
+                    source = "rule"
+
                 file_categories[file] = category
             except Exception as e:
                 print(colored(f"Error categorizing file {file}: {str(e)}", "red"))
                 # Default to extension-based category on error
-                file_categories[file] = suggest_category_by_extension(os.path.join(folder_path, file))
-    
-    # Local categorization modes
-    else:
+                category = suggest_category_by_extension(os.path.join(folder_path, file))
+                source = "rule"
+                error = str(e)
+                file_categories[file] = category
+            log.event("classify", file=file, category=category, source=source,
+                      latency=round(time.perf_counter() - started, 6), error=error)
+
+    return file_categories
+
+def categorize_files(folder_path, files, mode, interactive=True, log=None):
+    """
+    Return a {file: category} mapping for `files` using the given mode.
+    Mode 4 prompts for each file and is only available when interactive.
+    """
+    log = log or OrganizationLog()
+    if mode == "5" and get_backend() is not None:
+        return categorize_files_gemini(folder_path, files, log)
+
+    file_categories = {}
+    with log.phase("classify", files=len(files)):
         for file in files:
             file_path = os.path.join(folder_path, file)
-            
+            started = time.perf_counter()
+            source = "rule"
+
             if mode == "1":
                 # Categorize by file type
                 category = suggest_category_by_extension(file_path)
@@ -581,77 +879,422 @@ def main():
             elif mode == "3":
                 # Categorize by content pattern
                 category = suggest_category_by_content_pattern(file) or suggest_category_by_extension(file_path)
-            elif mode == "4":
+            elif mode == "4" and interactive:
                 # Custom categorization
                 print(f"\nFile: {file}")
                 suggested = suggest_category_by_extension(file_path)
                 category = input(f"Enter category for this file (suggested: {suggested}): ").strip()
-                if not category:
+                if category:
+                    source = "user"
+                else:
                     category = suggested
             else:
                 print(colored("Invalid choice. Using file type categorization.", "yellow"))
                 category = suggest_category_by_extension(file_path)
-            
+
             file_categories[file] = category
-    
-    # Print proposed directory structure
-    print("*" * 60)
-    print_organized_directory_tree(folder_path, file_categories)
-    
-    # Ask for confirmation
-    print("*" * 60)
-    confirm = input("Do you want to proceed with this organization? (yes/no): ")
-    if confirm.lower() not in ["yes", "y"]:
-        print(colored("Operation canceled by user.", "yellow"))
-        return
-    
-    # Create category directories
-    categories = set(file_categories.values())
+            log.event("classify", file=file, category=category, source=source,
+                      latency=round(time.perf_counter() - started, 6))
+
+    return file_categories
+
+def create_category_folders(folder_path, categories):
+    """Create a folder for each category (nested categories like "2023/January" included)."""
     for category in categories:
-        category_path = os.path.join(folder_path, category)
-        
-        # Handle nested categories (e.g., "2023/January")
-        if "/" in category:
-            parts = category.split("/")
-            current_path = folder_path
-            for part in parts:
-                current_path = os.path.join(current_path, part)
-                os.makedirs(current_path, exist_ok=True)
-        else:
-            os.makedirs(category_path, exist_ok=True)
-    
-    # Move files to appropriate categories
-    for file, category in file_categories.items():
-        source_path = os.path.join(folder_path, file)
-        dest_path = os.path.join(folder_path, category, file)
-        
-        try:
-            shutil.move(source_path, dest_path)
-            print(colored(f"Moved '{file}' to category '{category}'", "green"))
-        except Exception as e:
-            print(colored(f"Error moving file {file}: {str(e)}", "red"))
-    
-    print("*" * 60)
-    print(colored("The files have been organized successfully.", "green"))
-    print("*" * 60)
-    
-    # Save log of organization
-    log_file = os.path.join(folder_path, "organization_log.txt")
-    with open(log_file, 'w') as f:
-        f.write(f"File Organization Log - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Folder: {folder_path}\n")
-        f.write(f"Organization mode: {mode}\n")
-        f.write(f"Sorting order: {sort_order}\n\n")
-        f.write("Files organized:\n")
+        os.makedirs(os.path.join(folder_path, *category.split("/")), exist_ok=True)
+
+def move_files(folder_path, file_categories, log=None):
+    """
+    Move each file into its category folder and return one result dict per file.
+    """
+    log = log or OrganizationLog()
+    results = []
+    with log.phase("move", files=len(file_categories)):
+        create_category_folders(folder_path, set(file_categories.values()))
         for file, category in file_categories.items():
-            f.write(f"{file} → {category}\n")
-    
-    print(colored(f"Organization log saved to: {log_file}", "green"))
-    
-    # Ask to organize another directory
-    another = input("Would you like to organize another directory? (yes/no): ")
-    if another.lower() in ["yes", "y"]:
-        main()  # Recursive call to start again
+            source_path = os.path.join(folder_path, file)
+            dest_path = os.path.join(folder_path, category, file)
+            started = time.perf_counter()
+
+            try:
+                size = os.path.getsize(source_path)
+                shutil.move(source_path, dest_path)
+                print(colored(f"Moved '{file}' to category '{category}'", "green"))
+                results.append({"file": file, "category": category, "status": "moved", "bytes": size})
+                log.event("move", file=file, category=category, bytes=size,
+                          latency=round(time.perf_counter() - started, 6))
+            except Exception as e:
+                print(colored(f"Error moving file {file}: {str(e)}", "red"))
+                results.append({"file": file, "category": category, "status": "error", "error": str(e)})
+                log.event("move", file=file, category=category, bytes=0,
+                          latency=round(time.perf_counter() - started, 6), error=str(e))
+    return results
+
+def organize_folder(folder_path, mode="1", sort_order="1", apply=False, log_path=None):
+    """
+    Non-interactive organization of a single folder.
+
+    Returns a JSON-serializable dict with the proposed plan, and the move
+    results when `apply` is true, plus per-phase timings. Events are
+    streamed to `log_path` (JSONL) when given.
+    """
+    started = time.time()
+    result = {
+        "root": folder_path,
+        "mode": mode,
+        "sort_order": sort_order,
+        "pid": os.getpid(),
+    }
+
+    if not os.path.isdir(folder_path):
+        result.update({"status": "error", "message": f"Folder path '{folder_path}' does not exist."})
+        return result
+
+    log = None
+    try:
+        log = OrganizationLog(log_path, folder=folder_path, mode=mode, sort_order=sort_order, apply=apply)
+        result["run"] = log.run_id
+
+        files_info = scan_files(folder_path, sort_order, log)
+        files = [file_info['name'] for file_info in files_info]
+        load_time = time.time() - started
+
+        file_categories = categorize_files(folder_path, files, mode, interactive=False, log=log)
+        classify_time = time.time() - started - load_time
+
+        result.update({
+            "status": "planned",
+            "files": len(files),
+            "bytes": sum(file_info['size'] for file_info in files_info),
+            "plan": file_categories,
+        })
+
+        move_time = 0.0
+        if apply and file_categories:
+            move_started = time.time()
+            moves = move_files(folder_path, file_categories, log)
+            move_time = time.time() - move_started
+            result.update({
+                "status": "organized",
+                "moves": moves,
+                "moved": sum(1 for move in moves if move["status"] == "moved"),
+                "bytes_moved": sum(move.get("bytes", 0) for move in moves),
+                "errors": sum(1 for move in moves if move["status"] == "error"),
+            })
+
+        result["timings"] = {
+            "load": round(load_time, 4),
+            "classify": round(classify_time, 4),
+            "move": round(move_time, 4),
+            "total": round(time.time() - started, 4),
+        }
+    except Exception as e:
+        result.update({"status": "error", "message": str(e)})
+    finally:
+        if log is not None:
+            log.close(status=result.get("status"))
+
+    return result
+
+def main():
+    """
+    Main function to categorize files in a folder.
+    """
+    while True:
+        print("=" * 60)
+        print(colored("Hybrid File Categorizer", "cyan"))
+        print(colored("Supports both Gemini AI and local categorization", "cyan"))
+        print("=" * 60)
+
+        folder_path = input("Enter the folder path: ")
+
+        if not os.path.exists(folder_path):
+            print(colored(f"Error: Folder path '{folder_path}' does not exist.", "red"))
+            return
+
+        print("Choose the mode to organize your files:")
+        print("1. By file type (Documents, Images, Videos, etc.)")
+        print("2. By date (Year/Month)")
+        print("3. By content pattern (detect patterns in filenames)")
+        print("4. Custom categorization (you'll be asked to review each file)")
+        if get_backend() is not None:
+            print("5. Using Gemini AI (intelligent categorization based on content)")
+
+        mode = input("Enter your choice: ")
+
+        print("Choose the sorting order for files:")
+        print("1. Alphabetical (A-Z)")
+        print("2. Creation time (oldest first)")
+        print("3. Modified time (oldest first)")
+        print("4. Size (smallest first)")
+        print("5. Size (largest first)")
+
+        sort_order = input("Enter your sorting choice (default: 1): ") or "1"
+
+        # Events are appended to the log as the run progresses
+        log_file = os.path.join(folder_path, LOG_FILE_NAME)
+        log = OrganizationLog(log_file, folder=folder_path, mode=mode, sort_order=sort_order, apply=True)
+        try:
+            start_time = time.time()
+
+            # Get files with sorting information
+            files_info = scan_files(folder_path, sort_order, log)
+            files = [file_info['name'] for file_info in files_info]
+
+            load_time = time.time() - start_time
+
+            print("-" * 60)
+            print(colored(f"Time taken to load and sort file paths: {load_time:.2f} seconds", "cyan"))
+            print("-" * 60)
+
+            # Print directory tree before organizing
+            print_directory_tree(folder_path)
+
+            if not files:
+                print(colored(f"No files found in {folder_path}", "yellow"))
+                log.close(status="empty")
+                return
+
+            file_categories = categorize_files(folder_path, files, mode, log=log)
+
+            # Print proposed directory structure
+            print("*" * 60)
+            print_organized_directory_tree(folder_path, file_categories)
+
+            # Ask for confirmation
+            print("*" * 60)
+            confirm = input("Do you want to proceed with this organization? (yes/no): ")
+            if confirm.lower() not in ["yes", "y"]:
+                print(colored("Operation canceled by user.", "yellow"))
+                log.close(status="canceled")
+                return
+
+            move_files(folder_path, file_categories, log)
+
+            print("*" * 60)
+            print(colored("The files have been organized successfully.", "green"))
+            print("*" * 60)
+            log.close(status="organized")
+        finally:
+            # No-op unless the run was interrupted before closing the log
+            log.close(status="error")
+
+        print(colored(f"Organization log saved to: {log_file}", "green"))
+
+        # Ask to organize another directory
+        another = input("Would you like to organize another directory? (yes/no): ")
+        if another.lower() not in ["yes", "y"]:
+            return
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # Nearest rank: the smallest value with at least pct% of the values at or below it
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+def _latency_stats(values):
+    return {
+        "count": len(values),
+        "total": round(sum(values), 6),
+        "p50": round(_percentile(values, 50), 6),
+        "p95": round(_percentile(values, 95), 6),
+        "max": round(max(values), 6) if values else 0.0,
+    }
+
+def summarize_log(paths):
+    """
+    Compute per-phase and per-source p50/p95 latencies and throughput from
+    one or more JSONL organization logs.
+    """
+    phases = {}
+    sources = {}
+    runs = 0
+    run_time = 0.0
+    classified = 0
+    moved = 0
+    bytes_moved = 0
+    errors = 0
+    bad_lines = 0
+
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    bad_lines += 1
+                    continue
+                event = record.get("event")
+                if event == "phase":
+                    phases.setdefault(record["phase"], []).append(record["duration"])
+                elif event == "classify":
+                    classified += 1
+                    sources.setdefault(record.get("source", "unknown"), []).append(record.get("latency", 0.0))
+                elif event == "move":
+                    if record.get("error"):
+                        errors += 1
+                    else:
+                        moved += 1
+                        bytes_moved += record.get("bytes", 0)
+                elif event == "run_end":
+                    runs += 1
+                    run_time += record.get("duration", 0.0)
+                if event in ("describe", "classify") and record.get("error"):
+                    errors += 1
+
+    move_time = sum(phases.get("move", []))
+    classify_time = sum(phases.get("classify", []))
+    return {
+        "runs": runs,
+        "run_time": round(run_time, 6),
+        "phases": {name: _latency_stats(values) for name, values in sorted(phases.items())},
+        "classification": {
+            "files": classified,
+            "by_source": {name: _latency_stats(values) for name, values in sorted(sources.items())},
+            "files_per_second": round(classified / classify_time, 2) if classify_time > 0 else 0.0,
+        },
+        "moves": {
+            "files": moved,
+            "bytes": bytes_moved,
+            "files_per_second": round(moved / move_time, 2) if move_time > 0 else 0.0,
+            "bytes_per_second": round(bytes_moved / move_time, 2) if move_time > 0 else 0.0,
+        },
+        "errors": errors,
+        "unparseable_lines": bad_lines,
+    }
+
+# Headless batch mode
+def _init_batch_worker(backend_name, llm_semaphore):
+    """Process pool initializer: keep stdout clean and set up the shared backend."""
+    sys.stdout = sys.stderr
+    backend = create_backend(backend_name)
+    if backend is not None:
+        backend.semaphore = llm_semaphore
+    set_backend(backend)
+
+def summarize_batch(results, wall_time):
+    """Aggregate timing summary for a batch run."""
+    totals = [r["timings"]["total"] for r in results if "timings" in r]
+    files = sum(r.get("files", 0) for r in results)
+    return {
+        "roots": len(results),
+        "ok": sum(1 for r in results if r["status"] != "error"),
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "files": files,
+        "bytes": sum(r.get("bytes", 0) for r in results),
+        "moved": sum(r.get("moved", 0) for r in results),
+        "bytes_moved": sum(r.get("bytes_moved", 0) for r in results),
+        "wall_time": round(wall_time, 4),
+        "cpu_time": round(sum(totals), 4),
+        "root_time_p50": round(_percentile(totals, 50), 4),
+        "root_time_p95": round(_percentile(totals, 95), 4),
+        "root_time_max": round(max(totals), 4) if totals else 0.0,
+        "files_per_second": round(files / wall_time, 2) if wall_time > 0 else 0.0,
+    }
+
+def _batch_log_path(args, root):
+    if args.no_log:
+        return None
+    if args.log:
+        return args.log
+    # By default only runs that actually move files leave a log in the folder
+    return os.path.join(root, LOG_FILE_NAME) if args.apply else None
+
+def run_batch(args):
+    """
+    Organize (or just plan) every root in `args.roots` without prompting,
+    fanning out over a process pool, and write JSON/JSONL to stdout.
+    """
+    out = sys.stdout
+    roots = list(args.roots)
+    if args.roots_from:
+        with open(args.roots_from) as f:
+            roots.extend(line.strip() for line in f if line.strip())
+    if not roots:
+        print("No roots given.", file=sys.stderr)
+        return 2
+
+    jobs = max(1, min(args.jobs, len(roots)))
+    started = time.time()
+    results = []
+
+    def emit(result):
+        results.append(result)
+        if args.format == "jsonl":
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        if jobs == 1:
+            _init_batch_worker(args.backend, None)
+            for root in roots:
+                emit(organize_folder(root, args.mode, args.sort, args.apply, _batch_log_path(args, root)))
+        else:
+            context = multiprocessing.get_context()
+            llm_semaphore = context.BoundedSemaphore(args.max_llm_concurrency) if args.max_llm_concurrency else None
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                     initializer=_init_batch_worker,
+                                     initargs=(args.backend, llm_semaphore)) as pool:
+                futures = {
+                    pool.submit(organize_folder, root, args.mode, args.sort, args.apply, _batch_log_path(args, root)): root
+                    for root in roots
+                }
+                for future in as_completed(futures):
+                    try:
+                        emit(future.result())
+                    except Exception as e:
+                        emit({"root": futures[future], "status": "error", "message": str(e)})
+
+    summary = summarize_batch(results, time.time() - started)
+    summary["jobs"] = jobs
+    if args.format == "json":
+        results.sort(key=lambda r: roots.index(r["root"]))
+        json.dump({"results": results, "summary": summary}, out, indent=2)
+        out.write("\n")
+
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+def run_summarize(args):
+    json.dump(summarize_log(args.logs), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Hybrid file categorizer. Runs interactively when no command is given.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Organize many folders without prompting")
+    batch.add_argument("roots", nargs="*", help="Folders to organize")
+    batch.add_argument("--roots-from", help="File with one folder path per line")
+    batch.add_argument("--mode", default="1", choices=["1", "2", "3", "5"],
+                       help="1=file type, 2=date, 3=content pattern, 5=LLM (default: 1)")
+    batch.add_argument("--sort", default="1", choices=["1", "2", "3", "4", "5"],
+                       help="Sorting order, same values as the interactive prompt (default: 1)")
+    batch.add_argument("--apply", action="store_true", help="Move files; without this only the plan is output")
+    batch.add_argument("--format", default="jsonl", choices=["json", "jsonl"], help="Output format (default: jsonl)")
+    batch.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                       help="Maximum number of folders processed at once (default: CPU count)")
+    batch.add_argument("--max-llm-concurrency", type=int, default=0,
+                       help="Global cap on in-flight LLM calls across all workers (default: unlimited)")
+    batch.add_argument("--backend", choices=["gemini", "stub"], help="LLM backend (default: CATEGORIZER_BACKEND or gemini)")
+    batch.add_argument("--log", help=f"Append all events to this JSONL file instead of <root>/{LOG_FILE_NAME}")
+    batch.add_argument("--no-log", action="store_true", help="Don't write an event log")
+
+    summarize = subparsers.add_parser("summarize", help="Latency and throughput report for JSONL organization logs")
+    summarize.add_argument("logs", nargs="+", help="Log files to summarize")
+    return parser
+
+def cli(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        return run_batch(args)
+    if args.command == "summarize":
+        return run_summarize(args)
+    main()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli())